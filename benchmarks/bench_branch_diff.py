@@ -0,0 +1,73 @@
+"""
+Compares the date based zpm branch diff, which pages through the commits
+made since the head of the first branch, with a single request to the
+compare endpoint, against a local GitLab stub that adds a fixed latency
+to every response.
+
+    python -m benchmarks.bench_branch_diff --commits 20000 --diverged 5000
+"""
+import argparse
+import time
+
+from changelog_generator.calls import (
+    get_commits_between_branches,
+    get_commits_since_date,
+    get_last_commit_date,
+)
+from changelog_generator.client import GitLabClient
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+def by_date(cli_args: dict) -> list:
+    return get_commits_since_date(get_last_commit_date(cli_args), cli_args)
+
+
+MODES = {"date": by_date, "compare": get_commits_between_branches}
+
+
+def run(commits: list, diverged: int, mode: str, latency: float) -> dict:
+    with StubGitLab(commits, latency=latency, branches={"release": diverged}) as stub:
+        client = GitLabClient(stub.url)
+        cli_args = {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "bench",
+            "branch_one": "release",
+            "branch_two": "master",
+            "ssl": True,
+            "source": "gitlab",
+            "client": client,
+        }
+        start = time.perf_counter()
+        fetched = MODES[mode](cli_args)
+        elapsed = time.perf_counter() - start
+        client.close()
+        return {"commits": len(fetched), "requests": stub.requests, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=20000)
+    parser.add_argument(
+        "--diverged",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="numbers of commits on master that are not on the release branch",
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    commits = make_commits(args.commits)
+    print(f"{'mode':>8} {'diverged':>9} {'commits':>8} {'requests':>9} {'seconds':>8}")
+    for diverged in args.diverged:
+        for mode in MODES:
+            result = run(commits, diverged, mode, args.latency)
+            print(
+                f"{mode:>8} {diverged:>9} {result['commits']:>8} "
+                f"{result['requests']:>9} {result['seconds']:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
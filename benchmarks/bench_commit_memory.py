@@ -0,0 +1,59 @@
+"""
+Compares the memory held by a commit history kept as full GitLab commit
+JSON dicts with the same history projected onto Commit records.
+
+    python -m benchmarks.bench_commit_memory --commits 50000
+"""
+import argparse
+import json
+import tracemalloc
+
+from changelog_generator.models import parse_commits
+from changelog_generator.tests.stub_gitlab import make_commits
+
+
+def full_json(commits: list) -> bytes:
+    """
+    Pads the synthetic commits with the fields GitLab also returns.
+    """
+    return json.dumps(
+        [
+            {
+                **commit,
+                "parent_ids": [commit["id"]],
+                "author_name": "Some Developer",
+                "author_email": "developer@example.com",
+                "authored_date": commit["committed_date"],
+                "committer_name": "Some Developer",
+                "committer_email": "developer@example.com",
+                "trailers": {},
+                "web_url": f"https://gitlab.example.com/group/project/-/commit/{commit['id']}",
+            }
+            for commit in commits
+        ]
+    ).encode()
+
+
+def measure(body: bytes, project: bool) -> int:
+    tracemalloc.start()
+    commits = json.loads(body)
+    if project:
+        commits = parse_commits(commits)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=50000)
+    args = parser.parse_args()
+
+    body = full_json(make_commits(args.commits))
+    for name, project in (("json dicts", False), ("Commit records", True)):
+        held = measure(body, project)
+        print(f"{name:<16} {held / 1024 / 1024:>8.1f} MB {held / args.commits:>8.0f} B/commit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares the per-commit title regexes previously used by the generators
+with `conventional.parse_title` over synthetic commit titles.
+
+    python -m benchmarks.bench_commit_parser --titles 100000
+"""
+import argparse
+import random
+import re
+import time
+
+from changelog_generator.conventional import is_bump, parse_title
+
+TYPES = ["feat", "fix", "chg", "chore", "test", "vendor", "docs"]
+SCOPES = ["api", "web", "zpm", "core"]
+
+
+def make_titles(count: int, long_every: int) -> list:
+    generator = random.Random(0)
+    titles = []
+    for index in range(count):
+        if long_every and index % long_every == 0:
+            # No closing parenthesis or colon: the worst case for greedy patterns
+            titles.append("feat(" + "x" * 2000)
+            continue
+        kind = generator.choice(TYPES)
+        scope = generator.choice(SCOPES + [None])
+        prefix = f"{kind}({scope})" if scope else kind
+        title = f"{prefix}: change number {index} " + "word " * generator.randint(0, 20)
+        if generator.random() < 0.3:
+            title += f"(!{index})"
+        titles.append(title)
+    return titles
+
+
+def previous(titles: list):
+    for title in titles:
+        re.match(r'^(.+)\((.+)\):', title)
+        re.match(r'^(.+)(\((.+)\))?:', title)
+        re.match(r'^.+\(\![0-9]+\)$', title)
+        re.match(r'^bump:.+$', title)
+
+
+def current(titles: list):
+    for title in titles:
+        parse_title(title)
+        is_bump(title)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=100000)
+    parser.add_argument(
+        "--long-every",
+        type=int,
+        default=1000,
+        help="insert a pathological 2000 character title every n titles, 0 to disable",
+    )
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles, args.long_every)
+    for name, function in (("previous", previous), ("parse_title", current)):
+        start = time.perf_counter()
+        function(titles)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed:>8.3f}s {len(titles) / elapsed:>12,.0f} titles/s")
+
+
+if __name__ == "__main__":
+    main()
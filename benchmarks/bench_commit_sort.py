@@ -0,0 +1,67 @@
+"""
+Measures the cost of ordering commits by date with the previous
+dateutil/strftime sort key and with `calls.sort_commits`, including the
+projection onto Commit records where the dates are parsed.
+
+    python -m benchmarks.bench_commit_sort --commits 50000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from dateutil import parser
+
+from changelog_generator.calls import sort_commits
+from changelog_generator.models import parse_commits
+
+OFFSETS = ["+00:00", "+02:00", "-05:00", "+05:30"]
+
+
+def make_commits(count: int) -> list:
+    generator = random.Random(0)
+    start = datetime.datetime(2020, 1, 1)
+    commits = []
+    for number in range(count):
+        date = start + datetime.timedelta(seconds=generator.randrange(10 ** 8))
+        commits.append(
+            {
+                "id": str(number),
+                "short_id": str(number),
+                "title": f"feat: change {number}",
+                "message": f"feat: change {number}",
+                "committed_date": date.strftime("%Y-%m-%dT%H:%M:%S.000")
+                + generator.choice(OFFSETS),
+            }
+        )
+    return commits
+
+
+def previous(commits: list) -> list:
+    return sorted(
+        commits,
+        key=lambda x: datetime.datetime.strftime(
+            parser.parse(x["committed_date"]), "%Y-%m-%dT%H:%M:%S.%f"
+        ),
+    )
+
+
+def current(commits: list) -> list:
+    return sort_commits(parse_commits(commits))
+
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument("--commits", type=int, default=50000)
+    args = argument_parser.parse_args()
+
+    commits = make_commits(args.commits)
+    for name, function in (("previous", previous), ("sort_commits", current)):
+        start = time.perf_counter()
+        function(commits)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14} {elapsed:>8.3f}s {len(commits) / elapsed:>12,.0f} commits/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compares serial paging with concurrent page prefetching against a local
+GitLab stub that adds a fixed latency to every response.
+
+    python -m benchmarks.bench_concurrent_pages --commits 5000 --latency 0.05
+"""
+import argparse
+import time
+
+from changelog_generator.calls import get_commits_since_date
+from changelog_generator.client import GitLabClient
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+def run(commits: list, concurrency: int, latency: float) -> dict:
+    with StubGitLab(commits, latency=latency) as stub:
+        client = GitLabClient(stub.url, pool_size=concurrency)
+        cli_args = {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "bench",
+            "branch_two": "master",
+            "ssl": True,
+            "concurrency": concurrency,
+            "client": client,
+        }
+        start = time.perf_counter()
+        fetched = get_commits_since_date("2000-01-01T00:00:00+00:00", cli_args)
+        elapsed = time.perf_counter() - start
+        client.close()
+        return {"commits": len(fetched), "requests": stub.requests, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    commits = make_commits(args.commits)
+    print(f"{'concurrency':>11} {'commits':>8} {'requests':>9} {'seconds':>8}")
+    for concurrency in args.concurrency:
+        result = run(commits, concurrency, args.latency)
+        print(
+            f"{concurrency:>11} {result['commits']:>8} {result['requests']:>9} "
+            f"{result['seconds']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares the number of TCP connections opened against a local GitLab
+stub when commits are fetched through the pooled GitLabClient versus one
+bare `requests.get` per page.
+
+    python -m benchmarks.bench_connection_reuse --commits 2000
+"""
+import argparse
+import time
+
+import requests
+
+from changelog_generator.calls import get_commits_until_latest_bump
+from changelog_generator.client import GitLabClient
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+class UnpooledClient(GitLabClient):
+    """
+    Reproduces the previous behaviour of opening a new connection for
+    every request.
+    """
+
+    def get(
+        self,
+        path: str,
+        params: dict = None,
+        conditional: bool = False,
+        stream: bool = False,
+    ) -> requests.Response:
+        return requests.get(
+            self.url_for(path),
+            params=params,
+            headers=dict(self.session.headers),
+            verify=self.session.verify,
+            stream=stream,
+        )
+
+
+def run(client_class, commits: list) -> dict:
+    with StubGitLab(commits) as stub:
+        client = client_class(stub.url)
+        cli_args = {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "bench",
+            "branch": "master",
+            "ssl": True,
+            "client": client,
+        }
+        start = time.perf_counter()
+        fetched = get_commits_until_latest_bump(cli_args)
+        elapsed = time.perf_counter() - start
+        client.close()
+        return {
+            "commits": len(fetched),
+            "requests": stub.requests,
+            "connections": stub.connections,
+            "reused": stub.requests - stub.connections,
+            "seconds": elapsed,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=1000)
+    args = parser.parse_args()
+
+    commits = make_commits(args.commits)
+    print(f"{'client':<10} {'commits':>8} {'requests':>9} {'connections':>12} {'reused':>7} {'seconds':>8}")
+    for name, client_class in (("unpooled", UnpooledClient), ("pooled", GitLabClient)):
+        result = run(client_class, commits)
+        print(
+            f"{name:<10} {result['commits']:>8} {result['requests']:>9} "
+            f"{result['connections']:>12} {result['reused']:>7} {result['seconds']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
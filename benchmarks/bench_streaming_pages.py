@@ -0,0 +1,95 @@
+"""
+Compares decoding commit pages with response.json() and with streaming
+ijson decoding over iter_content, against a local GitLab stub serving
+commits with large messages. Reports wall time, time to the first
+decoded commit and the peak Python memory of a full listing.
+
+    python -m benchmarks.bench_streaming_pages --commits 2000 --message-kb 8
+"""
+import argparse
+import multiprocessing
+import time
+import tracemalloc
+
+from unittest import mock
+
+from changelog_generator import calls
+from changelog_generator.client import GitLabClient
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+def serve(commits: list, per_page: int, urls, stop):
+    # A separate process, so the stub's own allocations are not traced
+    with StubGitLab(commits, default_per_page=per_page) as stub:
+        urls.put(stub.url)
+        stop.wait()
+
+
+def run(url: str, stream: bool) -> dict:
+    client = GitLabClient(url)
+    cli_args = {
+        "ip_address": url,
+        "api_version": "4",
+        "project": "bench",
+        "branch_two": "master",
+        "ssl": True,
+        "client": client,
+    }
+    date = "2000-01-01T00:00:00+00:00"
+    ijson = calls.ijson if stream else None
+    with mock.patch.object(calls, "ijson", ijson):
+        start = time.perf_counter()
+        pages = calls.commit_pages(
+            calls.iter_pages(calls.commits_path(cli_args), cli_args, "bench")
+        )
+        next(next(pages))
+        first = time.perf_counter() - start
+        pages.close()
+
+        start = time.perf_counter()
+        fetched = calls.get_commits_since_date(date, cli_args)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        calls.get_commits_since_date(date, cli_args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    client.close()
+    return {"commits": len(fetched), "first": first, "seconds": elapsed, "peak": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commits", type=int, default=2000)
+    parser.add_argument("--message-kb", type=int, default=8)
+    parser.add_argument("--per-page", type=int, default=100)
+    args = parser.parse_args()
+
+    if calls.ijson is None:
+        parser.error("ijson is not installed")
+    commits = make_commits(args.commits)
+    for commit in commits:
+        commit["message"] = commit["title"] + "\n\n" + "x" * (args.message_kb * 1024)
+
+    urls, stop = multiprocessing.Queue(), multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve, args=(commits, args.per_page, urls, stop), daemon=True
+    )
+    server.start()
+    url = urls.get()
+
+    print(f"{'decoder':<8} {'commits':>8} {'first ms':>9} {'seconds':>8} {'peak MB':>8}")
+    try:
+        for name, stream in (("json", False), ("ijson", True)):
+            result = run(url, stream)
+            print(
+                f"{name:<8} {result['commits']:>8} {result['first'] * 1000:>9.1f} "
+                f"{result['seconds']:>8.3f} {result['peak'] / 1024 / 1024:>8.1f}"
+            )
+    finally:
+        stop.set()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
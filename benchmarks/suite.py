@@ -0,0 +1,220 @@
+"""
+End-to-end benchmark scenarios for the zpm and zpw generators against a
+local GitLab stub. Each scenario is run in a fresh process, so that its
+peak RSS is its own, while the stub serves it from this one. Reports
+request count, wall time, peak RSS and commits per second.
+
+Results can be stored as baselines and later runs compared against them,
+failing when a scenario makes more requests, or when its median time or
+memory grows by more than the tolerance and by more than a fixed floor,
+so that the noise of short runs is not reported. Time and memory
+baselines only mean something on the machine they were recorded on.
+
+    python -m benchmarks.suite --save
+    python -m benchmarks.suite --compare
+    python -m benchmarks.suite zpw-walk zpm-compare --repeat 9
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 5
+# Smaller differences are within the noise of a single machine
+MIN_SECONDS = 0.25
+MIN_PEAK_RSS_MB = 8
+
+
+def failures(requests: int, every: int = 10) -> list:
+    """
+    Fails every `every`-th request, alternating between a rate limited
+    and an unavailable response.
+    """
+    return [
+        (429, 503)[(number // every) % 2] if number % every == every - 1 else None
+        for number in range(requests)
+    ]
+
+
+SCENARIOS = {
+    "zpw-walk": {
+        "system": "zpw",
+        "commits": {"count": 25000, "bump_every": 10000},
+        "stub": {"latency": 0.005},
+        "args": {"per_page": 100},
+    },
+    "zpw-tags": {
+        "system": "zpw",
+        "commits": {"count": 25000, "bump_every": 10000},
+        "stub": {"latency": 0.005},
+        "args": {"per_page": 100, "bump_search": "tags"},
+    },
+    "zpw-small-pages-errors": {
+        "system": "zpw",
+        "commits": {"count": 3000, "bump_every": 2000},
+        "stub": {"latency": 0.005, "errors": failures(200)},
+        "args": {"per_page": 20},
+    },
+    "zpm-date": {
+        "system": "zpm",
+        "commits": {"count": 20000},
+        "stub": {"latency": 0.005, "branches": {"release": 5000}},
+        "args": {"per_page": 100, "concurrency": 4},
+    },
+    "zpm-compare": {
+        "system": "zpm",
+        "commits": {"count": 20000},
+        "stub": {"latency": 0.005, "branches": {"release": 5000}},
+        "args": {"branch_diff": "compare"},
+    },
+}
+
+
+def run_scenario(name: str, url: str) -> dict:
+    """
+    Generates one changelog for a scenario. Runs in a child process.
+    """
+    from changelog_generator.client import GitLabClient
+    from changelog_generator.entry_point import load_generator
+    from changelog_generator.profiling import enable_profiling
+    from changelog_generator.scheduler import RequestScheduler
+
+    scenario = SCENARIOS[name]
+    # Retry warnings for the injected failures would clutter the report
+    logging.disable(logging.WARNING)
+    recorder = enable_profiling()
+    # Short backoffs keep injected failures from dominating the timings
+    scheduler = RequestScheduler(backoff=0.01)
+    client = GitLabClient(url, pool_size=8, scheduler=scheduler)
+    with tempfile.TemporaryDirectory() as directory:
+        cli_args = {
+            "ip_address": url,
+            "api_version": "4",
+            "project": "bench",
+            "sub_project": "core" if scenario["system"] == "zpm" else None,
+            "branch": "master",
+            "branch_one": "release",
+            "branch_two": "master",
+            "version": "1.0.0" if scenario["system"] == "zpm" else None,
+            "source": "gitlab",
+            "output_dir": directory,
+            "client": client,
+            **scenario["args"],
+        }
+        if cli_args["sub_project"]:
+            # zpm writes into the sub-project's directory of a checkout
+            os.mkdir(os.path.join(directory, cli_args["sub_project"]))
+        start = time.perf_counter()
+        load_generator(scenario["system"])().generate_changelog(cli_args)
+        seconds = time.perf_counter() - start
+    client.close()
+
+    commits = sum(
+        recorded.attributes["commits"]
+        for recorded in recorder.spans
+        if recorded.name == "classify"
+    )
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        # Linux reports kilobytes, macOS bytes
+        peak_rss *= 1024
+    return {
+        "commits": commits,
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss / 1024 / 1024,
+        "commits_per_second": commits / seconds,
+    }
+
+
+def measure(name: str, repeat: int) -> dict:
+    """
+    Runs a scenario `repeat` times and returns the median of each metric.
+    """
+    scenario = SCENARIOS[name]
+    commits = make_commits(**scenario["commits"])
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with StubGitLab(commits, **scenario["stub"]) as stub:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_scenario, (name, stub.url))
+            result["requests"] = stub.requests
+        runs.append(result)
+    return {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+
+
+def regressions(name: str, result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Describes how a result is worse than its baseline. Request counts are
+    deterministic and must not grow at all. Commits per second follow
+    from the time, so only the time is compared.
+    """
+    found = []
+    if result["requests"] > baseline["requests"]:
+        found.append(f"{name}: {result['requests']} requests, baseline {baseline['requests']}")
+    for metric, floor in (("seconds", MIN_SECONDS), ("peak_rss_mb", MIN_PEAK_RSS_MB)):
+        limit = max(baseline[metric] * (1 + tolerance), baseline[metric] + floor)
+        if result[metric] > limit:
+            found.append(
+                f"{name}: {metric} {result[metric]:.3f}, baseline {baseline[metric]:.3f}"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenarios", nargs="*", help="defaults to every scenario")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--baselines", default=BASELINES)
+    parser.add_argument("--save", action="store_true", help="store the results as baselines")
+    parser.add_argument(
+        "--compare", action="store_true", help="fail when a result regresses"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    baselines = {}
+    if os.path.isfile(args.baselines):
+        with open(args.baselines) as baselines_file:
+            baselines = json.load(baselines_file)
+
+    print(
+        f"{'scenario':<24} {'commits':>8} {'requests':>9} {'seconds':>8} "
+        f"{'rss MB':>8} {'commits/s':>10}"
+    )
+    results = {}
+    found = []
+    for name in args.scenarios or SCENARIOS:
+        result = results[name] = measure(name, args.repeat)
+        print(
+            f"{name:<24} {result['commits']:>8} {result['requests']:>9} "
+            f"{result['seconds']:>8.3f} {result['peak_rss_mb']:>8.1f} "
+            f"{result['commits_per_second']:>10.0f}"
+        )
+        if args.compare and name in baselines:
+            found += regressions(name, result, baselines[name], args.tolerance)
+
+    if args.save:
+        with open(args.baselines, "w") as baselines_file:
+            json.dump({**baselines, **results}, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write("\n")
+    if found:
+        print("\nRegressions against the baselines:", *found, sep="\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+asyncio variants of the calls in `changelog_generator.calls`. Every
+function expects an AsyncGitLabClient under the `async_client` key of
+`cli_args` and raises the typed errors from `changelog_generator.exceptions`
+instead of exiting.
+"""
+import asyncio
+import httpx
+import logging
+
+from collections import deque
+from itertools import islice
+
+from changelog_generator.calls import (
+    PER_PAGE,
+    branch_path,
+    collect_commits,
+    commits_path,
+    next_commit_date,
+    next_page,
+    sort_commits,
+    url_template,
+)
+from changelog_generator.exceptions import (
+    ChangelogGeneratorError,
+    GitLabAPIError,
+    GitLabConnectionError,
+)
+from changelog_generator.models import parse_commits
+from changelog_generator.profiling import recording, span
+
+logger = logging.getLogger(__name__)
+
+# Options only the synchronous calls implement, with the value that
+# behaves as if they were not set
+SYNC_ONLY_OPTIONS = {
+    "branch_diff": "date",
+    "bump_search": "walk",
+    "include_issues": False,
+    "source": "auto",
+    "repo_path": None,
+    "cache_dir": None,
+    "commit_cache": None,
+}
+
+
+def check_options(cli_args: dict):
+    """
+    Raises ChangelogGeneratorError when `cli_args` set an option the async
+    calls do not implement, as they would silently produce a different
+    changelog than the synchronous ones.
+    """
+    unsupported = [
+        option
+        for option, default in SYNC_ONLY_OPTIONS.items()
+        if cli_args.get(option) not in (None, default)
+    ]
+    if cli_args.get("source") == "gitlab":
+        # The async calls always use the API
+        unsupported.remove("source")
+    if unsupported:
+        raise ChangelogGeneratorError(
+            f"Async changelogs do not support {', '.join(unsupported)}"
+        )
+
+
+async def request(path: str, cli_args: dict, caller: str, params: dict = None):
+    try:
+        with span("request", url=url_template(path), caller=caller) as attributes:
+            response = await cli_args["async_client"].get(path, params=params)
+            if recording():
+                attributes["status"] = response.status_code
+                attributes["bytes"] = len(response.content)
+            response.raise_for_status()
+    except httpx.HTTPStatusError as ex:
+        raise GitLabAPIError(
+            f"{caller} call to GitLab API failed with HTTPError: {ex}",
+            ex.response.status_code,
+            path,
+        ) from ex
+    except httpx.TransportError as ex:
+        raise GitLabConnectionError(
+            f"{caller} call to GitLab API failed with ConnectionError: {ex}"
+        ) from ex
+
+    logger.debug(response.status_code)
+
+    return response
+
+
+async def iter_pages(path: str, cli_args: dict, caller: str, params: dict = None):
+    """
+    Async generator counterpart of `calls.iter_pages`.
+    """
+    params = {**(params or {}), "per_page": cli_args.get("per_page") or PER_PAGE}
+    concurrency = cli_args.get("concurrency") or 1
+
+    response = await request(path, cli_args, caller, params)
+    total_pages = response.headers.get("X-Total-Pages") if concurrency > 1 else None
+    while True:
+        page = response.json()
+        if not page:
+            return
+        yield page
+
+        if total_pages:
+            async for page in _iter_pages_concurrently(
+                path, cli_args, caller, params, int(total_pages), concurrency
+            ):
+                yield page
+            return
+
+        following = next_page(response, path, params)
+        if not following:
+            return
+        path, params = following
+        response = await request(path, cli_args, caller, params)
+
+
+async def _iter_pages_concurrently(
+    path: str,
+    cli_args: dict,
+    caller: str,
+    params: dict,
+    total_pages: int,
+    concurrency: int,
+):
+    async def fetch(number):
+        response = await request(path, cli_args, caller, {**params, "page": number})
+        return response.json()
+
+    numbers = iter(range(2, total_pages + 1))
+    pending = deque()
+    try:
+        for number in islice(numbers, concurrency):
+            pending.append(asyncio.ensure_future(fetch(number)))
+        while pending:
+            page = await pending.popleft()
+            for number in islice(numbers, 1):
+                pending.append(asyncio.ensure_future(fetch(number)))
+            if not page:
+                return
+            yield page
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get_last_commit_date(cli_args: dict) -> str:
+    response = await request(
+        branch_path(cli_args, cli_args["branch_one"]),
+        cli_args,
+        get_last_commit_date.__name__,
+    )
+
+    return next_commit_date(response.json()["commit"]["committed_date"])
+
+
+async def get_commits_since_date(date: str, cli_args: dict) -> list:
+    params = {"ref_name": cli_args["branch_two"], "since": date}
+    if cli_args.get("commit_path"):
+        params["path"] = cli_args["commit_path"]
+
+    clean_response = []
+    existed_commits = set()
+    pages = iter_pages(
+        commits_path(cli_args), cli_args, get_commits_since_date.__name__, params
+    )
+    async for page in pages:
+        collect_commits(parse_commits(page), clean_response, existed_commits)
+
+    return sort_commits(clean_response, reverse=True)
+
+
+async def get_commits_until_latest_bump(cli_args: dict) -> list:
+    params = {"ref_name": cli_args["branch"]}
+
+    clean_response = []
+    existed_commits = set()
+    pages = iter_pages(
+        commits_path(cli_args), cli_args, get_commits_until_latest_bump.__name__, params
+    )
+    async for page in pages:
+        if collect_commits(
+            parse_commits(page), clean_response, existed_commits, stop_at_bump=True
+        ):
+            break
+    await pages.aclose()
+
+    return sort_commits(clean_response)
@@ -0,0 +1,129 @@
+import asyncio
+import httpx
+import logging
+
+from contextlib import asynccontextmanager
+
+from changelog_generator.client import DEFAULT_POOL_SIZE
+from changelog_generator.profiling import annotate
+from changelog_generator.scheduler import (
+    DEFAULT_MAX_RETRIES,
+    RETRY_STATUSES,
+    RequestScheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGitLabClient:
+    """
+    asyncio counterpart of GitLabClient, holding a single pooled
+    httpx.AsyncClient for a GitLab instance. A client is bound to the
+    event loop it is first used on and should be closed with `aclose()`
+    or by using it as an async context manager.
+    """
+
+    def __init__(
+        self,
+        ip_address: str,
+        api_version: str = "4",
+        token: str = None,
+        ssl=True,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        scheduler: RequestScheduler = None,
+    ):
+        self.base_url = f"{ip_address}/api/v{api_version}"
+        self.pool_size = pool_size
+        self.scheduler = scheduler or RequestScheduler()
+        self.client = httpx.AsyncClient(
+            headers={"PRIVATE-TOKEN": token} if token else None,
+            verify=ssl,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    @classmethod
+    def from_args(cls, cli_args: dict) -> "AsyncGitLabClient":
+        max_retries = cli_args.get("max_retries")
+        if max_retries is None:
+            max_retries = DEFAULT_MAX_RETRIES
+        return cls(
+            cli_args["ip_address"],
+            cli_args.get("api_version", "4"),
+            cli_args.get("token"),
+            cli_args.get("ssl", True),
+            pool_size=max(
+                cli_args.get("pool_size") or DEFAULT_POOL_SIZE,
+                cli_args.get("concurrency") or 1,
+            ),
+            scheduler=RequestScheduler(max_retries=max_retries),
+        )
+
+    def url_for(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}{path}"
+
+    async def get(self, path: str, params: dict = None) -> httpx.Response:
+        """
+        Performs a GET request, paced and retried like `GitLabClient.get`.
+        """
+        url = self.url_for(path)
+        attempt = 0
+        try:
+            while True:
+                wait = self.scheduler.reserve()
+                if wait:
+                    logger.info("Throttling for %.2fs to stay within the rate limit", wait)
+                    await asyncio.sleep(wait)
+                logger.info("GET %s %s", url, params or "")
+                attempt += 1
+                try:
+                    response = await self.client.get(url, params=params)
+                except httpx.TransportError as ex:
+                    delay = self.scheduler.retry_delay(attempt)
+                    if delay is None:
+                        raise
+                    logger.warning("GET %s failed with %s, retrying in %.2fs", url, ex, delay)
+                    await asyncio.sleep(delay)
+                    continue
+
+                self.scheduler.observe(response.headers)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = self.scheduler.retry_delay(
+                    attempt, response.status_code, response.headers
+                )
+                if delay is None:
+                    return response
+                logger.warning(
+                    "GET %s returned %s, retrying in %.2fs", url, response.status_code, delay
+                )
+                await response.aclose()
+                await asyncio.sleep(delay)
+        finally:
+            annotate(retries=attempt - 1)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+@asynccontextmanager
+async def async_client_args(cli_args: dict):
+    """
+    Yields `cli_args` with an `async_client` entry. A client passed in by
+    the caller is reused and left open; otherwise one is created for the
+    duration of the block.
+    """
+    if cli_args.get("async_client"):
+        yield cli_args
+        return
+    async with AsyncGitLabClient.from_args(cli_args) as client:
+        yield {**cli_args, "async_client": client}
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+from .entry_point import (
+    add_gitlab_arguments,
+    add_logging_arguments,
+    add_profile_arguments,
+    gitlab_arguments,
+    load_generator,
+    log_request_counters,
+    logging_arguments,
+    profile_arguments,
+    systems,
+)
+from .exceptions import ChangelogGeneratorError
+from .log_handlers import configure_logging
+from .profiling import enable_profiling, span, write_report
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("project", "branch", "system")
+# zpm compares `branch` with `base_branch` for every sub-project
+SYSTEM_FIELDS = {"zpm": ("base_branch", "sub_project")}
+
+
+def load_manifest(path: str) -> list:
+    """
+    Reads a batch manifest: a JSON or YAML list of projects, or a mapping
+    with such a list under `projects`. Every entry needs `project`,
+    `branch` and `system`, zpm entries also `base_branch` and
+    `sub_project`, and may set `version`, `output_dir` or any other
+    changegen argument for that project.
+    """
+    with open(path) as manifest_file:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ChangelogGeneratorError(
+                    "PyYAML is required to read YAML manifests"
+                )
+            manifest = yaml.safe_load(manifest_file)
+        else:
+            manifest = json.load(manifest_file)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("projects", [])
+    writers = {}
+    for index, entry in enumerate(manifest):
+        check_entry(entry, f"Manifest entry {index}")
+        if entry.get("render_only"):
+            continue
+        # Concurrent runs on one changelog would each lose the other's section
+        for path in changelog_paths(entry):
+            path = os.path.abspath(path)
+            if path in writers:
+                raise ChangelogGeneratorError(
+                    f"Manifest entries {writers[path]} and {index} both write {path}"
+                )
+            writers[path] = index
+    return manifest
+
+
+def check_entry(entry: dict, name: str):
+    """
+    Raises ChangelogGeneratorError when a project entry lacks a field its
+    system requires or names an unknown system.
+    """
+    missing = [field for field in REQUIRED_FIELDS if not entry.get(field)]
+    if missing:
+        raise ChangelogGeneratorError(f"{name} is missing {', '.join(missing)}")
+    if entry["system"] not in systems:
+        raise ChangelogGeneratorError(
+            f"{name} has unknown system '{entry['system']}'"
+        )
+    missing = [
+        field for field in SYSTEM_FIELDS.get(entry["system"], ()) if not entry.get(field)
+    ]
+    if missing:
+        raise ChangelogGeneratorError(
+            f"{name} is missing {', '.join(missing)}, which {entry['system']} requires"
+        )
+
+
+def changelog_paths(entry: dict) -> list:
+    """
+    Returns the changelog files a project entry writes.
+    """
+    generator = load_generator(entry["system"])()
+    return generator.changelog_paths({"sub_project": None, **entry})
+
+
+def run_project(entry: dict, defaults: dict) -> dict:
+    """
+    Generates the changelog for a single manifest entry, returning a
+    result record instead of raising so that one failure does not stop
+    the batch.
+    """
+    cli_args = {"sub_project": None, "version": None, **defaults, **entry}
+    result = {"project": entry["project"], "system": entry["system"]}
+    start = time.perf_counter()
+    try:
+        generator = load_generator(entry["system"])()
+        with span("project", system=entry["system"], project=entry["project"]):
+            result["message"] = generator.generate_changelog(cli_args)
+        result["status"] = "ok"
+    except Exception as ex:
+        logger.exception("Changelog for %s failed", entry["project"])
+        result["message"] = str(ex)
+        result["status"] = "failed"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(manifest: list, defaults: dict, workers: int = 4) -> list:
+    """
+    Generates every changelog in the manifest on a bounded worker pool.
+    All projects share the GitLab connection pool of `defaults`. Results
+    are returned in manifest order.
+    """
+    from .client import get_client
+
+    defaults = {
+        **defaults,
+        "pool_size": max(
+            defaults.get("pool_size") or 0,
+            workers * (defaults.get("concurrency") or 1),
+        ),
+    }
+    # Clients are built before the workers start, as get_client is not
+    # synchronised; entries with the same GitLab settings share one
+    manifest = [
+        {**entry, "client": get_client({**defaults, **entry})} for entry in manifest
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda entry: run_project(entry, defaults), manifest))
+
+
+def format_results(results: list) -> str:
+    lines = [f"{'project':<40} {'system':<6} {'status':<7} {'seconds':>8}  message"]
+    for result in results:
+        lines.append(
+            f"{result['project']:<40} {result['system']:<6} {result['status']:<7} "
+            f"{result['seconds']:>8.2f}  {result['message'] or ''}"
+        )
+    failed = sum(result["status"] == "failed" for result in results)
+    lines.append(f"{len(results)} projects, {failed} failed")
+    return "\n".join(lines)
+
+
+def process_arguments(argv: list = None) -> dict:
+    parser = ArgumentParser(prog="changegen-batch")
+    parser.add_argument(
+        "manifest",
+        help="specify a JSON or YAML manifest listing the projects to generate",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        help="specify the number of projects to generate in parallel",
+        type=int,
+        default=4,
+    )
+    add_gitlab_arguments(parser)
+    add_logging_arguments(parser)
+    add_profile_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    return {
+        "manifest": args.manifest,
+        "workers": args.workers,
+        **gitlab_arguments(args),
+        **logging_arguments(args),
+        **profile_arguments(args),
+    }
+
+
+def main():
+    cli_args = process_arguments()
+    configure_logging(cli_args.pop("log_level"), cli_args.pop("log_format"))
+    manifest_path = cli_args.pop("manifest")
+    workers = cli_args.pop("workers")
+    profile, profile_file = cli_args.pop("profile"), cli_args.pop("profile_file")
+    try:
+        manifest = load_manifest(manifest_path)
+    except (OSError, ValueError, ChangelogGeneratorError) as ex:
+        logger.error(ex)
+        sys.exit(1)
+
+    recorder = enable_profiling() if profile else None
+    results = run_batch(manifest, cli_args, workers)
+    log_request_counters()
+    if recorder:
+        write_report(recorder, profile, profile_file)
+    print(format_results(results))
+    if any(result["status"] == "failed" for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,397 @@
 import datetime
-import iso8601
 import logging
-import requests
-import rfc3339
-import sys
 import re
-from dateutil import parser
-from urllib.parse import quote
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from operator import attrgetter
+from urllib.parse import quote, urlsplit
+
+from changelog_generator.commit_cache import cache_key, get_commit_cache
+from changelog_generator.conventional import is_bump
+from changelog_generator.exceptions import (
+    GitLabAPIError,
+    GitLabConnectionError,
+    IncompleteHistoryError,
+)
+from changelog_generator.log_handlers import log_payload
+from changelog_generator.models import Commit, parse_timestamp
+from changelog_generator.profiling import recording, span
+from changelog_generator.sources import get_commit_source
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+PER_PAGE = 100
+# Smaller pages are cheaper to decode in one go with response.json()
+STREAM_MIN_PER_PAGE = 50
+STREAM_CHUNK_SIZE = 64 * 1024
+# How many of the most recent tags are searched for a bump commit
+TAG_SEARCH_LIMIT = 20
+
 
 def get_date_object(date_string):
+    import iso8601
+
     return iso8601.parse_date(date_string)
 
 
 def get_date_string(date_object):
+    import rfc3339
+
     return rfc3339.rfc3339(date_object)
 
 
-def get_last_commit_date(cli_args: dict) -> str:
+def project_path(cli_args: dict) -> str:
+    return f"/projects/{quote(str(cli_args['project']), safe='')}"
+
+
+def branch_path(cli_args: dict, branch: str) -> str:
+    return f"{project_path(cli_args)}/repository/branches/{quote(branch, safe='')}"
+
+
+def commits_path(cli_args: dict) -> str:
+    return f"{project_path(cli_args)}/repository/commits"
+
+
+def url_template(path: str) -> str:
+    """
+    Returns the API path of a request with the project and branch names
+    replaced by placeholders, so that timings can be grouped by endpoint.
+    """
+    path = re.sub(r"^.*?/projects/[^/]+", "/projects/:id", urlsplit(path).path)
+    return re.sub(r"/branches/.+$", "/branches/:branch", path)
+
+
+def next_commit_date(committed_date: str) -> str:
+    """
+    Returns the date one second after the given commit date.
+    """
+    commit_date = get_date_object(committed_date) + datetime.timedelta(seconds=1)
+    return get_date_string(commit_date)
+
+
+def collect_commits(
+    page: list, clean_response: list, existed_commits: set, stop_at_bump: bool = False
+) -> bool:
     """
-    Queries a specified GitLab API and returns the date of the most
-    recent commit.
+    Appends the Commits of a page that have not been seen before to
+    `clean_response`. Returns True when `stop_at_bump` is set and a
+    `bump:` commit ends the range.
     """
-    request_url = f"{cli_args['ip_address']}/api/v{cli_args['api_version']}/projects/" f"{cli_args['project']}/repository/branches/{quote(cli_args['branch_one'], safe='')}"
-    logger.info(f"Requesting last commit date with URL: {request_url} {cli_args['token']} {cli_args['ssl']}")
+    for commit in page:
+        if stop_at_bump and is_bump(commit.title):
+            return True
+        if commit.id in existed_commits:
+            continue
+        existed_commits.add(commit.id)
+        clean_response.append(commit)
+    return False
+
+
+def sort_commits(commits: list, reverse: bool = False) -> list:
+    """
+    Orders commits by their committed date, comparing the actual
+    instants so that commits made in different timezones interleave
+    correctly.
+    """
+    return sorted(commits, key=attrgetter("committed_at"), reverse=reverse)
+
+
+def request(
+    path: str,
+    cli_args: dict,
+    caller: str,
+    params: dict = None,
+    conditional: bool = False,
+    stream: bool = False,
+):
+    """
+    Performs a GET request against the GitLab API through the shared
+    client for the given CLI arguments, raising GitLabAPIError or
+    GitLabConnectionError on failure. `conditional` requests revalidate
+    a cached copy of the response when a cache directory is configured.
+    `stream` leaves the body unread for `page_items`.
+    """
+    # requests is only loaded once the API is used, not for local clones
+    import requests
+    from changelog_generator.client import get_client
+
     try:
-        response = requests.get(
-            request_url,
-            headers={
-                "Private-Token": cli_args["token"]
-                if "token" in cli_args
-                else None
-            },
-            verify=cli_args["ssl"],
-        )
-        logger.info(response.status_code)
-        response.raise_for_status()
+        with span("request", url=url_template(path), caller=caller) as attributes:
+            response = get_client(cli_args).get(
+                path, params=params, conditional=conditional, stream=stream
+            )
+            if recording():
+                attributes["status"] = response.status_code
+                # Streamed bodies have not been read yet
+                attributes["bytes"] = int(
+                    response.headers.get("Content-Length")
+                    or (0 if stream else len(response.content))
+                )
+            response.raise_for_status()
     except requests.exceptions.HTTPError as ex:
-        logger.error(
-            f"{get_last_commit_date.__name__} call to GitLab API failed with HTTPError: {ex}"
-        )
-        sys.exit(1)
+        raise GitLabAPIError(
+            f"{caller} call to GitLab API failed with HTTPError: {ex}",
+            ex.response.status_code if ex.response is not None else None,
+            path,
+        ) from ex
     except requests.exceptions.ConnectionError as ex:
-        logger.error(
-            f"{get_last_commit_date.__name__} call to GitLab API failed with ConnectionError: {ex}"
-        )
-        sys.exit(1)
+        raise GitLabConnectionError(
+            f"{caller} call to GitLab API failed with ConnectionError: {ex}"
+        ) from ex
+    except requests.exceptions.Timeout as ex:
+        raise GitLabConnectionError(
+            f"{caller} call to GitLab API failed with Timeout: {ex}"
+        ) from ex
 
     logger.debug(response.status_code)
-    logger.debug(response.json())
 
-    response_json = response.json()
-    commit_dict = response_json["commit"]
+    return response
 
-    logger.info(f"response")
-    commit_date = get_date_object(commit_dict["committed_date"]) + datetime.timedelta(seconds=1)
 
-    return get_date_string(commit_date)
+def page_items(response, stream: bool = False):
+    """
+    Returns the items of a JSON array response, decoding the body exactly
+    once. Streamed responses are decoded incrementally with ijson as
+    chunks arrive, so items are available before the whole page has been
+    received and the raw body is never held in full.
+    """
+    if not stream:
+        return response.json()
+    return _stream_items(response)
 
 
-def get_closed_issues_for_project(cli_args: dict) -> dict:
+def _stream_items(response, prefix: str = "item"):
     """
-    Queries a specified GitLab API and returns a list containing
-    the titles and URLs of closed issues since a given date.
+    Decodes the items of a streamed response as its chunks arrive. A body
+    cut off by the connection raises GitLabConnectionError, one that is
+    not valid JSON GitLabAPIError.
     """
-    request_url = f"{cli_args['ip_address']}/api/v{cli_args['api_version']}/projects/{cli_args['project']}/issues?state=closed"
-    logger.info(
-        f"Requesting tags for project {cli_args['project']} with URL: {request_url}"
+    import requests
+
+    items = ijson.sendable_list()
+    decoder = ijson.items_coro(items, prefix, use_float=True)
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            decoder.send(chunk)
+            yield from items
+            del items[:]
+        decoder.close()
+        yield from items
+    except (
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.ConnectionError,
+    ) as ex:
+        raise GitLabConnectionError(
+            f"Reading {response.url} from GitLab API failed with "
+            f"{type(ex).__name__}: {ex}"
+        ) from ex
+    except ijson.JSONError as ex:
+        raise GitLabAPIError(
+            f"GitLab API response from {response.url} is not valid JSON: {ex}",
+            response.status_code,
+            response.url,
+        ) from ex
+    finally:
+        response.close()
+
+
+def next_page(response, path: str, params: dict):
+    """
+    Returns the (path, params) pair for the page after `response`, or None
+    when GitLab advertises no further page.
+    """
+    next_url = response.links.get("next", {}).get("url")
+    next_number = response.headers.get("X-Next-Page")
+    if next_url:
+        return next_url, None
+    if next_number and params is not None:
+        return path, {**params, "page": next_number}
+    return None
+
+
+def iter_pages(
+    path: str,
+    cli_args: dict,
+    caller: str,
+    params: dict = None,
+    conditional: bool = False,
+):
+    """
+    Yields successive pages of a paginated GitLab API collection. Pages
+    fetched one after another are streamed when ijson is installed, and
+    are then iterators that decode their items as they are consumed. The
+    keyset `Link: rel="next"` header is followed when GitLab provides one,
+    otherwise the offset `X-Next-Page` header is used. Iteration stops on
+    the first empty page or when no next page is advertised, so callers
+    that stop consuming early never request further pages.
+
+    With a `concurrency` greater than one and an `X-Total-Pages` header on
+    the first response, the remaining pages are prefetched in parallel.
+    With `conditional` the first page is revalidated like a conditional
+    request() and read whole, as its body is cached.
+    """
+    params = {**(params or {}), "per_page": cli_args.get("per_page") or PER_PAGE}
+    concurrency = cli_args.get("concurrency") or 1
+    stream = ijson is not None and params["per_page"] >= STREAM_MIN_PER_PAGE
+
+    streamed = stream and not conditional
+    response = request(
+        path, cli_args, caller, params, conditional=conditional, stream=streamed
     )
+    total_pages = response.headers.get("X-Total-Pages") if concurrency > 1 else None
+    while True:
+        page = page_items(response, streamed)
+        if streamed:
+            first = next(page, None)
+            if first is None:
+                return
+            log_payload(logger, "First item of a page of %s", first, path)
+            yield chain((first,), page)
+        elif not page:
+            return
+        else:
+            log_payload(logger, "Page of %s", page, path)
+            yield page
+
+        if total_pages:
+            yield from _iter_pages_concurrently(
+                path, cli_args, caller, params, int(total_pages), concurrency
+            )
+            return
+
+        following = next_page(response, path, params)
+        if not following:
+            return
+        path, params = following
+        streamed = stream
+        response = request(path, cli_args, caller, params, stream=stream)
+
+
+def _iter_pages_concurrently(
+    path: str,
+    cli_args: dict,
+    caller: str,
+    params: dict,
+    total_pages: int,
+    concurrency: int,
+):
+    """
+    Fetches pages 2 to `total_pages` with at most `concurrency` requests in
+    flight and yields them in page order. Pages that have not been
+    started when the consumer stops are never requested.
+    """
+
+    def fetch(number):
+        return request(path, cli_args, caller, {**params, "page": number}).json()
+
+    numbers = iter(range(2, total_pages + 1))
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
     try:
-        response = requests.get(
-            request_url,
-            headers={"PRIVATE-TOKEN": cli_args["token"]}
-            if "token" in cli_args
-            else None,
-            verify=cli_args["ssl"],
-        )
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as ex:
-        logger.error(
-            f"{get_commits_since_date.__name__} call to GitLab API failed with HTTPError: {ex}"
-        )
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as ex:
-        logger.error(
-            f"{get_commits_since_date.__name__} call to GitLab API failed with ConnectionError: {ex}"
-        )
-        sys.exit(1)
+        for number in islice(numbers, concurrency):
+            pending.append(executor.submit(fetch, number))
+        while pending:
+            page = pending.popleft().result()
+            for number in islice(numbers, 1):
+                pending.append(executor.submit(fetch, number))
+            if not page:
+                return
+            log_payload(logger, "Page of %s", page, path)
+            yield page
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def from_commit_source(cli_args: dict, read):
+    """
+    Returns the result of `read` on the local commit source, or None when
+    the GitLab API should be used: when there is no clone, or when an
+    automatically chosen clone lacks the history that was asked for.
+    """
+    source = get_commit_source(cli_args)
+    if source is None:
+        return None
+    try:
+        return read(source)
+    except IncompleteHistoryError as ex:
+        if cli_args.get("source") == "git":
+            raise
+        logger.info("%s, falling back to the GitLab API", ex)
+        return None
 
-    logger.debug(response.status_code)
-    logger.debug(response.json())
 
-    return response.json()
+def get_last_commit_date(cli_args: dict) -> str:
+    """
+    Queries a specified GitLab API, or the local clone when there is
+    one, and returns the date of the most recent commit.
+    """
+    ref = cli_args["branch_one"]
+    head = from_commit_source(cli_args, lambda source: source.head_commit(ref))
+    if head is not None:
+        return next_commit_date(head.committed_date)
+
+    logger.info("Requesting last commit date for branch '%s'", ref)
+    response = request(
+        branch_path(cli_args, ref),
+        cli_args,
+        get_last_commit_date.__name__,
+        conditional=True,
+    )
+
+    return next_commit_date(response.json()["commit"]["committed_date"])
+
+
+def get_closed_issues_for_project(cli_args: dict, updated_after: str = None) -> list:
+    """
+    Queries a specified GitLab API and returns the closed issues of a
+    project, page by page. With `updated_after` GitLab leaves out issues
+    last updated before that date, and so every issue closed earlier.
+    The first page is revalidated against a cached copy when a cache
+    directory is configured.
+    """
+    params = {"state": "closed"}
+    if updated_after:
+        params["updated_after"] = updated_after
+    logger.info("Requesting closed issues for project %s", cli_args["project"])
+    issues = []
+    for page in iter_pages(
+        f"{project_path(cli_args)}/issues",
+        cli_args,
+        get_closed_issues_for_project.__name__,
+        params,
+        conditional=True,
+    ):
+        issues.extend(page)
+    return issues
+
+
+def get_merged_merge_requests(cli_args: dict, updated_after: str = None) -> list:
+    """
+    Queries a specified GitLab API and returns the merged merge requests
+    of a project, page by page, leaving out those last updated before
+    `updated_after` when given.
+    """
+    params = {"state": "merged"}
+    if updated_after:
+        params["updated_after"] = updated_after
+    logger.info("Requesting merged merge requests for project %s", cli_args["project"])
+    merge_requests = []
+    for page in iter_pages(
+        f"{project_path(cli_args)}/merge_requests",
+        cli_args,
+        get_merged_merge_requests.__name__,
+        params,
+    ):
+        merge_requests.extend(page)
+    return merge_requests
 
 
 def get_last_tagged_release_date(cli_args: dict) -> str:
@@ -101,158 +399,328 @@ def get_last_tagged_release_date(cli_args: dict) -> str:
     Queries a specified GitLab API and returns a string containing
     the created_at date of the last tagged release.
     """
-    request_url = f"{cli_args['ip_address']}/api/v{cli_args['api_version']}/projects/{cli_args['project']}/repository/tags"
-    logger.info(
-        f"Requesting tags for project {cli_args['project']} with URL: {request_url}"
+    path = f"{project_path(cli_args)}/repository/tags"
+    logger.info("Requesting tags for project %s", cli_args["project"])
+    response = request(
+        path, cli_args, get_last_tagged_release_date.__name__, conditional=True
     )
-    try:
-        response = requests.get(
-            request_url,
-            headers={"PRIVATE-TOKEN": cli_args["token"]}
-            if "token" in cli_args
-            else None,
-            verify=cli_args["ssl"],
-        )
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as ex:
-        logger.error(
-            f"{get_commits_since_date.__name__} call to GitLab API failed with HTTPError: {ex}"
-        )
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as ex:
-        logger.error(
-            f"{get_commits_since_date.__name__} call to GitLab API failed with ConnectionError: {ex}"
-        )
-        sys.exit(1)
 
-    logger.debug(response.status_code)
-    logger.debug(response.json())
+    tags = response.json()
+    return tags[0]["commit"]["created_at"] if tags else None
+
+
+def commit_pages(pages):
+    """
+    Projects pages of GitLab commit JSON onto Commit records as they are
+    consumed, so the full responses are never held for a whole history.
+    """
+    for page in pages:
+        yield map(Commit.from_json, page)
 
-    return response.json()[0]["commit"]["created_at"]
+
+def record_pages(pages, fetched: list):
+    """
+    Passes pages through unchanged while appending their items to
+    `fetched` as they are consumed.
+    """
+    for page in pages:
+        yield _record_items(page, fetched)
+
+
+def _record_items(page, fetched: list):
+    for item in page:
+        fetched.append(item)
+        yield item
+
+
+def is_ancestor(cli_args: dict, ancestor_id: str, commit_id: str, caller: str) -> bool:
+    """
+    Returns whether `ancestor_id` is reachable from `commit_id`, using the
+    merge base of the two.
+    """
+    try:
+        merge_base = request(
+            f"{project_path(cli_args)}/repository/merge_base",
+            cli_args,
+            caller,
+            {"refs[]": [ancestor_id, commit_id]},
+        ).json()
+    except GitLabAPIError as ex:
+        if ex.status_code != 404:
+            raise
+        return False
+    return merge_base.get("id") == ancestor_id
+
+
+def refresh_cached_commits(cache, cli_args: dict, ref: str) -> list:
+    """
+    Brings the cached history of `ref` up to date and returns it, newest
+    first. Only the commits the branch gained since the cached head are
+    requested, with a single request to the compare endpoint. When
+    nothing is cached, or the ref was force-pushed so that the cached head
+    is no longer an ancestor of the branch, the cache for the ref is
+    dropped and None is returned. A ref whose head is kept current by
+    webhooks is returned as cached, without any request.
+    """
+    key = cache_key(cli_args)
+    head_id = cache.head(key, ref)
+    if not head_id:
+        return None
+    if cache.is_tracked(key, ref):
+        return cache.commits(key, ref)
+
+    caller = refresh_cached_commits.__name__
+    branch = request(branch_path(cli_args, ref), cli_args, caller, conditional=True)
+    tip = branch.json()["commit"]["id"]
+    if tip == head_id:
+        return cache.commits(key, ref)
+
+    if not is_ancestor(cli_args, head_id, tip, caller):
+        logger.info("Branch '%s' was rewritten, dropping cached commits", ref)
+        cache.invalidate(key, ref)
+        return None
+
+    # GitLab lists commits by date, so commits merged from older branches
+    # come after the cached head; the compare endpoint has them all
+    new_commits = sort_commits(
+        compare_commits(cli_args, head_id, tip, caller), reverse=True
+    )
+    logger.info(
+        "Fetched %d new commits on '%s' since the cached head", len(new_commits), ref
+    )
+    history = cache.commits(key, ref)
+    if new_commits and new_commits[-1].committed_at < history[0].committed_at:
+        # Keep the cached run in the order an uncached fetch lists it
+        cache.replace(
+            key,
+            ref,
+            sort_commits(new_commits + history, reverse=True),
+            complete=cache.is_complete(key, ref),
+            covered_since=cache.covered_since(key, ref),
+        )
+    else:
+        cache.prepend(key, ref, new_commits)
+    return cache.commits(key, ref)
 
 
 def get_commits_since_date(date: str, cli_args: dict) -> list:
     """
     Queries a specified GitLab API and returns a JSON response containing
-    all commits since a given date.
+    all commits since a given date. With a `commit_path` only commits
+    touching that path are requested. With a `cache_dir` the commits are
+    served from the commit cache whenever an earlier run covered `date`.
+    A local clone is read instead of the API when there is one.
     """
+    ref = cli_args["branch_two"]
+    local = from_commit_source(
+        cli_args,
+        lambda source: source.commits_since_date(date, ref, cli_args.get("commit_path")),
+    )
+    if local is not None:
+        return sort_commits(local, reverse=True)
 
-    clean_response = []
-    done = False
-    until_date = None
-    while not done:
-        request_url = f"{cli_args['ip_address']}/api/v{cli_args['api_version']}/projects/{cli_args['project']}" \
-                      f"/repository/commits/?ref_name={cli_args['branch_two']}&since={quote(date)}"
-        if until_date:
-            request_url += f"&until={quote(until_date)}"
-        logger.info(
-            f"Requesting commits on branch '{cli_args['branch_two']}' in repository '{cli_args['project']}'"
-            f" since date '{date}' with URL: {request_url}"
+    params = {"ref_name": ref, "since": date}
+    if cli_args.get("commit_path"):
+        params["path"] = cli_args["commit_path"]
+    logger.info(
+        "Requesting commits on branch '%s' in repository '%s' since date '%s'",
+        ref,
+        cli_args["project"],
+        date,
+    )
+
+    # The commit cache holds the unfiltered history of a ref
+    cache = get_commit_cache(cli_args) if "path" not in params else None
+    history = refresh_cached_commits(cache, cli_args, ref) if cache else None
+    since = parse_timestamp(date)
+    covered_since = cache.covered_since(cache_key(cli_args), ref) if history else None
+    fetched = None
+    if history and (
+        cache.is_complete(cache_key(cli_args), ref)
+        or covered_since and since >= parse_timestamp(covered_since)
+    ):
+        pages = [[c for c in history if c.committed_at >= since]]
+    else:
+        fetched = []
+        pages = record_pages(
+            commit_pages(
+                iter_pages(commits_path(cli_args), cli_args, get_commits_since_date.__name__, params)
+            ),
+            fetched,
         )
-        try:
-            response = requests.get(
-                request_url,
-                headers={"PRIVATE-TOKEN": cli_args["token"]}
-                if "token" in cli_args
-                else None,
-                verify=cli_args["ssl"],
-            )
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as ex:
-            logger.error(
-                f"{get_commits_since_date.__name__} call to GitLab API failed with HTTPError: {ex}"
-            )
-            sys.exit(1)
-        except requests.exceptions.ConnectionError as ex:
-            logger.error(
-                f"{get_commits_since_date.__name__} call to GitLab API failed with ConnectionError: {ex}"
-            )
-            sys.exit(1)
 
-        logger.debug(response.status_code)
-        logger.debug(response.json())
+    clean_response = []
+    existed_commits = set()
+    for page in pages:
+        collect_commits(page, clean_response, existed_commits)
+
+    if cache and fetched is not None:
+        cache.replace(cache_key(cli_args), ref, fetched, covered_since=date)
+
+    return sort_commits(clean_response, reverse=True)
 
-        response_json = response.json()
-        if not response_json or (clean_response and response_json[-1]["id"] == clean_response[-1]["id"]):
-            break
-        until_date = response_json[-1]["created_at"]
-        until_date = get_date_object(until_date) - datetime.timedelta(milliseconds=1)
-        until_date = get_date_string(until_date)
-        clean_response = clean_response + response_json
 
+def compare_commits(cli_args: dict, from_ref: str, to_ref: str, caller: str):
+    """
+    Returns an iterator over the Commits reachable from `to_ref` but not
+    from `from_ref`, oldest first, fetched with a single request to the
+    compare endpoint. The response is streamed when ijson is installed:
+    commits are decoded as they arrive, and the diffs GitLab sends after
+    them are skipped by the parser without being built into objects.
+    """
+    stream = ijson is not None
+    response = request(
+        f"{project_path(cli_args)}/repository/compare",
+        cli_args,
+        caller,
+        {"from": from_ref, "to": to_ref},
+        stream=stream,
+    )
+    if stream:
+        commits = _stream_items(response, "commits.item")
+    else:
+        commits = response.json()["commits"]
+    return map(Commit.from_json, commits)
+
+
+def get_commits_between_branches(cli_args: dict) -> list:
+    """
+    Returns the commits on `branch_two` that are not on `branch_one`,
+    newest first. Unlike the date window of get_commits_since_date this
+    is the exact set of commits, whatever their dates, and it takes one
+    request however long ago the branches diverged. A local clone is
+    read instead of the API when there is one.
+
+    The compare endpoint cannot filter by path, so with a `commit_path`
+    the API is queried by date instead.
+    """
+    base, ref = cli_args["branch_one"], cli_args["branch_two"]
+    path = cli_args.get("commit_path")
+    local = from_commit_source(
+        cli_args, lambda source: source.commits_between(base, ref, path)
+    )
+    if local is not None:
+        return sort_commits(local, reverse=True)
 
-    return sorted(
-        clean_response,
-        key=lambda x: datetime.datetime.strftime(
-            parser.parse(x["committed_date"]), "%Y-%m-%dT%H:%M:%S.%f"
+    if path:
+        logger.info("Commits touching '%s' are selected by date", path)
+        return get_commits_since_date(get_last_commit_date(cli_args), cli_args)
+
+    logger.info(
+        "Comparing branch '%s' with '%s' in repository '%s'",
+        ref,
+        base,
+        cli_args["project"],
+    )
+    commits = compare_commits(
+        cli_args, base, ref, get_commits_between_branches.__name__
+    )
+    return sort_commits(commits, reverse=True)
+
+
+def get_commits_since_bump_tag(cli_args: dict, ref: str) -> list:
+    """
+    Locates the newest tagged `bump:` commit on `ref` through the tags API
+    and fetches only the commits made after it with the compare endpoint,
+    so the number of requests does not grow with the length of the
+    range. Returns Commits newest first, ending with the tagged bump, or
+    None when none of the latest tags marks a bump on the branch.
+    """
+    caller = get_commits_since_bump_tag.__name__
+    branch = request(branch_path(cli_args, ref), cli_args, caller, conditional=True)
+    head_id = branch.json()["commit"]["id"]
+    tags = request(
+        f"{project_path(cli_args)}/repository/tags",
+        cli_args,
+        caller,
+        {"per_page": TAG_SEARCH_LIMIT},
+        conditional=True,
+    ).json()
+    bump = next(
+        (
+            tag["commit"]
+            for tag in tags
+            if is_bump(tag["commit"]["title"])
+            and is_ancestor(cli_args, tag["commit"]["id"], head_id, caller)
         ),
-        reverse=True,
+        None,
+    )
+    if bump is None:
+        logger.info("No tagged bump found on branch '%s'", ref)
+        return None
+
+    logger.info(
+        "Comparing branch '%s' with the bump tagged at %s", ref, bump["short_id"]
     )
+    commits = list(compare_commits(cli_args, bump["id"], head_id, caller))
+    commits.reverse()
+    commits.append(Commit.from_json(bump))
+    return commits
 
 
 def get_commits_until_latest_bump(cli_args: dict) -> list:
     """
     Queries a specified GitLab API and returns a JSON response containing
-    all commits since a given date.
+    all commits made since the most recent `bump:` commit. With a
+    `cache_dir` the commits are served from the commit cache whenever it
+    reaches back to a bump. A local clone is read instead of the API
+    when there is one. With the `tags` bump search the range is located
+    through the tags API instead of walking the history page by page.
     """
+    ref = cli_args["branch"]
+    local = from_commit_source(
+        cli_args, lambda source: source.commits_until_latest_bump(ref)
+    )
+    if local is not None:
+        return sort_commits(local)
 
-    clean_response = []
-    until_date = None
-    existed_commits = {}
-    while True:
-        request_url = f"{cli_args['ip_address']}/api/v{cli_args['api_version']}/projects/{cli_args['project']}" \
-                      f"/repository/commits/?ref_name={cli_args['branch']}"
-        if until_date:
-            request_url += f"&until={until_date}"
-        logger.info(
-            f"Requesting commits on branch in repository '{cli_args['project']}'"
-            f" with URL: {request_url}"
-        )
-        try:
-            response = requests.get(
-                request_url,
-                headers={"PRIVATE-TOKEN": cli_args["token"]}
-                if "token" in cli_args
-                else None,
-                verify=cli_args["ssl"],
-            )
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as ex:
-            logger.error(
-                f"{get_commits_since_date.__name__} call to GitLab API failed with HTTPError: {ex}"
-            )
-            sys.exit(1)
-        except requests.exceptions.ConnectionError as ex:
-            logger.error(
-                f"{get_commits_since_date.__name__} call to GitLab API failed with ConnectionError: {ex}"
-            )
-            sys.exit(1)
+    params = {"ref_name": ref}
+    logger.info(
+        "Requesting commits on branch '%s' in repository '%s' until the latest bump",
+        ref,
+        cli_args["project"],
+    )
 
-        logger.debug(response.status_code)
-        logger.debug(response.json())
+    cache = get_commit_cache(cli_args)
+    history = refresh_cached_commits(cache, cli_args, ref) if cache else None
+    fetched = None
+    if history and (
+        cache.is_complete(cache_key(cli_args), ref)
+        or any(is_bump(commit.title) for commit in history)
+    ):
+        pages = [history]
+    else:
+        fetched = None
+        if cli_args.get("bump_search") == "tags":
+            fetched = get_commits_since_bump_tag(cli_args, ref)
+        if fetched is not None:
+            pages = [fetched]
+        else:
+            fetched = []
+            pages = record_pages(
+                commit_pages(
+                    iter_pages(commits_path(cli_args), cli_args, get_commits_until_latest_bump.__name__, params)
+                ),
+                fetched,
+            )
 
-        response_json = response.json()
-        if not response_json or (clean_response and response_json[-1]["id"] == clean_response[-1]["id"]):
-            break
-        bump_found = False
-        for item in response_json:
-            title = item['title']
-            if re.match(r'^bump:.+$', title):
-                bump_found = True
-                break
-            if item['short_id'] in existed_commits:
-                continue
-            existed_commits[item['short_id']] = True
-            clean_response.append(item)
-        if bump_found:
+    clean_response = []
+    existed_commits = set()
+    bump_found = False
+    for page in pages:
+        if collect_commits(page, clean_response, existed_commits, stop_at_bump=True):
+            bump_found = True
             break
-        until_date = response_json[-1]["created_at"]
-        until_date = get_date_object(until_date) - datetime.timedelta(milliseconds=1)
-        until_date = get_date_string(until_date)
-
-    return sorted(
-        clean_response,
-        key=lambda x: datetime.datetime.strftime(
-            parser.parse(x["committed_date"]), "%Y-%m-%dT%H:%M:%S.%f"
-        ),
-    )
+
+    if cache and fetched is not None:
+        # Every commit made after the last one fetched was listed before it
+        covered_since = next_commit_date(fetched[-1].committed_date) if fetched else None
+        cache.replace(
+            cache_key(cli_args),
+            ref,
+            fetched,
+            complete=not bump_found,
+            covered_since=covered_since,
+        )
+
+    return sort_commits(clean_response)
@@ -0,0 +1,213 @@
+import logging
+import os
+import requests
+import threading
+import time
+from requests.adapters import HTTPAdapter
+
+from changelog_generator.http_cache import (
+    DEFAULT_MAX_BYTES,
+    ResponseCache,
+    cached_response,
+    is_cacheable,
+    validators,
+)
+from changelog_generator.profiling import annotate
+from changelog_generator.scheduler import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    RETRY_STATUSES,
+    RequestScheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a connection, and then for each read of a response
+DEFAULT_TIMEOUT = (10, 60)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class GitLabClient:
+    """
+    Holds a single pooled, keep-alive HTTP session for a GitLab instance.
+    The API base URL, auth header and certificate verification setting
+    are configured once and reused by every request. With a
+    `response_cache`, conditional requests can be used to revalidate
+    previously fetched resources. Requests are paced and retried by a
+    RequestScheduler, and time out after `timeout` seconds without an
+    answer, as for requests.
+    """
+
+    def __init__(
+        self,
+        ip_address: str,
+        api_version: str = "4",
+        token: str = None,
+        ssl=True,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        response_cache: ResponseCache = None,
+        scheduler: RequestScheduler = None,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.base_url = f"{ip_address}/api/v{api_version}"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.response_cache = response_cache
+        self.scheduler = scheduler or RequestScheduler()
+        self.token = token
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.verify = ssl
+        if token:
+            self.session.headers["PRIVATE-TOKEN"] = token
+
+    def url_for(self, path: str) -> str:
+        """
+        Resolves a path relative to the API base URL. Absolute URLs, such
+        as pagination `Link` header targets, are returned unchanged.
+        """
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}{path}"
+
+    def get(
+        self,
+        path: str,
+        params: dict = None,
+        conditional: bool = False,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        Performs a GET request. With `conditional` set and a response cache
+        configured, the cached `ETag`/`Last-Modified` validators are sent
+        and a `304 Not Modified` answer is served from the cache. With
+        `stream` the body is left unread for the caller to consume; it
+        does not apply to conditional requests, whose body is cached.
+
+        Rate limited (429) and 5xx responses, connection errors and
+        timeouts are retried with backoff; the last response is returned, or the last
+        error raised, once the scheduler gives up.
+        """
+        url = self.url_for(path)
+        attempt = 0
+        try:
+            while True:
+                wait = self.scheduler.reserve()
+                if wait:
+                    logger.info("Throttling for %.2fs to stay within the rate limit", wait)
+                    time.sleep(wait)
+                logger.info("GET %s %s", url, params or "")
+                attempt += 1
+                try:
+                    response = self._get(url, params, conditional, stream)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as ex:
+                    delay = self.scheduler.retry_delay(attempt)
+                    if delay is None:
+                        raise
+                    logger.warning("GET %s failed with %s, retrying in %.2fs", url, ex, delay)
+                    time.sleep(delay)
+                    continue
+
+                self.scheduler.observe(response.headers)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = self.scheduler.retry_delay(
+                    attempt, response.status_code, response.headers
+                )
+                if delay is None:
+                    return response
+                logger.warning(
+                    "GET %s returned %s, retrying in %.2fs", url, response.status_code, delay
+                )
+                response.close()
+                time.sleep(delay)
+        finally:
+            annotate(retries=attempt - 1)
+
+    def _get(self, url: str, params: dict, conditional: bool, stream: bool):
+        if not (conditional and self.response_cache):
+            return self.session.get(
+                url, params=params, stream=stream, timeout=self.timeout
+            )
+
+        url = requests.Request("GET", url, params=params).prepare().url
+        key = f"{self.token or ''} {url}"
+        entry = self.response_cache.get(key)
+        response = self.session.get(
+            url, headers=validators(entry) if entry else None, timeout=self.timeout
+        )
+        if response.status_code == 304 and entry:
+            logger.debug("%s not modified, serving cached response", url)
+            return cached_response(entry, response)
+        if is_cacheable(response):
+            self.response_cache.put(key, response)
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+def get_client(cli_args: dict) -> GitLabClient:
+    """
+    Returns the GitLabClient for the given CLI arguments. Clients are
+    shared between calls with the same host, API version, token, SSL,
+    cache and retry settings so that connections are reused across the
+    whole run, whichever thread asks first.
+    """
+    if cli_args.get("client"):
+        return cli_args["client"]
+
+    key = (
+        cli_args["ip_address"],
+        cli_args.get("api_version", "4"),
+        cli_args.get("token"),
+        cli_args.get("ssl", True),
+    )
+    cache_dir = cli_args.get("cache_dir")
+    max_retries = cli_args.get("max_retries")
+    if max_retries is None:
+        max_retries = DEFAULT_MAX_RETRIES
+    with _clients_lock:
+        client = _clients.get((*key, cache_dir, max_retries))
+        if client is None:
+            pool_size = max(
+                cli_args.get("pool_size") or DEFAULT_POOL_SIZE,
+                cli_args.get("concurrency") or 1,
+            )
+            response_cache = None
+            if cache_dir:
+                response_cache = ResponseCache(
+                    os.path.join(cache_dir, "http"),
+                    cli_args.get("cache_size") or DEFAULT_MAX_BYTES,
+                )
+            scheduler = RequestScheduler(max_retries=max_retries)
+            client = GitLabClient(
+                *key,
+                pool_size=pool_size,
+                response_cache=response_cache,
+                scheduler=scheduler,
+            )
+            _clients[(*key, cache_dir, max_retries)] = client
+    return client
+
+
+def request_counters() -> dict:
+    """
+    Returns the scheduler counters summed over the shared clients.
+    """
+    totals = {}
+    for client in _clients.values():
+        for name, value in client.scheduler.counters.items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def close_clients():
+    for client in _clients.values():
+        client.close()
+    _clients.clear()
@@ -0,0 +1,340 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from collections import OrderedDict
+from changelog_generator.models import Commit, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# The created_at column is no longer written but kept for existing caches
+COMMIT_FIELDS = ("id", "short_id", "title", "message", "committed_date")
+
+DEFAULT_MAX_COMMITS = 200_000
+
+_caches = {}
+# Batch workers and service requests open caches from several threads
+_caches_lock = threading.Lock()
+
+
+class CommitCache:
+    """
+    On-disk SQLite store of the commit history of project refs. For every
+    ref it holds a contiguous, newest-first run of commits starting at the
+    ref's head as it was last seen (the high-water mark), whether that
+    run reaches back to the first commit of the ref, and the date from
+    which it is known to hold every commit of the ref.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Refs kept current by webhooks, which only this process receives
+        self._tracked = set()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS refs (
+                    project TEXT NOT NULL,
+                    ref TEXT NOT NULL,
+                    head_id TEXT NOT NULL,
+                    complete INTEGER NOT NULL DEFAULT 0,
+                    covered_since TEXT,
+                    PRIMARY KEY (project, ref)
+                );
+                CREATE TABLE IF NOT EXISTS commits (
+                    project TEXT NOT NULL,
+                    ref TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    id TEXT NOT NULL,
+                    short_id TEXT,
+                    title TEXT,
+                    message TEXT,
+                    created_at TEXT,
+                    committed_date TEXT,
+                    PRIMARY KEY (project, ref, id)
+                );
+                CREATE INDEX IF NOT EXISTS commits_position
+                    ON commits (project, ref, position);
+                """
+            )
+            columns = [
+                row[1] for row in self._connection.execute("PRAGMA table_info(refs)")
+            ]
+            if "covered_since" not in columns:
+                # Caches written before the column existed
+                self._connection.execute("ALTER TABLE refs ADD COLUMN covered_since TEXT")
+
+    def head(self, project: str, ref: str) -> str:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT head_id FROM refs WHERE project = ? AND ref = ?",
+                (project, ref),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_complete(self, project: str, ref: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT complete FROM refs WHERE project = ? AND ref = ?",
+                (project, ref),
+            ).fetchone()
+        return bool(row and row[0])
+
+    def covered_since(self, project: str, ref: str) -> str:
+        """
+        The date from which the cached run holds every commit of a ref, if
+        known.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT covered_since FROM refs WHERE project = ? AND ref = ?",
+                (project, ref),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_tracked(self, project: str, ref: str) -> bool:
+        """
+        Whether webhooks have kept the cached head of a ref current since
+        it was last fetched, so that it need not be revalidated.
+        """
+        return (project, ref) in self._tracked
+
+    def set_tracked(self, project: str, ref: str, tracked: bool):
+        if tracked:
+            self._tracked.add((project, ref))
+        else:
+            self._tracked.discard((project, ref))
+
+    def commits(self, project: str, ref: str) -> list:
+        """
+        Returns the cached Commits of a ref, newest first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(COMMIT_FIELDS)} FROM commits "
+                "WHERE project = ? AND ref = ? ORDER BY position",
+                (project, ref),
+            ).fetchall()
+        return [Commit(*row, parse_timestamp(row[-1])) for row in rows]
+
+    def replace(
+        self,
+        project: str,
+        ref: str,
+        commits: list,
+        complete: bool = False,
+        covered_since: str = None,
+    ):
+        """
+        Stores `commits`, newest first, as the whole cached history of a ref,
+        holding every commit made on or after `covered_since` when given.
+        """
+        if not commits:
+            return self.invalidate(project, ref)
+        with self._lock, self._connection:
+            self._delete(project, ref)
+            self._insert(project, ref, commits, 0)
+            self._connection.execute(
+                "INSERT INTO refs (project, ref, head_id, complete, covered_since) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (project, ref, commits[0].id, int(complete), covered_since),
+            )
+
+    def prepend(self, project: str, ref: str, commits: list):
+        """
+        Adds commits that are newer than the cached head, newest first,
+        and moves the high-water mark to the newest of them.
+        """
+        if not commits:
+            return
+        with self._lock, self._connection:
+            (first,) = self._connection.execute(
+                "SELECT COALESCE(MIN(position), 0) FROM commits WHERE project = ? AND ref = ?",
+                (project, ref),
+            ).fetchone()
+            self._insert(project, ref, commits, first - len(commits))
+            self._connection.execute(
+                "UPDATE refs SET head_id = ? WHERE project = ? AND ref = ?",
+                (commits[0].id, project, ref),
+            )
+
+    def invalidate(self, project: str, ref: str):
+        with self._lock, self._connection:
+            self._delete(project, ref)
+
+    def close(self):
+        self._connection.close()
+
+    def _insert(self, project: str, ref: str, commits: list, start: int):
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO commits "
+            f"(project, ref, position, {', '.join(COMMIT_FIELDS)}) "
+            f"VALUES (?, ?, ?, {', '.join('?' * len(COMMIT_FIELDS))})",
+            (
+                (project, ref, start + index, *commit[:len(COMMIT_FIELDS)])
+                for index, commit in enumerate(commits)
+            ),
+        )
+
+    def _delete(self, project: str, ref: str):
+        self._tracked.discard((project, ref))
+        self._connection.execute(
+            "DELETE FROM commits WHERE project = ? AND ref = ?", (project, ref)
+        )
+        self._connection.execute(
+            "DELETE FROM refs WHERE project = ? AND ref = ?", (project, ref)
+        )
+
+
+class MemoryCommitCache:
+    """
+    In-memory counterpart of CommitCache for a long-running process. It
+    holds at most `max_commits` commits; once that is exceeded whole
+    projects are evicted, least recently used first.
+    """
+
+    def __init__(self, max_commits: int = DEFAULT_MAX_COMMITS):
+        self.max_commits = max_commits
+        self._lock = threading.Lock()
+        # Project to {ref: [head_id, complete, commits, tracked, covered_since]},
+        # oldest use first
+        self._projects = OrderedDict()
+        self._size = 0
+
+    def _ref(self, project: str, ref: str) -> list:
+        refs = self._projects.get(project)
+        if refs is None:
+            return None
+        self._projects.move_to_end(project)
+        return refs.get(ref)
+
+    def head(self, project: str, ref: str) -> str:
+        with self._lock:
+            cached = self._ref(project, ref)
+        return cached[0] if cached else None
+
+    def is_complete(self, project: str, ref: str) -> bool:
+        with self._lock:
+            cached = self._ref(project, ref)
+        return bool(cached and cached[1])
+
+    def covered_since(self, project: str, ref: str) -> str:
+        with self._lock:
+            cached = self._ref(project, ref)
+        return cached[4] if cached else None
+
+    def is_tracked(self, project: str, ref: str) -> bool:
+        with self._lock:
+            cached = self._ref(project, ref)
+        return bool(cached and cached[3])
+
+    def set_tracked(self, project: str, ref: str, tracked: bool):
+        with self._lock:
+            cached = self._ref(project, ref)
+            if cached:
+                cached[3] = tracked
+
+    def commits(self, project: str, ref: str) -> list:
+        """
+        Returns the cached Commits of a ref, newest first.
+        """
+        with self._lock:
+            cached = self._ref(project, ref)
+        return list(cached[2]) if cached else []
+
+    def replace(
+        self,
+        project: str,
+        ref: str,
+        commits: list,
+        complete: bool = False,
+        covered_since: str = None,
+    ):
+        """
+        Stores `commits`, newest first, as the whole cached history of a ref,
+        holding every commit made on or after `covered_since` when given.
+        """
+        if not commits:
+            return self.invalidate(project, ref)
+        with self._lock:
+            self._delete(project, ref)
+            self._projects.setdefault(project, {})[ref] = [
+                commits[0].id,
+                complete,
+                list(commits),
+                False,
+                covered_since,
+            ]
+            self._grow(project, len(commits))
+
+    def prepend(self, project: str, ref: str, commits: list):
+        """
+        Adds commits that are newer than the cached head, newest first,
+        and moves the high-water mark to the newest of them.
+        """
+        if not commits:
+            return
+        with self._lock:
+            cached = self._ref(project, ref)
+            if cached is None:
+                return
+            # Like INSERT OR IGNORE, a concurrent refresh adds nothing twice
+            known = {commit.id for commit in cached[2][:len(commits)]}
+            commits = [commit for commit in commits if commit.id not in known]
+            if not commits:
+                return
+            cached[0] = commits[0].id
+            cached[2] = commits + cached[2]
+            self._grow(project, len(commits))
+
+    def invalidate(self, project: str, ref: str):
+        with self._lock:
+            self._delete(project, ref)
+
+    def close(self):
+        with self._lock:
+            self._projects.clear()
+            self._size = 0
+
+    def _grow(self, project: str, count: int):
+        self._size += count
+        self._projects.move_to_end(project)
+        # The project just written is kept even when it alone is too large
+        while self._size > self.max_commits and len(self._projects) > 1:
+            evicted, refs = self._projects.popitem(last=False)
+            logger.debug("Evicting cached commits of %s", evicted)
+            self._size -= sum(len(cached[2]) for cached in refs.values())
+
+    def _delete(self, project: str, ref: str):
+        refs = self._projects.get(project)
+        if refs and ref in refs:
+            self._size -= len(refs.pop(ref)[2])
+            if not refs:
+                del self._projects[project]
+
+
+def cache_key(cli_args: dict) -> str:
+    return f"{cli_args['ip_address']}/{cli_args['project']}"
+
+
+def get_commit_cache(cli_args: dict) -> CommitCache:
+    """
+    Returns the commit cache given in `cli_args['commit_cache']` or the
+    CommitCache under `cli_args['cache_dir']`, or None when caching is
+    disabled.
+    """
+    if cli_args.get("commit_cache"):
+        return cli_args["commit_cache"]
+    cache_dir = cli_args.get("cache_dir")
+    if not cache_dir:
+        return None
+    path = os.path.join(cache_dir, "commits.sqlite")
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache = _caches[path] = CommitCache(path)
+    return cache
@@ -0,0 +1,100 @@
+"""
+Parsing of conventional-commit titles such as `feat(api)!: Add X (!12)`.
+
+The patterns are compiled once and built from negated character classes
+so that every part of a title is matched in a single left-to-right scan
+without backtracking, whatever the title length.
+"""
+import logging
+import re
+
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+CommitTitle = namedtuple("CommitTitle", ["type", "scope", "breaking", "subject", "mr"])
+
+_TITLE = re.compile(
+    r"(?P<type>[^\s():!]+)(?:\((?P<scope>[^()\n]*)\))?(?P<breaking>!)?:[ \t]*(?P<subject>[^\n]*)"
+)
+_MERGE_REQUEST = re.compile(r"\(!([0-9]+)\)")
+
+
+def parse_title(title: str) -> CommitTitle:
+    """
+    Splits a commit title into its type, scope, breaking-change flag,
+    subject and trailing merge request reference. Titles that do not
+    follow the convention get an empty type and no scope.
+    """
+    mr = None
+    stripped = title.rstrip()
+    if stripped.endswith(")"):
+        start = stripped.rfind("(!")
+        match = _MERGE_REQUEST.fullmatch(stripped, start) if start != -1 else None
+        if match:
+            mr = int(match.group(1))
+
+    match = _TITLE.match(title)
+    if not match:
+        return CommitTitle("", None, False, title, mr)
+    return CommitTitle(
+        match.group("type"),
+        match.group("scope") or None,
+        match.group("breaking") is not None,
+        match.group("subject"),
+        mr,
+    )
+
+
+def is_bump(title: str) -> bool:
+    return title.startswith("bump:") and len(title.rstrip()) > 5
+
+
+def classify(
+    commits: list,
+    type_map: dict,
+    allowed_scopes: list = None,
+    require_scope: bool = False,
+) -> dict:
+    """
+    Buckets Commits by conventional-commit type in a single pass, parsing
+    each title once. Types missing from `type_map` are collected under
+    "". When `allowed_scopes` is given, scoped commits outside of it are
+    dropped, and so are unscoped commits if `require_scope` is set.
+    """
+    buckets = {type: [] for type in type_map}
+    buckets[""] = []
+    for commit in commits:
+        title = parse_title(commit.title)
+        if allowed_scopes is not None and title.scope not in allowed_scopes:
+            if title.scope or require_scope:
+                logger.debug("Skipping %s", commit.title)
+                continue
+        buckets[title.type if title.type in type_map else ""].append(commit)
+    return buckets
+
+
+def partition(
+    commits: list,
+    type_map: dict,
+    scopes: list,
+    shared_scopes: list = (),
+    require_scope: bool = False,
+) -> dict:
+    """
+    Classifies Commits for several scopes in a single pass, parsing each
+    title once. Returns, for every scope in `scopes`, the buckets that
+    classify() would give with that scope and `shared_scopes` allowed.
+    """
+    partitions = {scope: {type: [] for type in (*type_map, "")} for scope in scopes}
+    for commit in commits:
+        title = parse_title(commit.title)
+        type = title.type if title.type in type_map else ""
+        if title.scope in shared_scopes or not (title.scope or require_scope):
+            for buckets in partitions.values():
+                buckets[type].append(commit)
+        elif title.scope in partitions:
+            partitions[title.scope][type].append(commit)
+        else:
+            logger.debug("Skipping %s", commit.title)
+    return partitions
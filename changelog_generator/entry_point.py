@@ -1,23 +1,36 @@
+import importlib
+import logging
+import sys
+
 from argparse import ArgumentParser
-from .zpm_generator import ZPMGenerator
-from .zpw_generator import ZPWGenerator
+from .exceptions import ChangelogGeneratorError
+from .log_handlers import LOG_FORMATS, LOG_LEVELS, configure_logging
+from .profiling import PROFILE_FORMATS, enable_profiling, span, write_report
+from .scheduler import DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE
 
-from changelog_generator.generator import generate_changelog
+logger = logging.getLogger(__name__)
 
+# Generators are imported by name so that only the one being run, and
+# the libraries it needs, are loaded
 systems = {
-    "zpm": ZPMGenerator,
-    "zpw": ZPWGenerator,
+    "zpm": "changelog_generator.zpm_generator.ZPMGenerator",
+    "zpw": "changelog_generator.zpw_generator.ZPWGenerator",
 }
 
-def process_arguments() -> dict:
-    parser = ArgumentParser(prog="changegen")
-    parser.add_argument(
-        "-sy",
-        "--system",
-        dest="system",
-        help="specify system, available options: zpm, zpw",
-        required=True,
-    )
+
+def load_generator(system: str):
+    """
+    Imports and returns the generator class for a system.
+    """
+    module_name, class_name = systems[system].rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def add_gitlab_arguments(parser: ArgumentParser):
+    """
+    Adds the arguments describing how to reach a GitLab instance, shared
+    by every changegen command.
+    """
     parser.add_argument(
         "-i",
         "--ip",
@@ -34,6 +47,121 @@ def process_arguments() -> dict:
         choices=["1", "2", "3", "4"],
         default="4",
     )
+    parser.add_argument(
+        "-t",
+        "--token",
+        dest="token",
+        help="gitlab personal token for auth",
+        required=False,
+    )
+    parser.add_argument(
+        "-s",
+        "--ssl",
+        dest="ssl",
+        help="specify whether or not to enable certificate verification",
+        required=False,
+        default=True,
+        type=lambda x: (str(x).lower() not in ["false", "2", "no"]),
+    )
+    parser.add_argument(
+        "--pool-size",
+        dest="pool_size",
+        help="specify the number of pooled keep-alive connections to GitLab",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+    )
+    parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        help="specify the number of result pages to fetch from GitLab in parallel",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--max-retries",
+        dest="max_retries",
+        help="specify how many times a rate limited or failed GitLab request "
+        "is retried",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="specify a directory for caching GitLab data between runs",
+    )
+    parser.add_argument(
+        "--cache-size",
+        dest="cache_size",
+        help="specify the maximum size in MB of cached GitLab responses",
+        type=lambda x: int(float(x) * 1024 * 1024),
+    )
+
+
+def add_logging_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "--log-level",
+        dest="log_level",
+        help="specify the lowest level of messages to log; debug adds "
+        "samples of the GitLab responses",
+        choices=LOG_LEVELS,
+        default="info",
+    )
+    parser.add_argument(
+        "--log-format",
+        dest="log_format",
+        help="specify whether messages are logged as text or as JSON lines",
+        choices=LOG_FORMATS,
+        default="text",
+    )
+
+
+def logging_arguments(args) -> dict:
+    return {"log_level": args.log_level, "log_format": args.log_format}
+
+
+def add_profile_arguments(parser: ArgumentParser):
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        help="report where the run spent its time, as a summary table or as "
+        "OpenTelemetry (OTLP/JSON) spans",
+        choices=PROFILE_FORMATS,
+    )
+    parser.add_argument(
+        "--profile-file",
+        dest="profile_file",
+        help="specify a file to write the profile to instead of stderr",
+    )
+
+
+def profile_arguments(args) -> dict:
+    return {"profile": args.profile, "profile_file": args.profile_file}
+
+
+def gitlab_arguments(args) -> dict:
+    return {
+        "ip_address": args.ip,
+        "api_version": args.api,
+        "token": args.token,
+        "ssl": args.ssl,
+        "pool_size": args.pool_size,
+        "concurrency": args.concurrency,
+        "max_retries": args.max_retries,
+        "cache_dir": args.cache_dir,
+        "cache_size": args.cache_size,
+    }
+
+
+def process_arguments() -> dict:
+    parser = ArgumentParser(prog="changegen")
+    parser.add_argument(
+        "-sy",
+        "--system",
+        dest="system",
+        help="specify system, available options: zpm, zpw",
+        required=True,
+    )
     # parser.add_argument(
     #     dest="group",
     #     help="specify GitLab group",
@@ -50,9 +178,15 @@ def process_arguments() -> dict:
         "-b",
         "--branch",
         dest="branch",
-        help="specify GitLab branches to compare",
+        help="specify the GitLab branch to generate the changelog for",
         required=True,
     )
+    parser.add_argument(
+        "--base-branch",
+        dest="base_branch",
+        help="specify the branch zpm compares --branch with, such as the "
+        "release branch",
+    )
     parser.add_argument(
         "-v",
         "--version",
@@ -60,51 +194,129 @@ def process_arguments() -> dict:
         help="specify version number",
     )
     parser.add_argument(
-        "-t",
-        "--token",
-        dest="token",
-        help="gitlab personal token for auth",
-        required=False,
+        "-sp",
+        "--subproject",
+        dest="sub_project",
+        help="specify project to filter; zpm accepts several separated by "
+        "commas and writes all their changelogs from a single fetch",
     )
     parser.add_argument(
-        "-s",
-        "--ssl",
-        dest="ssl",
-        help="specify whether or not to enable certificate verification",
-        required=False,
-        default=True,
-        type=lambda x: (str(x).lower() not in ["false", "2", "no"]),
+        "--subproject-filter",
+        dest="subproject_filter",
+        help="specify how zpm selects sub-project commits: by commit scope, "
+        "by GitLab path filter, or both",
+        choices=["scope", "path", "both"],
+        default="scope",
     )
     parser.add_argument(
-        "-sp",
-        "--subproject",
-        dest="sub_project",
-        help="specify project to filter",
+        "--subproject-path",
+        dest="subproject_path",
+        help="specify the sub-project directory for the path filter, "
+        "defaults to the sub-project name",
+    )
+
+    parser.add_argument(
+        "--branch-diff",
+        dest="branch_diff",
+        help="specify how zpm selects the commits of one branch missing from "
+        "the other: by commit date, or exactly with the compare endpoint",
+        choices=["date", "compare"],
+        default="date",
+    )
+    parser.add_argument(
+        "--bump-search",
+        dest="bump_search",
+        help="specify how zpw finds the latest bump: by walking the commit "
+        "history, or through the tags API and the compare endpoint",
+        choices=["walk", "tags"],
+        default="walk",
     )
+    parser.add_argument(
+        "--include-issues",
+        dest="include_issues",
+        help="list the issues closed since the last tag and link merge request "
+        "references to the merge requests, fetched alongside the commits",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--source",
+        dest="source",
+        help="specify where commits are read from: a local clone when one is "
+        "given or detected in GitLab CI (auto), the GitLab API or the clone only",
+        choices=["auto", "gitlab", "git"],
+        default="auto",
+    )
+    parser.add_argument(
+        "--repo-path",
+        dest="repo_path",
+        help="specify a local clone of the project to read commits from",
+    )
+
+    add_gitlab_arguments(parser)
+    add_logging_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    if args.system == "zpm" and not (args.base_branch and args.sub_project):
+        parser.error("zpm requires --base-branch and --subproject")
 
     return {
         "system": args.system,
-        "ip_address": args.ip,
-        "api_version": args.api,
         # "project_group": args.group,
         "project": args.project,
         "sub_project": args.sub_project,
+        "subproject_filter": args.subproject_filter,
+        "subproject_path": args.subproject_path,
         "branch": args.branch,
+        "base_branch": args.base_branch,
         "version": args.version,
-        "token": args.token,
-        "ssl": args.ssl,
+        "branch_diff": args.branch_diff,
+        "bump_search": args.bump_search,
+        "include_issues": args.include_issues,
+        "source": args.source,
+        "repo_path": args.repo_path,
+        **gitlab_arguments(args),
+        **logging_arguments(args),
+        **profile_arguments(args),
     }
 
 
 def main():
     cli_args = process_arguments()
+    configure_logging(cli_args["log_level"], cli_args["log_format"])
     generator = None
-    generator = systems[cli_args['system']]()
+    generator = load_generator(cli_args['system'])()
     if not generator:
         return
-    generator.generate_changelog(cli_args)
+    recorder = enable_profiling() if cli_args["profile"] else None
+    try:
+        with span("run", system=cli_args["system"], project=cli_args["project"]):
+            generator.generate_changelog(cli_args)
+    except ChangelogGeneratorError as ex:
+        logger.error(ex)
+        sys.exit(1)
+    finally:
+        log_request_counters()
+        if recorder:
+            write_report(recorder, cli_args["profile"], cli_args["profile_file"])
+
+
+def log_request_counters():
+    # No GitLab client exists unless the client module was loaded
+    client = sys.modules.get("changelog_generator.client")
+    if client is None:
+        return
+    counters = client.request_counters()
+    if counters.get("retries") or counters.get("throttle_seconds"):
+        logger.info(
+            "%d GitLab requests, %d retries (%d rate limited), "
+            "%.1fs throttled, %.1fs backing off",
+            counters["requests"],
+            counters["retries"],
+            counters["rate_limited"],
+            counters["throttle_seconds"],
+            counters["backoff_seconds"],
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+class ChangelogGeneratorError(Exception):
+    """
+    Base class for all errors raised while generating a changelog.
+    """
+
+
+class GitLabAPIError(ChangelogGeneratorError):
+    """
+    Raised when the GitLab API responds with an HTTP error status.
+    """
+
+    def __init__(self, message: str, status_code: int = None, url: str = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.url = url
+
+
+class GitLabConnectionError(ChangelogGeneratorError):
+    """
+    Raised when the GitLab API cannot be reached.
+    """
+
+
+class IncompleteHistoryError(ChangelogGeneratorError):
+    """
+    Raised when a local clone does not hold enough history to answer a
+    query, for instance because it is shallow or lacks the ref.
+    """
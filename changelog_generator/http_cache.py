@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Describe the encoded wire body rather than the decoded body kept here
+_ENCODING_HEADERS = ("content-length", "content-encoding", "transfer-encoding")
+
+
+class ResponseCache:
+    """
+    Size-bounded on-disk store of GitLab responses together with their
+    `ETag` and `Last-Modified` validators. One file is kept per URL and
+    its modification time doubles as the last access time, so the least
+    recently used entries are evicted first once the cache grows beyond
+    `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(
+            self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json"
+        )
+
+    def get(self, key: str) -> dict:
+        path = self._path(key)
+        try:
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key: str, response: requests.Response):
+        entry = {
+            "url": response.url,
+            "headers": _entity_headers(response.headers),
+            "body": response.content.decode(response.encoding or "utf-8"),
+        }
+        with self._lock:
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "w") as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(temporary, self._path(key))
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.debug("Evicting cached response %s", path)
+            os.remove(path)
+            total -= size
+
+
+class MemoryResponseCache:
+    """
+    In-memory counterpart of ResponseCache for a long-running process,
+    bounded by the size of the response bodies it holds and evicting the
+    least recently used entries first.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, response: requests.Response):
+        entry = {
+            "url": response.url,
+            "headers": _entity_headers(response.headers),
+            "body": response.content.decode(response.encoding or "utf-8"),
+        }
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous["body"])
+            self._entries[key] = entry
+            self._size += len(entry["body"])
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted["body"])
+
+
+def validators(entry: dict) -> dict:
+    """
+    Returns the conditional request headers for a cached entry.
+    """
+    headers = CaseInsensitiveDict(entry["headers"])
+    conditions = {}
+    if "ETag" in headers:
+        conditions["If-None-Match"] = headers["ETag"]
+    if "Last-Modified" in headers:
+        conditions["If-Modified-Since"] = headers["Last-Modified"]
+    return conditions
+
+
+def is_cacheable(response: requests.Response) -> bool:
+    return response.status_code == 200 and (
+        "ETag" in response.headers or "Last-Modified" in response.headers
+    )
+
+
+def cached_response(entry: dict, not_modified: requests.Response) -> requests.Response:
+    """
+    Builds the response to hand back for a `304 Not Modified` answer from
+    the cached entry it revalidated.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = entry["url"]
+    response.request = not_modified.request
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.headers.update(_entity_headers(not_modified.headers))
+    response.encoding = "utf-8"
+    response._content = entry["body"].encode("utf-8")
+    return response
+
+
+def _entity_headers(headers) -> dict:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in _ENCODING_HEADERS
+    }
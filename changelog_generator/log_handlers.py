@@ -1,27 +1,116 @@
+import json
 import logging
+import threading
 
-from logging.config import dictConfig
+from collections import Counter
 
+LOG_LEVELS = ["debug", "info", "warning", "error"]
+LOG_FORMATS = ["text", "json"]
+
+# Payloads are cut to this many characters, and lists to their first items
+PAYLOAD_MAX_CHARS = 1000
+PAYLOAD_MAX_ITEMS = 3
+# Only the first of every so many payloads with the same message is logged
+PAYLOAD_SAMPLE_EVERY = 10
 
 logging_config = dict(
     version=1,
+    # Module loggers already exist when the configuration is applied
+    disable_existing_loggers=False,
     formatters={
-        "f": {"format": "%(asctime)s %(name)-12s %(levelname)-8s %(message)s"}
+        "f": {"format": "%(asctime)s %(name)-12s %(levelname)-8s %(message)s"},
+        "json": {"()": "changelog_generator.log_handlers.JsonFormatter"},
     },
     handlers={
         "h": {
             "class": "logging.StreamHandler",
             "formatter": "f",
             "stream": "ext://sys.stdout",
-            "level": logging.DEBUG,
         }
     },
-    root={"handlers": ["h"], "level": logging.DEBUG},
+    root={"handlers": ["h"], "level": logging.INFO},
 )
 
-dictConfig(logging_config)
-
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-logger.debug("Logging initialised...")
+_payloads_seen = Counter()
+_payloads_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single line JSON object, for CI systems that
+    collect structured logs.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class Payload:
+    """
+    Renders a decoded API payload for a log message. The payload is only
+    serialised when the record is formatted, and is truncated to keep
+    log lines short.
+    """
+
+    def __init__(self, payload, max_chars: int = PAYLOAD_MAX_CHARS):
+        self.payload = payload
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        payload = self.payload
+        omitted = ""
+        if isinstance(payload, list) and len(payload) > PAYLOAD_MAX_ITEMS:
+            omitted = f" and {len(payload) - PAYLOAD_MAX_ITEMS} more items"
+            payload = payload[:PAYLOAD_MAX_ITEMS]
+        text = json.dumps(payload, default=str)
+        if len(text) > self.max_chars:
+            text = f"{text[:self.max_chars]}... ({len(text) - self.max_chars} more characters)"
+        return text + omitted
+
+
+def log_payload(log: logging.Logger, message: str, payload, *args):
+    """
+    Logs a truncated API payload at DEBUG level under `message`, a %-style
+    format with `args`. Nothing is done unless DEBUG is enabled, and only
+    one in every PAYLOAD_SAMPLE_EVERY payloads per message is logged.
+    """
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    with _payloads_lock:
+        seen = _payloads_seen[message]
+        _payloads_seen[message] += 1
+    if seen % PAYLOAD_SAMPLE_EVERY == 0:
+        log.debug(f"{message}: %s", *args, Payload(payload))
+
+
+def configure_logging(level: str = "info", log_format: str = "text"):
+    """
+    Sends log records at or above `level` to stdout, as text or as JSON
+    lines. Called by the command line entry points rather than on import,
+    so that importing the package leaves the logging setup of the
+    application using it alone.
+    """
+    from logging.config import dictConfig
+
+    handler = {**logging_config["handlers"]["h"]}
+    if log_format == "json":
+        handler["formatter"] = "json"
+    dictConfig(
+        {
+            **logging_config,
+            "handlers": {"h": handler},
+            "root": {**logging_config["root"], "level": level.upper()},
+        }
+    )
+    logger.debug("Logging initialised...")
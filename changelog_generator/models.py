@@ -0,0 +1,97 @@
+"""
+Typed records for the GitLab data the generators work with.
+"""
+import datetime
+
+from typing import NamedTuple
+
+
+def parse_timestamp(value: str) -> datetime.datetime:
+    """
+    Parses a GitLab ISO-8601 timestamp into a timezone-aware datetime.
+    `datetime.fromisoformat` handles the common forms; anything it
+    rejects on older Pythons (a `Z` suffix, odd fraction lengths) goes
+    through iso8601. Timestamps without an offset are taken as UTC.
+
+    Results are normalised to UTC: aware datetimes sharing one tzinfo
+    compare much faster than ones with differing offsets.
+    """
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        import iso8601
+
+        parsed = iso8601.parse_date(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+class Issue(NamedTuple):
+    title: str
+    closed_at: datetime.datetime
+    iid: int = None
+    web_url: str = None
+
+    @classmethod
+    def from_json(cls, issue: dict) -> "Issue":
+        return cls(
+            issue["title"],
+            parse_timestamp(issue["closed_at"]),
+            issue.get("iid"),
+            issue.get("web_url"),
+        )
+
+
+class MergeRequest(NamedTuple):
+    iid: int
+    title: str
+    web_url: str
+
+    @classmethod
+    def from_json(cls, merge_request: dict) -> "MergeRequest":
+        return cls(merge_request["iid"], merge_request["title"], merge_request["web_url"])
+
+
+class Commit(NamedTuple):
+    """
+    The parts of a GitLab commit the changelog needs. `committed_date`
+    is kept as sent for rendering, `committed_at` is its parsed value.
+    """
+
+    id: str
+    short_id: str
+    title: str
+    message: str
+    committed_date: str
+    committed_at: datetime.datetime
+
+    @classmethod
+    def from_json(cls, commit: dict) -> "Commit":
+        return cls(
+            commit["id"],
+            commit["short_id"],
+            commit["title"],
+            commit["message"],
+            commit["committed_date"],
+            parse_timestamp(commit["committed_date"]),
+        )
+
+    @classmethod
+    def from_push(cls, commit: dict) -> "Commit":
+        """
+        Builds a Commit from an entry of a push webhook payload, which
+        has no short id and gives the committed date as `timestamp`.
+        """
+        return cls(
+            commit["id"],
+            commit["id"][:8],
+            commit["title"],
+            commit["message"],
+            commit["timestamp"],
+            parse_timestamp(commit["timestamp"]),
+        )
+
+
+def parse_commits(page: list) -> list:
+    return [Commit.from_json(commit) for commit in page]
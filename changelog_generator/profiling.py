@@ -0,0 +1,212 @@
+"""
+Timing spans for profiling a changegen run. Spans are only recorded
+after enable_profiling(); otherwise `span` does next to nothing, so the
+instrumentation can stay in place on hot paths.
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+from collections import namedtuple
+from contextlib import contextmanager
+
+PROFILE_FORMATS = ["table", "json"]
+
+Span = namedtuple(
+    "Span", ["name", "span_id", "parent_id", "start_ns", "end_ns", "attributes"]
+)
+
+_recorder = None
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Recorder:
+    """
+    Collects the finished spans of a run from every thread and task.
+    """
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+
+class _OpenSpan:
+    __slots__ = ("span_id", "attributes")
+
+    def __init__(self, attributes: dict):
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+
+
+def enable_profiling() -> Recorder:
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def disable_profiling():
+    global _recorder
+    _recorder = None
+
+
+def recording() -> bool:
+    return _recorder is not None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times the enclosed block as a span named `name`, nested under the span
+    open in the calling context. Yields the span's attribute dict, which
+    the block may add to.
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield attributes
+        return
+    parent = _current.get()
+    opened = _OpenSpan(attributes)
+    token = _current.set(opened)
+    start = time.time_ns()
+    try:
+        yield attributes
+    except BaseException as ex:
+        attributes["error"] = type(ex).__name__
+        raise
+    finally:
+        end = time.time_ns()
+        _current.reset(token)
+        recorder.add(
+            Span(
+                name,
+                opened.span_id,
+                parent.span_id if parent else None,
+                start,
+                end,
+                attributes,
+            )
+        )
+
+
+def annotate(**attributes):
+    """
+    Adds attributes to the innermost open span, if any. This lets lower
+    layers, such as the client's retry loop, report on a span opened by
+    their caller.
+    """
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def format_table(spans: list) -> str:
+    """
+    Summarises spans by name: how often each ran, their total, mean and
+    longest duration, and the bytes and retries of requests.
+    """
+    totals = {}
+    for recorded in spans:
+        summary = totals.setdefault(
+            recorded.name, {"count": 0, "total": 0, "max": 0, "bytes": 0, "retries": 0}
+        )
+        duration = recorded.end_ns - recorded.start_ns
+        summary["count"] += 1
+        summary["total"] += duration
+        summary["max"] = max(summary["max"], duration)
+        summary["bytes"] += recorded.attributes.get("bytes") or 0
+        summary["retries"] += recorded.attributes.get("retries") or 0
+
+    lines = [
+        f"{'span':<12} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} "
+        f"{'bytes':>11} {'retries':>8}"
+    ]
+    for name, summary in sorted(totals.items(), key=lambda item: -item[1]["total"]):
+        lines.append(
+            f"{name:<12} {summary['count']:>6} {summary['total'] / 1e6:>10.1f} "
+            f"{summary['total'] / summary['count'] / 1e6:>9.2f} "
+            f"{summary['max'] / 1e6:>9.2f} {summary['bytes']:>11} "
+            f"{summary['retries']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def format_json(recorder: Recorder) -> str:
+    """
+    Dumps the spans in the OpenTelemetry OTLP/JSON trace format, so they
+    can be loaded by tracing tools.
+    """
+    return json.dumps(
+        {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [_attribute("service.name", "changegen")]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "changelog_generator"},
+                            "spans": [
+                                _otlp_span(recorder.trace_id, recorded)
+                                for recorded in recorder.spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+    )
+
+
+def _otlp_span(trace_id: str, recorded: Span) -> dict:
+    otlp = {
+        "traceId": trace_id,
+        "spanId": recorded.span_id,
+        "name": recorded.name,
+        "kind": 1,
+        "startTimeUnixNano": str(recorded.start_ns),
+        "endTimeUnixNano": str(recorded.end_ns),
+        "attributes": [
+            _attribute(key, value)
+            for key, value in recorded.attributes.items()
+            if value is not None
+        ],
+        # Unset, or error
+        "status": {"code": 2 if "error" in recorded.attributes else 0},
+    }
+    if recorded.parent_id:
+        otlp["parentSpanId"] = recorded.parent_id
+    return otlp
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def write_report(recorder: Recorder, profile_format: str, path: str = None):
+    """
+    Writes the profile of a run as a table or as OTLP/JSON, to `path` or
+    to stderr.
+    """
+    if profile_format == "json":
+        report = format_json(recorder)
+    else:
+        report = format_table(recorder.spans)
+    if path:
+        with open(path, "w") as report_file:
+            report_file.write(report + "\n")
+    else:
+        print(report, file=sys.stderr)
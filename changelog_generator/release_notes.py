@@ -0,0 +1,102 @@
+"""
+The closed issues and merged merge requests of a release, fetched on a
+background thread while the generator fetches the commits.
+"""
+import contextvars
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from changelog_generator.calls import (
+    get_closed_issues_for_project,
+    get_last_tagged_release_date,
+    get_merged_merge_requests,
+)
+from changelog_generator.conventional import parse_title
+from changelog_generator.models import Issue, MergeRequest, parse_timestamp
+from changelog_generator.profiling import span
+
+# `issues` lists the Issues closed since the last tag, `merge_requests`
+# maps the iid of every merge request merged since to its MergeRequest
+ReleaseNotes = namedtuple("ReleaseNotes", ["issues", "merge_requests"])
+
+
+def closed_issues_since(issues: list, released_at: str) -> list:
+    """
+    Returns the Issues among GitLab issue JSON that were closed after
+    `released_at`, or all of them when there was no release yet.
+    """
+    issues = map(Issue.from_json, issues)
+    if released_at is None:
+        return list(issues)
+    # The release date is parsed once rather than for every issue
+    released = parse_timestamp(released_at)
+    return [issue for issue in issues if issue.closed_at > released]
+
+
+def fetch_release_notes(cli_args: dict) -> ReleaseNotes:
+    """
+    Fetches the issues closed and the merge requests merged since the last
+    tagged release. Only those updated since the release are requested.
+    """
+    with span("release_notes"):
+        released_at = get_last_tagged_release_date(cli_args)
+        issues = closed_issues_since(
+            get_closed_issues_for_project(cli_args, released_at), released_at
+        )
+        merge_requests = {
+            merge_request.iid: merge_request
+            for merge_request in map(
+                MergeRequest.from_json, get_merged_merge_requests(cli_args, released_at)
+            )
+        }
+    return ReleaseNotes(issues, merge_requests)
+
+
+def start_release_notes(cli_args: dict) -> dict:
+    """
+    With `include_issues`, starts fetching the release notes on their own
+    thread and returns the CLI arguments with their Future added as
+    `release_notes`, for release_notes() to wait on.
+    """
+    if not cli_args.get("include_issues") or cli_args.get("release_notes"):
+        return cli_args
+    executor = ThreadPoolExecutor(max_workers=1)
+    # The context carries the open span, so the fetch nests under it
+    future = executor.submit(
+        contextvars.copy_context().run, fetch_release_notes, cli_args
+    )
+    executor.shutdown(wait=False)
+    return {**cli_args, "release_notes": future}
+
+
+def release_notes(cli_args: dict) -> ReleaseNotes:
+    """
+    Waits for the release notes started by start_release_notes(), if any.
+    """
+    future = cli_args.get("release_notes")
+    return future.result() if future else None
+
+
+def link_merge_request(title: str, notes: ReleaseNotes) -> str:
+    """
+    Turns the `(!NNN)` reference ending a commit title into a link to the
+    merge request, when it is one of the release's merge requests.
+    """
+    mr = parse_title(title).mr
+    merge_request = notes.merge_requests.get(mr) if notes and mr is not None else None
+    if merge_request is None:
+        return title
+    reference = f"(!{mr})"
+    start = title.rfind(reference)
+    return (
+        f"{title[:start]}([!{mr}]({merge_request.web_url}))"
+        f"{title[start + len(reference):]}"
+    )
+
+
+def format_issue(issue: Issue) -> str:
+    line = f"{issue.closed_at:%Y-%m-%d} - {issue.title}"
+    if issue.iid is not None and issue.web_url:
+        line += f" ([#{issue.iid}]({issue.web_url}))"
+    return line
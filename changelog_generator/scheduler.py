@@ -0,0 +1,150 @@
+"""
+Client-side pacing and retries for GitLab API requests.
+"""
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 60.0
+DEFAULT_BURST = 10
+# Requests held back until a reset are sent this long after it, so that
+# clock skew does not land them at the end of the old window
+RESET_MARGIN = 0.1
+
+
+class RequestScheduler:
+    """
+    Paces requests with a token bucket fed by GitLab's `RateLimit-*`
+    headers, and decides how long to back off before retrying a failed
+    idempotent request. Requests are not throttled until GitLab reports
+    a limit.
+
+    Waits are returned rather than slept, so one scheduler can serve both
+    the threaded and the asyncio clients. It is safe to share between
+    threads.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        burst: int = DEFAULT_BURST,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.burst = burst
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "throttle_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+        # Tokens per second, or None while GitLab has not reported a limit
+        self._rate = None
+        self._tokens = 0.0
+        self._updated = 0.0
+        self._reset_at = None
+
+    def reserve(self) -> float:
+        """
+        Takes a token for one request and returns the number of seconds to
+        wait before sending it.
+        """
+        with self._lock:
+            self.counters["requests"] += 1
+            if self._rate is None:
+                return 0.0
+            now = time.monotonic()
+            if now >= self._reset_at:
+                # A new rate limit window, unknown until the next response
+                self._rate = None
+                return 0.0
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            wait = self._reset_at - now
+            if self._rate > 0:
+                wait = min(wait, -self._tokens / self._rate)
+            self.counters["throttle_seconds"] += wait
+            return wait
+
+    def observe(self, headers):
+        """
+        Spreads the requests GitLab reports as remaining in the current
+        window evenly over the time left until it resets, allowing bursts
+        of up to `burst` requests.
+        """
+        try:
+            remaining = int(headers["RateLimit-Remaining"])
+            reset_in = float(headers["RateLimit-Reset"]) - time.time()
+        except (KeyError, TypeError, ValueError):
+            return
+        if reset_in <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = float(min(self.burst, remaining))
+            self._rate = (remaining - self._tokens) / reset_in
+            self._updated = now
+            self._reset_at = now + reset_in + RESET_MARGIN
+
+    def retry_delay(self, attempt: int, status: int = None, headers=None) -> float:
+        """
+        Returns the number of seconds to wait before retry number
+        `attempt`, or None when the request should not be retried. Pass
+        the `status` and `headers` of a failed response, or neither for
+        a connection error. The delay is drawn with full jitter from an
+        exponentially growing range, and is never shorter than a
+        `Retry-After` or `RateLimit-Reset` GitLab asked for.
+        """
+        if attempt > self.max_retries:
+            return None
+        if status is not None and status not in RETRY_STATUSES:
+            return None
+        delay = random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        )
+        if headers is not None:
+            delay = max(delay, _requested_delay(headers, status))
+        with self._lock:
+            self.counters["retries"] += 1
+            self.counters["rate_limited"] += status == 429
+            self.counters["backoff_seconds"] += delay
+        return delay
+
+
+def _requested_delay(headers, status: int) -> float:
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        import email.utils
+
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after).timestamp()
+            return max(0.0, retry_at - time.time())
+        except (TypeError, ValueError):
+            pass
+    if status == 429 and headers.get("RateLimit-Reset"):
+        try:
+            return max(0.0, float(headers["RateLimit-Reset"]) - time.time())
+        except ValueError:
+            pass
+    return 0.0
@@ -0,0 +1,328 @@
+"""
+A long-running changelog service, for tooling that would otherwise start
+changegen once per changelog. The GitLab connection pool and the commit
+and tag caches stay warm between requests.
+
+    POST /changelog   a project entry as in a batch manifest, answered
+                      with its result record; with "render_only" the
+                      new section is returned instead of written, and
+                      changelogs are only written under the output root
+    POST /webhook     a GitLab push or tag push webhook, which keeps the
+                      commit cache current, see webhooks.py
+    GET /health       liveness, with the GitLab request counters
+"""
+import hmac
+import json
+import logging
+import os
+import socketserver
+import sys
+import threading
+
+from argparse import ArgumentParser
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import webhooks
+from .batch import changelog_paths, check_entry, run_project
+from .commit_cache import DEFAULT_MAX_COMMITS
+from .entry_point import (
+    add_gitlab_arguments,
+    add_logging_arguments,
+    gitlab_arguments,
+    logging_arguments,
+)
+from .exceptions import ChangelogGeneratorError
+from .log_handlers import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8080
+MAX_REQUEST_BYTES = 1024 * 1024
+# Fixed when the service starts, as every request shares its client and
+# caches, or as they would let a request run git or write files anywhere
+SERVICE_FIELDS = (
+    "ip_address",
+    "api_version",
+    "token",
+    "ssl",
+    "pool_size",
+    "max_retries",
+    "cache_dir",
+    "cache_size",
+    "client",
+    "commit_cache",
+    "webhook_secret",
+    "output_root",
+    "repo_path",
+    "source",
+)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class PathLocks:
+    """
+    Serialises the requests writing the same changelog. Two concurrent
+    prepends would both copy the old file and the later rename would drop
+    the other's section.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, paths: list):
+        # Locks are taken in a fixed order, so requests writing several
+        # changelogs cannot deadlock
+        with self._lock:
+            locks = [
+                self._locks.setdefault(path, threading.Lock())
+                for path in sorted(set(paths))
+            ]
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
+
+
+def service_defaults(cli_args: dict) -> dict:
+    """
+    Builds the arguments shared by every request: one pooled GitLab client
+    and, unless a cache directory is given, bounded in-memory response and
+    commit caches in place of the on-disk ones.
+    """
+    from .client import GitLabClient, get_client
+    from .commit_cache import MemoryCommitCache
+    from .http_cache import DEFAULT_MAX_BYTES, MemoryResponseCache
+    from .scheduler import DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE, RequestScheduler
+
+    defaults = dict(cli_args)
+    max_cached_commits = defaults.pop("max_cached_commits", DEFAULT_MAX_COMMITS)
+    if defaults.get("cache_dir"):
+        defaults["client"] = get_client(defaults)
+        return defaults
+
+    max_retries = defaults.get("max_retries")
+    defaults["client"] = GitLabClient(
+        defaults["ip_address"],
+        defaults.get("api_version", "4"),
+        defaults.get("token"),
+        defaults.get("ssl", True),
+        pool_size=defaults.get("pool_size") or DEFAULT_POOL_SIZE,
+        response_cache=MemoryResponseCache(
+            defaults.get("cache_size") or DEFAULT_MAX_BYTES
+        ),
+        scheduler=RequestScheduler(
+            max_retries=DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        ),
+    )
+    defaults["commit_cache"] = MemoryCommitCache(max_cached_commits)
+    return defaults
+
+
+def read_entry(body: bytes, output_root: str = ".") -> dict:
+    """
+    Parses and checks the project entry of a changelog request, raising
+    ChangelogGeneratorError when it is not one the service can run. Its
+    `output_dir` is resolved under `output_root`.
+    """
+    try:
+        entry = json.loads(body)
+    except ValueError as ex:
+        raise ChangelogGeneratorError(f"Request is not valid JSON: {ex}")
+    if not isinstance(entry, dict):
+        raise ChangelogGeneratorError("Request must be a JSON object")
+    fixed = [field for field in SERVICE_FIELDS if field in entry]
+    if fixed:
+        raise ChangelogGeneratorError(
+            f"Request cannot set {', '.join(fixed)}, which the service fixes"
+        )
+    check_entry(entry, "Request")
+    return confine(entry, output_root)
+
+
+def confine(entry: dict, output_root: str) -> dict:
+    """
+    Returns the entry with its `output_dir` resolved under `output_root`,
+    raising ChangelogGeneratorError when a changelog it writes, say through
+    a `sub_project` of "../x", would leave the root.
+    """
+    root = os.path.realpath(output_root)
+    entry = {**entry, "output_dir": os.path.join(root, entry.get("output_dir") or "")}
+    for path in (entry["output_dir"], *changelog_paths(entry)):
+        if os.path.commonpath([root, os.path.realpath(path)]) != root:
+            raise ChangelogGeneratorError(
+                f"Request cannot write {path}, outside the output root"
+            )
+    return entry
+
+
+def make_handler(defaults: dict):
+    path_locks = PathLocks()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self.respond(404, {"message": "Not found"})
+            counters = defaults["client"].scheduler.counters
+            self.respond(200, {"status": "ok", "requests": dict(counters)})
+
+        def do_POST(self):
+            if self.path not in ("/changelog", "/webhook"):
+                return self.respond(404, {"message": "Not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_REQUEST_BYTES:
+                self.close_connection = True
+                return self.respond(413, {"message": "Request too large"})
+            body = self.rfile.read(length)
+            if self.path == "/webhook":
+                return self.receive_webhook(body)
+            try:
+                entry = read_entry(body, defaults.get("output_root") or ".")
+            except ChangelogGeneratorError as ex:
+                return self.respond(400, {"message": str(ex)})
+
+            paths = [] if entry.get("render_only") else changelog_paths(entry)
+            with path_locks.hold([os.path.realpath(path) for path in paths]):
+                result = run_project(entry, defaults)
+            self.respond(200 if result["status"] == "ok" else 500, result)
+
+        def receive_webhook(self, body: bytes):
+            secret = defaults.get("webhook_secret")
+            token = self.headers.get("X-Gitlab-Token") or ""
+            if secret and not hmac.compare_digest(token, secret):
+                return self.respond(401, {"message": "Invalid webhook token"})
+            try:
+                status = webhooks.receive(defaults, json.loads(body))
+            except (ValueError, KeyError, TypeError) as ex:
+                return self.respond(400, {"message": f"Invalid webhook payload: {ex}"})
+            except ChangelogGeneratorError as ex:
+                logger.error(ex)
+                return self.respond(500, {"message": str(ex)})
+            self.respond(200, {"status": status})
+
+        def respond(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Unix socket clients have no address to log
+            logger.info(format, *args)
+
+    return Handler
+
+
+def make_server(
+    defaults: dict,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    socket_path: str = None,
+):
+    """
+    Returns a threaded server for the service, listening on a Unix socket
+    at `socket_path` or else on `host` and `port`.
+    """
+    handler = make_handler(defaults)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def process_arguments(argv: list = None) -> dict:
+    parser = ArgumentParser(prog="changegen-serve")
+    parser.add_argument(
+        "--host",
+        dest="host",
+        help="specify the address to listen on",
+        default="127.0.0.1",
+    )
+    parser.add_argument(
+        "--port",
+        dest="port",
+        help="specify the port to listen on",
+        type=int,
+        default=DEFAULT_PORT,
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        help="specify a Unix socket path to listen on instead of a TCP port",
+    )
+    parser.add_argument(
+        "--max-cached-commits",
+        dest="max_cached_commits",
+        help="specify how many commits are cached in memory, across all "
+        "projects, when no cache directory is given",
+        type=int,
+        default=DEFAULT_MAX_COMMITS,
+    )
+    parser.add_argument(
+        "--output-root",
+        dest="output_root",
+        help="specify the directory changelogs are written under; a "
+        "request's output_dir is relative to it",
+        default=".",
+    )
+    parser.add_argument(
+        "--webhook-secret",
+        dest="webhook_secret",
+        help="specify the secret token GitLab webhooks must send",
+    )
+    add_gitlab_arguments(parser)
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    return {
+        "host": args.host,
+        "port": args.port,
+        "socket": args.socket,
+        "max_cached_commits": args.max_cached_commits,
+        "webhook_secret": args.webhook_secret,
+        "output_root": args.output_root,
+        **gitlab_arguments(args),
+        **logging_arguments(args),
+    }
+
+
+def main():
+    cli_args = process_arguments()
+    configure_logging(cli_args.pop("log_level"), cli_args.pop("log_format"))
+    host, port = cli_args.pop("host"), cli_args.pop("port")
+    socket_path = cli_args.pop("socket")
+    defaults = service_defaults(cli_args)
+    try:
+        server = make_server(defaults, host, port, socket_path)
+    except OSError as ex:
+        logger.error("Cannot listen: %s", ex)
+        sys.exit(1)
+
+    logger.info("Serving changelogs on %s", socket_path or f"http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        defaults["client"].close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Commit sources the calls layer can read history from instead of the
+GitLab API. The API remains the default; a local clone is only used when
+one is configured or detected for the project.
+"""
+import abc
+import logging
+import os
+import shutil
+import subprocess
+
+from changelog_generator.conventional import is_bump
+from changelog_generator.exceptions import (
+    ChangelogGeneratorError,
+    IncompleteHistoryError,
+)
+from changelog_generator.models import Commit, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+
+class CommitSource(abc.ABC):
+    """
+    Interface of a commit history backend. Commits are returned as
+    Commit records, newest first.
+    """
+
+    @abc.abstractmethod
+    def head_commit(self, ref: str) -> Commit:
+        """
+        Returns the newest commit of `ref`.
+        """
+
+    @abc.abstractmethod
+    def commits_since_date(self, date: str, ref: str, path: str = None) -> list:
+        """
+        Returns the commits of `ref` made since `date`, only those touching
+        `path` when given.
+        """
+
+    @abc.abstractmethod
+    def commits_until_latest_bump(self, ref: str) -> list:
+        """
+        Returns the commits of `ref` made after its latest `bump:` commit.
+        """
+
+    @abc.abstractmethod
+    def commits_between(self, base: str, ref: str, path: str = None) -> list:
+        """
+        Returns the commits on `ref` that are not on `base`, only those
+        touching `path` when given.
+        """
+
+
+class GitSource(CommitSource):
+    """
+    Reads history from a local clone by running `git log`. Raises
+    IncompleteHistoryError when the clone cannot answer a query in full,
+    so that callers can fall back to the GitLab API.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def head_commit(self, ref: str) -> Commit:
+        for commit in self._log("-1", self._resolve(ref)):
+            return commit
+        raise IncompleteHistoryError(f"No commits on '{ref}' in {self.path}")
+
+    def commits_since_date(self, date: str, ref: str, path: str = None) -> list:
+        since = parse_timestamp(date)
+        cut = [root for root in self._shallow_roots() if root.committed_at >= since]
+        if cut:
+            raise IncompleteHistoryError(
+                f"Shallow clone {self.path} ends after {date} at {cut[0].short_id}"
+            )
+        args = ["--since", date, self._resolve(ref)]
+        if path:
+            args += ["--", path]
+        return list(self._log(*args))
+
+    def commits_until_latest_bump(self, ref: str) -> list:
+        commits = []
+        for commit in self._log(self._resolve(ref)):
+            if is_bump(commit.title):
+                return commits
+            commits.append(commit)
+        if self._shallow_roots():
+            raise IncompleteHistoryError(
+                f"Shallow clone {self.path} has no bump commit on '{ref}'"
+            )
+        return commits
+
+    def commits_between(self, base: str, ref: str, path: str = None) -> list:
+        if self._shallow_roots():
+            raise IncompleteHistoryError(
+                f"Shallow clone {self.path} may lack the merge base of '{base}' and '{ref}'"
+            )
+        args = [f"{self._resolve(base)}..{self._resolve(ref)}"]
+        if path:
+            args += ["--", path]
+        return list(self._log(*args))
+
+    def _resolve(self, ref: str) -> str:
+        """
+        Returns the commit id for a branch, tag or commit. CI checkouts
+        often only have the remote-tracking branch.
+        """
+        for candidate in (f"refs/heads/{ref}", f"refs/remotes/origin/{ref}", ref):
+            result = self._git("rev-parse", "--verify", "--quiet", f"{candidate}^{{commit}}")
+            if result.returncode == 0:
+                return result.stdout.strip()
+        raise IncompleteHistoryError(f"'{ref}' is not available in {self.path}")
+
+    def _shallow_roots(self) -> list:
+        shallow_file = self._git("rev-parse", "--git-path", "shallow").stdout.strip()
+        shallow_file = os.path.join(self.path, shallow_file)
+        if not os.path.isfile(shallow_file):
+            return []
+        with open(shallow_file) as roots:
+            ids = roots.read().split()
+        return list(self._log("--no-walk", *ids)) if ids else []
+
+    def _git(self, *args) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["git", "-C", self.path, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def _log(self, *args):
+        """
+        Yields the commits of `git log` as they are printed, so that a
+        caller which stops early does not wait for the whole history.
+        """
+        process = subprocess.Popen(
+            ["git", "-C", self.path, "log", "-z", "--format=%H%x1f%cI%x1f%B", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        finished = False
+        try:
+            pending = b""
+            for chunk in iter(lambda: process.stdout.read(READ_SIZE), b""):
+                *records, pending = (pending + chunk).split(b"\0")
+                for record in records:
+                    yield _commit(record)
+            if pending:
+                yield _commit(pending)
+            finished = True
+        finally:
+            if not finished:
+                process.kill()
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            process.wait()
+        if process.returncode:
+            raise ChangelogGeneratorError(
+                f"git log failed in {self.path}: {stderr.decode(errors='replace').strip()}"
+            )
+
+
+def _commit(record: bytes) -> Commit:
+    id, committed_date, message = record.decode(errors="replace").split("\x1f", 2)
+    return Commit(
+        id,
+        id[:8],
+        message.split("\n", 1)[0],
+        message,
+        committed_date,
+        parse_timestamp(committed_date),
+    )
+
+
+def get_commit_source(cli_args: dict) -> CommitSource:
+    """
+    Returns the local commit source for the given CLI arguments, or None
+    when the GitLab API should be used. With the default `auto` source a
+    clone is used when `repo_path` is given, or in GitLab CI when the
+    checked out project is the one being described.
+    """
+    source = cli_args.get("source") or "auto"
+    if source == "gitlab":
+        return None
+
+    path = cli_args.get("repo_path")
+    if not path and os.environ.get("CI_PROJECT_DIR"):
+        if str(cli_args.get("project")) in (
+            os.environ.get("CI_PROJECT_PATH"),
+            os.environ.get("CI_PROJECT_ID"),
+        ):
+            path = os.environ["CI_PROJECT_DIR"]
+    if path and shutil.which("git"):
+        return GitSource(path)
+    if source == "git":
+        raise ChangelogGeneratorError(
+            "The git source needs git and a clone given with --repo-path"
+        )
+    return None
@@ -0,0 +1,383 @@
+"""
+A minimal local stand-in for the GitLab REST API, used by the benchmarks
+and by tests that need a real HTTP server rather than mocks.
+"""
+import datetime
+import hashlib
+import json
+import math
+import re
+import sys
+import threading
+import time
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+
+def make_commits(
+    count: int, bump_every: int = 0, seed: str = "", scopes: tuple = ("core",)
+) -> list:
+    """
+    Builds `count` synthetic commits, newest first, one minute apart.
+    Commits are numbered from the oldest, so `make_commits(n + k)[k:]`
+    equals `make_commits(n)`. When `bump_every` is set every n-th commit
+    is a `bump:` commit, and a different `seed` yields a rewritten history.
+    Commits cycle through `scopes`, each of which stands for a top-level
+    directory of a monorepo.
+    """
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    commits = []
+    for number in range(count, 0, -1):
+        sha = hashlib.sha1(f"{seed}{number}".encode()).hexdigest()
+        date = (start + datetime.timedelta(minutes=number)).isoformat(
+            timespec="milliseconds"
+        )
+        if bump_every and number % bump_every == 0:
+            title = f"bump: version {number}"
+        else:
+            title = f"feat({scopes[number % len(scopes)]}): synthetic change {number}"
+        commits.append(
+            {
+                "id": sha,
+                "short_id": sha[:8],
+                "title": title,
+                "message": f"{title}\n\nBody of change {number}.\n",
+                "created_at": date,
+                "committed_date": date,
+                "authored_date": date,
+                "author_name": "Stub Author",
+                "author_email": "stub@example.com",
+                "parent_ids": [],
+                "web_url": f"http://stub/commit/{sha}",
+            }
+        )
+    return commits
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients drop connections whose streamed body they stop reading
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubGitLab:
+    """
+    Serves a single synthetic project over HTTP/1.1 with keep-alive, and
+    counts the requests and TCP connections it receives.
+
+    `errors` lists failures to answer the next requests with, in order:
+    an HTTP status, "reset" to drop the connection, or None to serve the
+    request normally. `rate_limit` is a (limit, period) pair enforced in
+    fixed windows with GitLab's `RateLimit-*` headers and 429 responses.
+    """
+
+    def __init__(
+        self,
+        commits: list = None,
+        default_per_page: int = 20,
+        totals: bool = True,
+        latency: float = 0.0,
+        branches: dict = None,
+        errors: list = None,
+        rate_limit: tuple = None,
+        tags: dict = None,
+        issues: list = None,
+        merge_requests: list = None,
+    ):
+        self.commits = commits if commits is not None else make_commits(100)
+        # Branch name to the index of its head commit, defaulting to the newest
+        self.branches = branches or {}
+        # Tag name to commit id, defaulting to a tag on every bump commit
+        self.tags = tags
+        self.issues = issues or []
+        self.merge_requests = merge_requests or []
+        self.default_per_page = default_per_page
+        self.latency = latency
+        # GitLab omits X-Total/X-Total-Pages on very large collections
+        self.totals = totals
+        self.requests = 0
+        self.connections = 0
+        self.not_modified = 0
+        self.errors = deque(errors or [])
+        self.rate_limit = rate_limit
+        self.rate_limited = 0
+        self._window = None
+        self._window_requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, attribute: str):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def admit(self):
+        """
+        Returns the injected failure for the next request, if any, and
+        the rate limit headers to send with it.
+        """
+        with self._lock:
+            if self.errors:
+                error = self.errors.popleft()
+                if error is not None:
+                    return error, {"Retry-After": "0"} if error == 429 else {}
+            if not self.rate_limit:
+                return None, {}
+            limit, period = self.rate_limit
+            now = time.time()
+            window = now - now % period
+            if window != self._window:
+                self._window, self._window_requests = window, 0
+            self._window_requests += 1
+            headers = {
+                "RateLimit-Limit": str(limit),
+                "RateLimit-Remaining": str(max(0, limit - self._window_requests)),
+                "RateLimit-Reset": str(math.ceil(window + period)),
+            }
+            if self._window_requests <= limit:
+                return None, headers
+            self.rate_limited += 1
+            retry_after = max(1, math.ceil(window + period - now))
+            return 429, {**headers, "Retry-After": str(retry_after)}
+
+    def route(self, path: str, query: dict):
+        """
+        Returns a (status, body, headers) tuple for a request path.
+        """
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        # api, v4, projects, <id>, ...
+        resource = "/".join(parts[4:])
+        if resource.startswith("repository/branches/"):
+            head = self.commits[self.branches.get(parts[-1], 0)]
+            return 200, {"name": parts[-1], "commit": head}, {}
+        if resource == "repository/tags":
+            return self.paginate(self.list_tags(), path, query)
+        if resource == "repository/compare":
+            return self.compare(query)
+        if resource == "issues":
+            return self.paginate(self.filter_by_state(self.issues, query), path, query)
+        if resource == "merge_requests":
+            return self.paginate(
+                self.filter_by_state(self.merge_requests, query), path, query
+            )
+        if resource == "repository/commits":
+            return self.list_commits(path, query)
+        if resource == "repository/merge_base":
+            return self.merge_base(query)
+        return 404, {"message": "404 Not Found"}, {}
+
+    def list_commits(self, path: str, query: dict):
+        commits = self.commits
+        # Query dates are normalised once, not for every commit
+        if "since" in query:
+            since = _normalise(query["since"])
+            commits = [c for c in commits if c["created_at"] >= since]
+        if "until" in query:
+            until = _normalise(query["until"])
+            commits = [c for c in commits if c["created_at"] <= until]
+        if "path" in query:
+            directory = query["path"].strip("/").split("/")[0]
+            commits = [c for c in commits if _scope(c["title"]) == directory]
+        return self.paginate(commits, path, query)
+
+    def filter_by_state(self, items: list, query: dict) -> list:
+        if "state" in query:
+            items = [item for item in items if item["state"] == query["state"]]
+        if "updated_after" in query:
+            after = _normalise(query["updated_after"])
+            items = [item for item in items if _normalise(item["updated_at"]) >= after]
+        return items
+
+    def list_tags(self) -> list:
+        """
+        Returns the tags newest first, like GitLab's default ordering by
+        update time.
+        """
+        if self.tags is not None:
+            by_id = {commit["id"]: commit for commit in self.commits}
+            return [
+                {"name": name, "commit": by_id[commit_id]}
+                for name, commit_id in self.tags.items()
+            ]
+        tags = [
+            {"name": f"v{len(self.commits) - index}", "commit": commit}
+            for index, commit in enumerate(self.commits)
+            if commit["title"].startswith("bump:")
+        ]
+        return tags or [{"name": "v1.0.0", "commit": self.commits[-1]}]
+
+    def compare(self, query: dict):
+        """
+        Returns the commits reachable from `to` but not from `from`, oldest
+        first. Diffs are left out.
+        """
+        positions = self.positions()
+        start, end = positions.get(query.get("from")), positions.get(query.get("to"))
+        if start is None or end is None:
+            return 404, {"message": "404 Ref Not Found"}, {}
+        excluded = self.reachable(start)
+        return 200, {
+            "commit": self.commits[end],
+            "commits": [
+                self.commits[index]
+                for index in sorted(self.reachable(end) - excluded, reverse=True)
+            ],
+            "diffs": [],
+            "compare_timeout": False,
+            "compare_same_ref": start == end,
+        }, {}
+
+    def merge_base(self, query: dict):
+        """
+        Returns the newest commit reachable from every ref.
+        """
+        positions = {commit["id"]: index for index, commit in enumerate(self.commits)}
+        refs = query.get("refs[]", [])
+        if not refs or any(ref not in positions for ref in refs):
+            return 404, {"message": "404 Commit Not Found"}, {}
+        common = set.intersection(*(self.reachable(positions[ref]) for ref in refs))
+        return 200, self.commits[min(common)], {}
+
+    def positions(self) -> dict:
+        """
+        Maps commit ids and branch names to their index in `commits`.
+        """
+        positions = {commit["id"]: index for index, commit in enumerate(self.commits)}
+        for name, index in self.branches.items():
+            positions.setdefault(name, index)
+        positions.setdefault("master", 0)
+        return positions
+
+    def reachable(self, index: int) -> set:
+        """
+        Returns the indexes of the commits reachable from the commit at
+        `index`. A commit without `parent_ids` has the next commit in the
+        list as its parent, so a plain list of commits is a linear history.
+        """
+        if not any(commit["parent_ids"] for commit in self.commits):
+            return set(range(index, len(self.commits)))
+        positions = {commit["id"]: index for index, commit in enumerate(self.commits)}
+        seen = set()
+        pending = [index]
+        while pending:
+            index = pending.pop()
+            if index in seen:
+                continue
+            seen.add(index)
+            parents = self.commits[index]["parent_ids"]
+            if parents:
+                pending.extend(positions[parent] for parent in parents)
+            elif index + 1 < len(self.commits):
+                pending.append(index + 1)
+        return seen
+
+    def paginate(self, items: list, path: str, query: dict):
+        """
+        Slices a collection the way GitLab's offset pagination does and
+        returns the matching `X-*` and `Link` headers.
+        """
+        per_page = min(int(query.get("per_page", self.default_per_page)), 100)
+        page = int(query.get("page", 1))
+        total_pages = max(1, -(-len(items) // per_page))
+        headers = {
+            "X-Page": str(page),
+            "X-Per-Page": str(per_page),
+            "X-Prev-Page": str(page - 1) if page > 1 else "",
+            "X-Next-Page": str(page + 1) if page < total_pages else "",
+        }
+        if self.totals:
+            headers["X-Total"] = str(len(items))
+            headers["X-Total-Pages"] = str(total_pages)
+        if page < total_pages:
+            next_query = urlencode({**query, "page": page + 1})
+            headers["Link"] = f'<{self.url}{path}?{next_query}>; rel="next"'
+        return 200, items[(page - 1) * per_page:page * per_page], headers
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub._count("connections")
+
+            def do_GET(self):
+                stub._count("requests")
+                if stub.latency:
+                    time.sleep(stub.latency)
+                error, limit_headers = stub.admit()
+                if error == "reset":
+                    self.close_connection = True
+                    return
+                if error:
+                    status, body, headers = error, {"message": f"{error}"}, {}
+                else:
+                    url = urlparse(self.path)
+                    query = {
+                        key: values if key.endswith("[]") else values[-1]
+                        for key, values in parse_qs(url.query).items()
+                    }
+                    status, body, headers = stub.route(url.path, query)
+                headers = {**headers, **limit_headers}
+                payload = json.dumps(body).encode()
+                if status == 200:
+                    etag = f'W/"{hashlib.sha1(payload).hexdigest()}"'
+                    headers = {**headers, "ETag": etag}
+                    if self.headers.get("If-None-Match") == etag:
+                        stub._count("not_modified")
+                        status, payload = 304, b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _normalise(date: str) -> str:
+    """
+    Converts a query date into the stub's own ISO-8601 representation so
+    that dates can be compared as strings.
+    """
+    parsed = datetime.datetime.fromisoformat(date.replace("Z", "+00:00"))
+    return parsed.astimezone(datetime.timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _scope(title: str) -> str:
+    match = re.match(r"^[^(:]+\(([^)]+)\)", title)
+    return match.group(1) if match else None
@@ -0,0 +1,29 @@
+import asyncio
+import unittest
+
+from changelog_generator.exceptions import GitLabAPIError
+from changelog_generator.tests.stub_gitlab import StubGitLab
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+else:
+    from changelog_generator import async_calls
+    from changelog_generator.async_client import AsyncGitLabClient
+
+
+@unittest.skipUnless(httpx, "requires the async extra")
+class TestAsyncCalls(unittest.TestCase):
+    def test_http_error_raises_typed_exception(self):
+        async def call(url):
+            async with AsyncGitLabClient(url) as client:
+                await async_calls.request(
+                    "/projects/1/unknown", {"async_client": client}, "test"
+                )
+
+        with StubGitLab() as stub:
+            with self.assertRaises(GitLabAPIError) as context:
+                asyncio.run(call(stub.url))
+
+        self.assertEqual(context.exception.status_code, 404)
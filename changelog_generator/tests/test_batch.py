@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import unittest
+
+from changelog_generator.batch import load_manifest, run_batch
+from changelog_generator.exceptions import ChangelogGeneratorError
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_manifest(self, manifest):
+        path = os.path.join(self.directory.name, "manifest.json")
+        with open(path, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        return path
+
+    def test_load_manifest(self):
+        manifest = [{"project": "a", "branch": "master", "system": "zpw"}]
+
+        self.assertEqual(load_manifest(self.write_manifest(manifest)), manifest)
+        self.assertEqual(
+            load_manifest(self.write_manifest({"projects": manifest})), manifest
+        )
+
+    def test_load_manifest_invalid(self):
+        with self.assertRaises(ChangelogGeneratorError):
+            load_manifest(self.write_manifest([{"project": "a", "system": "zpw"}]))
+        with self.assertRaises(ChangelogGeneratorError):
+            load_manifest(
+                self.write_manifest(
+                    [{"project": "a", "branch": "master", "system": "unknown"}]
+                )
+            )
+
+    def test_load_manifest_zpm_fields(self):
+        entry = {"project": "a", "branch": "master", "system": "zpm", "sub_project": "api"}
+
+        with self.assertRaisesRegex(ChangelogGeneratorError, "base_branch"):
+            load_manifest(self.write_manifest([entry]))
+        entry["base_branch"] = "release"
+        self.assertEqual(load_manifest(self.write_manifest([entry])), [entry])
+
+    def test_load_manifest_same_changelog(self):
+        manifest = [
+            {"project": "a", "branch": "master", "system": "zpw"},
+            {"project": "b", "branch": "master", "system": "zpw", "output_dir": "."},
+        ]
+
+        with self.assertRaisesRegex(ChangelogGeneratorError, "entries 0 and 1"):
+            load_manifest(self.write_manifest(manifest))
+        manifest[1]["output_dir"] = "b"
+        self.assertEqual(load_manifest(self.write_manifest(manifest)), manifest)
+
+    def test_run_batch_zpm(self):
+        os.mkdir(os.path.join(self.directory.name, "core"))
+        manifest = [
+            {
+                "project": "monorepo",
+                "branch": "master",
+                "base_branch": "release",
+                "system": "zpm",
+                "sub_project": "core",
+                "version": "1.0.0",
+                "branch_diff": "compare",
+                "output_dir": self.directory.name,
+            }
+        ]
+
+        with StubGitLab(make_commits(50), branches={"release": 20}) as stub:
+            (result,) = run_batch(
+                manifest, {"ip_address": stub.url, "api_version": "4", "ssl": True}
+            )
+
+        self.assertEqual(result["status"], "ok", result["message"])
+        with open(os.path.join(self.directory.name, "core", "CHANGELOG.md")) as changelog:
+            self.assertEqual(changelog.read().count("synthetic change"), 20)
+
+    def test_run_batch(self):
+        manifest = []
+        for name in ("one", "two", "three"):
+            os.mkdir(os.path.join(self.directory.name, name))
+            manifest.append(
+                {
+                    "project": name,
+                    "branch": "master",
+                    "system": "zpw",
+                    "output_dir": os.path.join(self.directory.name, name),
+                }
+            )
+        manifest.append(
+            {
+                "project": "unreachable",
+                "branch": "master",
+                "system": "zpw",
+                "ip_address": "http://127.0.0.1:1",
+                "max_retries": 0,
+            }
+        )
+
+        with StubGitLab(make_commits(50, bump_every=40)) as stub:
+            results = run_batch(
+                manifest,
+                {"ip_address": stub.url, "api_version": "4", "ssl": True},
+                workers=2,
+            )
+
+            self.assertLessEqual(stub.connections, 2)
+        self.assertEqual(
+            [result["status"] for result in results], ["ok", "ok", "ok", "failed"]
+        )
+        for name in ("one", "two", "three"):
+            with open(os.path.join(self.directory.name, name, "CHANGELOG.md")) as changelog:
+                self.assertEqual(changelog.read().count("synthetic change"), 10)
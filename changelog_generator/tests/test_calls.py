@@ -1,19 +1,59 @@
+import json
 import mock
 import requests
 import unittest
 
 from changelog_generator.calls import (
+    get_commits_between_branches,
     get_last_commit_date,
     get_last_tagged_release_date,
     get_closed_issues_for_project,
     get_commits_since_date,
+    get_commits_until_latest_bump,
+    iter_pages,
 )
+from changelog_generator.client import GitLabClient
+from changelog_generator.exceptions import GitLabAPIError, GitLabConnectionError
+from changelog_generator.models import Commit
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def page_response(items, links=None, headers=None):
+    body = json.dumps(items).encode()
+    response = mock.Mock()
+    response.json.return_value = items
+    # Streamed pages arrive in small chunks that split JSON tokens
+    response.iter_content.side_effect = lambda size: (
+        body[index:index + 7] for index in range(0, len(body), 7)
+    )
+    response.links = links or {}
+    response.headers = headers or {}
+    return response
+
+
+def iter_then_raise(chunks, error):
+    yield from chunks
+    raise error
+
+
+def commit_json(id, title, committed_date):
+    return {
+        "id": id,
+        "short_id": id,
+        "title": title,
+        "message": title,
+        "committed_date": committed_date,
+    }
 
 
 class TestCalls(unittest.TestCase):
-    @mock.patch("sys.exit")
-    @mock.patch("changelog_generator.calls.requests.get")
-    def test_unsuccessful_get_last_commit_date(self, mock_get, mock_exit):
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_unsuccessful_get_last_commit_date(self, mock_get):
         mock_response = mock.Mock()
         mock_response.raise_for_status.side_effect = (
             requests.exceptions.HTTPError()
@@ -32,15 +72,13 @@ class TestCalls(unittest.TestCase):
             "ssl": "True",
         }
 
-        try:
+        with self.assertRaises(GitLabAPIError):
             get_last_commit_date(cli_args)
-        except Exception:
-            self.assertEqual(mock_exit.called, True)
 
-    @mock.patch("changelog_generator.calls.requests.get")
+    @mock.patch("changelog_generator.client.requests.Session.get")
     def test_get_last_commit_date(self, mock_get):
         mock_get.return_value.json.return_value = {
-            "committed_date": "2018-06-10T14:01:44.000+00:00"
+            "commit": {"committed_date": "2018-06-10T14:01:44.000+00:00"}
         }
 
         cli_args = {
@@ -56,11 +94,10 @@ class TestCalls(unittest.TestCase):
         }
 
         commit_date = get_last_commit_date(cli_args)
-        self.assertEqual(commit_date, "2018-06-10T14:01:44.000001")
+        self.assertEqual(commit_date, "2018-06-10T14:01:45+00:00")
 
-    @mock.patch("sys.exit")
-    @mock.patch("changelog_generator.calls.requests.get")
-    def test_unsuccessful_commits_since_date(self, mock_get, mock_exit):
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_unsuccessful_commits_since_date(self, mock_get):
         mock_response = mock.Mock()
         mock_response.raise_for_status.side_effect = (
             requests.exceptions.HTTPError()
@@ -79,23 +116,21 @@ class TestCalls(unittest.TestCase):
             "ssl": "True",
         }
 
-        try:
+        with self.assertRaises(GitLabAPIError):
             get_commits_since_date("2018-06-10T14:01:45.000000+00:00", cli_args)
-        except Exception:
-            self.assertEqual(mock_exit.called, True)
 
-    @mock.patch("changelog_generator.calls.requests.get")
+    @mock.patch("changelog_generator.client.requests.Session.get")
     def test_commits_since_date(self, mock_get):
-        mock_get.return_value.json.return_value = [
-            {
-                "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
-                "committed_date": "2018-06-10T14:01:44.000+00:00",
-            },
-            {
-                "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
-                "committed_date": "2018-06-10T14:01:44.000+00:00",
-            },
-        ]
+        commit = {
+            "id": "a1",
+            "short_id": "a1",
+            "title": "feat: Add a thing",
+            "message": "feat: Add a thing",
+            "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
+            "created_at": "2018-06-10T14:01:44.000+00:00",
+            "committed_date": "2018-06-10T14:01:44.000+00:00",
+        }
+        mock_get.return_value = page_response([commit, commit])
 
         cli_args = {
             "ip_address": "localhost",
@@ -112,45 +147,40 @@ class TestCalls(unittest.TestCase):
         commits = get_commits_since_date(
             "2018-06-10T14:01:45.000000+00:00", cli_args
         )
-        [
-            self.assertEqual(
-                commit,
-                {
-                    "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
-                    "committed_date": "2018-06-10T14:01:44.000+00:00",
-                },
-            )
-            for commit in commits
-        ]
 
-    @mock.patch("changelog_generator.calls.requests.get")
-    def test_get_closed_issues_for_project(self, mock_get):
+        self.assertEqual(commits, [Commit.from_json(commit)])
 
-        mock_get.return_value.json.return_value = [
+    def test_get_closed_issues_for_project(self):
+        issues = [
             {
-                "closed_at": "2018-06-10T14:01:44.000+00:00",
-                "title": "A Closed Issue",
+                "iid": number,
+                "title": f"Issue {number}",
+                "state": "closed" if number % 10 else "opened",
+                "closed_at": f"2018-06-{number % 28 + 1:02}T14:01:44.000+00:00",
+                "updated_at": f"2018-06-{number % 28 + 1:02}T14:01:44.000+00:00",
             }
+            for number in range(1, 501)
         ]
+        with StubGitLab(issues=issues) as stub:
+            cli_args = {"ip_address": stub.url, "project": "test-project"}
 
-        cli_args = {
-            "ip_address": "localhost",
-            "api_version": "4",
-            "project_group": "test-group",
-            "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
-            "version": "1",
-            "changelog": "N",
-            "ssl": "True",
-        }
+            closed = get_closed_issues_for_project(cli_args)
+            self.assertEqual(stub.requests, 5)
+            recent = get_closed_issues_for_project(
+                cli_args, "2018-06-20T00:00:00.000+00:00"
+            )
 
+        self.assertEqual(len(closed), 450)
         self.assertEqual(
-            mock_get.return_value.json.return_value,
-            get_closed_issues_for_project(cli_args),
+            sorted(issue["iid"] for issue in recent),
+            sorted(
+                issue["iid"]
+                for issue in issues
+                if issue["state"] == "closed" and issue["updated_at"] >= "2018-06-20"
+            ),
         )
 
-    @mock.patch("changelog_generator.calls.requests.get")
+    @mock.patch("changelog_generator.client.requests.Session.get")
     def test_get_last_tagged_release_date(self, mock_get):
         mock_get.return_value.json.return_value = [
             {
@@ -177,3 +207,251 @@ class TestCalls(unittest.TestCase):
             "2018-06-10T14:01:44.000+00:00",
             get_last_tagged_release_date(cli_args),
         )
+
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_iter_pages_follows_next_headers(self, mock_get):
+        mock_get.side_effect = [
+            page_response([{"id": 1}], headers={"X-Next-Page": "2"}),
+            page_response(
+                [{"id": 2}], links={"next": {"url": "http://localhost/next"}}
+            ),
+            page_response([{"id": 3}]),
+        ]
+
+        cli_args = {
+            "ip_address": "http://localhost",
+            "api_version": "4",
+            "ssl": True,
+        }
+
+        pages = [
+            list(page)
+            for page in iter_pages("/projects/1/repository/commits", cli_args, "test")
+        ]
+
+        self.assertEqual(pages, [[{"id": 1}], [{"id": 2}], [{"id": 3}]])
+        self.assertEqual(
+            mock_get.call_args_list[1][1]["params"], {"per_page": 100, "page": "2"}
+        )
+        self.assertEqual(mock_get.call_args_list[2][0][0], "http://localhost/next")
+
+    @unittest.skipUnless(ijson, "requires the stream extra")
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_iter_pages_streams_items(self, mock_get):
+        response = page_response([{"id": 1}, {"id": 2}, {"id": 3}])
+        mock_get.return_value = response
+
+        cli_args = {"ip_address": "http://localhost", "api_version": "4"}
+        page = next(iter_pages("/projects/1/repository/commits", cli_args, "test"))
+
+        self.assertEqual(next(page), {"id": 1})
+        self.assertEqual(mock_get.call_args[1]["stream"], True)
+        response.json.assert_not_called()
+        response.close.assert_not_called()
+
+        self.assertEqual(list(page), [{"id": 2}, {"id": 3}])
+        response.close.assert_called_once()
+
+    @unittest.skipUnless(ijson, "requires the stream extra")
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_iter_pages_broken_stream(self, mock_get):
+        reset = page_response([{"id": 1}, {"id": 2}])
+        reset.iter_content.side_effect = lambda size: iter_then_raise(
+            [b'[{"id": 1}, {"i'], requests.exceptions.ChunkedEncodingError()
+        )
+        truncated = page_response([{"id": 1}, {"id": 2}])
+        truncated.iter_content.side_effect = lambda size: iter([b'[{"id": 1}, {"i'])
+        mock_get.side_effect = [reset, truncated]
+
+        cli_args = {"ip_address": "http://localhost", "api_version": "4"}
+        with self.assertRaises(GitLabConnectionError):
+            list(next(iter_pages("/projects/1/repository/commits", cli_args, "test")))
+        with self.assertRaises(GitLabAPIError):
+            list(next(iter_pages("/projects/1/repository/commits", cli_args, "test")))
+        reset.close.assert_called_once()
+        truncated.close.assert_called_once()
+
+    @mock.patch("changelog_generator.calls.ijson", None)
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_iter_pages_without_ijson(self, mock_get):
+        mock_get.return_value = page_response([{"id": 1}])
+
+        cli_args = {"ip_address": "http://localhost", "api_version": "4"}
+        pages = list(iter_pages("/projects/1/repository/commits", cli_args, "test"))
+
+        self.assertEqual(pages, [[{"id": 1}]])
+        self.assertEqual(mock_get.call_args[1]["stream"], False)
+
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_commits_until_latest_bump_stops_paging(self, mock_get):
+        mock_get.side_effect = [
+            page_response(
+                [
+                    commit_json("b", "feat: second", "2018-06-10T14:01:45.000+00:00"),
+                    commit_json("a", "fix: first", "2018-06-10T14:01:44.000+00:00"),
+                ],
+                headers={"X-Next-Page": "2"},
+            ),
+            page_response(
+                [commit_json("c", "bump: version 1.0.0", "2018-06-10T14:01:43.000+00:00")],
+                headers={"X-Next-Page": "3"},
+            ),
+        ]
+
+        cli_args = {
+            "ip_address": "http://localhost",
+            "api_version": "4",
+            "project": "test-project",
+            "branch": "master",
+            "ssl": True,
+        }
+
+        commits = get_commits_until_latest_bump(cli_args)
+
+        self.assertEqual([commit.id for commit in commits], ["a", "b"])
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch("changelog_generator.client.time.sleep")
+    @mock.patch("changelog_generator.client.requests.Session.get")
+    def test_connection_error(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.exceptions.ConnectionError()
+
+        cli_args = {
+            "ip_address": "localhost",
+            "api_version": "4",
+            "project": "test-project",
+            "ssl": "True",
+        }
+
+        with self.assertRaises(GitLabConnectionError):
+            get_last_tagged_release_date(cli_args)
+        # The first attempt and five retries
+        self.assertEqual(mock_get.call_count, 6)
+        self.assertEqual(mock_sleep.call_count, 5)
+
+
+class TestConcurrentPaging(unittest.TestCase):
+    def cli_args(self, stub, concurrency):
+        return {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "test-project",
+            "branch_two": "master",
+            "ssl": True,
+            "concurrency": concurrency,
+            "client": GitLabClient(stub.url, pool_size=concurrency),
+        }
+
+    def test_concurrent_pages_in_order(self):
+        commits = make_commits(450)
+        with StubGitLab(commits) as stub:
+            result = get_commits_since_date(
+                "2000-01-01T00:00:00+00:00", self.cli_args(stub, 4)
+            )
+
+            self.assertEqual(stub.requests, 5)
+        self.assertEqual(
+            [commit.id for commit in result], [commit["id"] for commit in commits]
+        )
+
+    def test_falls_back_to_serial_without_totals(self):
+        commits = make_commits(250)
+        with StubGitLab(commits, totals=False) as stub:
+            result = get_commits_since_date(
+                "2000-01-01T00:00:00+00:00", self.cli_args(stub, 4)
+            )
+
+            self.assertEqual(stub.requests, 3)
+        self.assertEqual(len(result), 250)
+
+
+class TestBumpSearch(unittest.TestCase):
+    def cli_args(self, stub, bump_search="tags"):
+        return {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "test-project",
+            "branch": "master",
+            "ssl": True,
+            "source": "gitlab",
+            "bump_search": bump_search,
+            "client": GitLabClient(stub.url),
+        }
+
+    def test_tags_search_uses_constant_requests(self):
+        commits = make_commits(2500, bump_every=1000)
+        with StubGitLab(commits) as stub:
+            walked = get_commits_until_latest_bump(self.cli_args(stub, "walk"))
+            walk_requests = stub.requests
+            searched = get_commits_until_latest_bump(self.cli_args(stub))
+
+            # Branch, tags, merge base and compare
+            self.assertEqual(stub.requests - walk_requests, 4)
+        self.assertGreater(walk_requests, 4)
+        self.assertEqual(len(searched), 500)
+        self.assertEqual(searched, walked)
+
+    def test_tags_search_stops_at_untagged_bump(self):
+        commits = make_commits(2500, bump_every=1000)
+        # Only the older bump, commit 1000, is tagged
+        with StubGitLab(commits, tags={"v1": commits[1500]["id"]}) as stub:
+            result = get_commits_until_latest_bump(self.cli_args(stub))
+        self.assertEqual(len(result), 500)
+        self.assertEqual(result[0].id, commits[499]["id"])
+
+    def test_tags_search_skips_tags_off_the_branch(self):
+        commits = make_commits(300, bump_every=100)
+        branches = {"master": 50}
+        with StubGitLab(commits, branches=branches) as stub:
+            result = get_commits_until_latest_bump(self.cli_args(stub))
+        # The bump at commit 300 is newer than the branch head
+        self.assertEqual(len(result), 50)
+        self.assertEqual(result[-1].id, commits[50]["id"])
+
+    def test_tags_search_falls_back_to_walk(self):
+        commits = make_commits(250, bump_every=100)
+        with StubGitLab(commits, tags={}) as stub:
+            result = get_commits_until_latest_bump(self.cli_args(stub))
+
+            # Branch and tags, then the pages up to the bump at commit 200
+            self.assertEqual(stub.requests, 3)
+        self.assertEqual(len(result), 50)
+
+
+class TestBranchDiff(unittest.TestCase):
+    def cli_args(self, stub):
+        return {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "test-project",
+            "branch_one": "release",
+            "branch_two": "master",
+            "ssl": True,
+            "source": "gitlab",
+            "client": GitLabClient(stub.url),
+        }
+
+    def test_compare_takes_one_request(self):
+        commits = make_commits(1000)
+        with StubGitLab(commits, branches={"release": 600}) as stub:
+            result = get_commits_between_branches(self.cli_args(stub))
+
+            self.assertEqual(stub.requests, 1)
+        self.assertEqual(
+            [commit.id for commit in result], [commit["id"] for commit in commits[:600]]
+        )
+
+    def test_compare_without_ijson(self):
+        commits = make_commits(50)
+        with StubGitLab(commits, branches={"release": 20}) as stub:
+            with mock.patch("changelog_generator.calls.ijson", None):
+                result = get_commits_between_branches(self.cli_args(stub))
+        self.assertEqual(len(result), 20)
+        self.assertEqual(result[0].id, commits[0]["id"])
+
+    def test_unknown_branch(self):
+        with StubGitLab() as stub:
+            cli_args = {**self.cli_args(stub), "branch_one": "missing"}
+            with self.assertRaises(GitLabAPIError) as raised:
+                get_commits_between_branches(cli_args)
+        self.assertEqual(raised.exception.status_code, 404)
@@ -0,0 +1,35 @@
+import unittest
+
+from changelog_generator.client import GitLabClient, close_clients, get_client
+
+
+class TestClient(unittest.TestCase):
+    def tearDown(self):
+        close_clients()
+
+    def test_session_configured_once(self):
+        client = GitLabClient("http://localhost", "4", "test-token", False, pool_size=3)
+
+        self.assertEqual(client.base_url, "http://localhost/api/v4")
+        self.assertEqual(client.session.headers["PRIVATE-TOKEN"], "test-token")
+        self.assertEqual(client.session.verify, False)
+        adapter = client.session.get_adapter("https://localhost")
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_get_client_shared(self):
+        cli_args = {
+            "ip_address": "http://localhost",
+            "api_version": "4",
+            "token": "test-token",
+            "ssl": True,
+        }
+
+        self.assertIs(get_client(cli_args), get_client(dict(cli_args)))
+        self.assertIsNot(
+            get_client(cli_args), get_client({**cli_args, "token": "other"})
+        )
+
+    def test_get_client_explicit(self):
+        client = GitLabClient("http://localhost")
+
+        self.assertIs(get_client({"ip_address": "x", "client": client}), client)
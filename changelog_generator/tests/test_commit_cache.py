@@ -0,0 +1,210 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from changelog_generator.calls import (
+    get_commits_since_date,
+    get_commits_until_latest_bump,
+)
+from changelog_generator.client import GitLabClient
+from changelog_generator.commit_cache import (
+    CommitCache,
+    MemoryCommitCache,
+    cache_key,
+    get_commit_cache,
+)
+from changelog_generator.models import parse_commits
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+class TestCommitCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = CommitCache(os.path.join(self.directory.name, "commits.sqlite"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_replace_and_prepend(self):
+        commits = parse_commits(make_commits(5))
+
+        self.cache.replace("p", "master", commits[2:], complete=True)
+        self.cache.prepend("p", "master", commits[:2])
+
+        self.assertEqual(self.cache.head("p", "master"), commits[0].id)
+        self.assertTrue(self.cache.is_complete("p", "master"))
+        self.assertEqual(
+            self.cache.commits("p", "master"), commits
+        )
+
+    def test_invalidate(self):
+        self.cache.replace("p", "master", parse_commits(make_commits(3)))
+        self.cache.invalidate("p", "master")
+
+        self.assertIsNone(self.cache.head("p", "master"))
+        self.assertEqual(self.cache.commits("p", "master"), [])
+
+
+class TestGetCommitCache(unittest.TestCase):
+    def test_one_cache_per_directory_across_threads(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cli_args = {"cache_dir": directory.name}
+        barrier = threading.Barrier(8)
+        caches = []
+
+        def open_cache():
+            barrier.wait()
+            caches.append(get_commit_cache(cli_args))
+
+        threads = [threading.Thread(target=open_cache) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.addCleanup(caches[0].close)
+
+        self.assertEqual(len({id(cache) for cache in caches}), 1)
+
+
+class TestMemoryCommitCache(unittest.TestCase):
+    def test_replace_and_prepend(self):
+        cache = MemoryCommitCache()
+        commits = parse_commits(make_commits(5))
+
+        cache.replace("p", "master", commits[2:], complete=True)
+        cache.prepend("p", "master", commits[:2])
+        cache.prepend("p", "master", commits[:2])
+
+        self.assertEqual(cache.head("p", "master"), commits[0].id)
+        self.assertTrue(cache.is_complete("p", "master"))
+        self.assertEqual(cache.commits("p", "master"), commits)
+
+    def test_least_recently_used_project_evicted(self):
+        cache = MemoryCommitCache(max_commits=10)
+        for project in ("a", "b"):
+            cache.replace(project, "master", parse_commits(make_commits(4)))
+        cache.head("a", "master")
+
+        cache.replace("c", "master", parse_commits(make_commits(4)))
+
+        self.assertIsNotNone(cache.head("a", "master"))
+        self.assertIsNone(cache.head("b", "master"))
+        self.assertIsNotNone(cache.head("c", "master"))
+
+
+class TestIncrementalFetch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.stub = StubGitLab(make_commits(280, bump_every=100)).start()
+        self.cli_args = {
+            "ip_address": self.stub.url,
+            "api_version": "4",
+            "project": "test-project",
+            "branch": "master",
+            "branch_two": "master",
+            "ssl": True,
+            "cache_dir": self.directory.name,
+            "client": GitLabClient(self.stub.url),
+        }
+
+    def tearDown(self):
+        self.stub.stop()
+        get_commit_cache(self.cli_args).close()
+        self.directory.cleanup()
+
+    def requests_for(self, function, *args):
+        before = self.stub.requests
+        result = function(*args, self.cli_args)
+        return result, self.stub.requests - before
+
+    def test_unchanged_branch(self):
+        first, _ = self.requests_for(get_commits_until_latest_bump)
+        second, requests = self.requests_for(get_commits_until_latest_bump)
+
+        self.assertEqual(requests, 1)
+        self.assertEqual(len(second), 80)
+        self.assertEqual(second, first)
+
+    def test_new_commits_only(self):
+        self.requests_for(get_commits_until_latest_bump)
+        self.stub.commits = make_commits(285, bump_every=100)
+
+        commits, requests = self.requests_for(get_commits_until_latest_bump)
+
+        # branch head, merge base and the compare of the cached head with it
+        self.assertEqual(requests, 3)
+        self.assertEqual(len(commits), 85)
+
+    def test_force_push_invalidates(self):
+        self.requests_for(get_commits_until_latest_bump)
+        self.stub.commits = make_commits(250, bump_every=100, seed="rewritten")
+
+        commits, _ = self.requests_for(get_commits_until_latest_bump)
+
+        self.assertEqual(
+            [commit.id for commit in commits],
+            [commit["id"] for commit in reversed(self.stub.commits[:50])],
+        )
+        cache = get_commit_cache(self.cli_args)
+        self.assertEqual(
+            cache.head(cache_key(self.cli_args), "master"), self.stub.commits[0]["id"]
+        )
+
+    def test_since_date_served_from_cache(self):
+        date = "2020-01-01T04:00:00+00:00"
+        self.requests_for(get_commits_until_latest_bump)
+
+        commits, requests = self.requests_for(get_commits_since_date, date)
+
+        self.assertEqual(requests, 1)
+        self.assertEqual(len(commits), 280 - 240 + 1)
+
+    def test_since_date_repeated(self):
+        date = "2020-01-01T04:00:00+00:00"
+        first, _ = self.requests_for(get_commits_since_date, date)
+
+        second, requests = self.requests_for(get_commits_since_date, date)
+        later, _ = self.requests_for(get_commits_since_date, "2020-01-01T04:30:00+00:00")
+
+        self.assertEqual(requests, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(len(later), 280 - 270 + 1)
+
+    def test_merged_commits_older_than_head(self):
+        commits = self.stub.commits
+        for commit, parent in zip(commits, commits[1:]):
+            commit["parent_ids"] = [parent["id"]]
+        self.requests_for(get_commits_until_latest_bump)
+        # A feature branch forked at change 260 and made its only commit
+        # between changes 270 and 271, merged after the cached head 280
+        feature = dict(
+            commits[20],
+            id="f" * 40,
+            short_id="f" * 8,
+            title="feat(core): merged change",
+            message="feat(core): merged change\n",
+            committed_date="2020-01-01T04:30:30.000+00:00",
+            created_at="2020-01-01T04:30:30.000+00:00",
+            parent_ids=[commits[20]["id"]],
+        )
+        merge = dict(
+            commits[0],
+            id="e" * 40,
+            short_id="e" * 8,
+            title="Merge branch 'feature'",
+            message="Merge branch 'feature'\n",
+            committed_date="2020-01-01T04:41:00.000+00:00",
+            created_at="2020-01-01T04:41:00.000+00:00",
+            parent_ids=[commits[0]["id"], feature["id"]],
+        )
+        # Listed by date, as GitLab does
+        self.stub.commits = [merge, *commits[:10], feature, *commits[10:]]
+
+        cached, _ = self.requests_for(get_commits_until_latest_bump)
+        uncached = get_commits_until_latest_bump({**self.cli_args, "cache_dir": None})
+
+        self.assertIn("f" * 40, [commit.id for commit in cached])
+        self.assertEqual(cached, uncached)
@@ -0,0 +1,93 @@
+import unittest
+
+from changelog_generator.conventional import (
+    CommitTitle,
+    classify,
+    is_bump,
+    parse_title,
+    partition,
+)
+from changelog_generator.models import Commit
+
+
+class TestParseTitle(unittest.TestCase):
+    def test_full_title(self):
+        self.assertEqual(
+            parse_title("feat(api)!: Add endpoint (!42)"),
+            CommitTitle("feat", "api", True, "Add endpoint (!42)", 42),
+        )
+
+    def test_without_scope(self):
+        self.assertEqual(
+            parse_title("fix: Fix crash"),
+            CommitTitle("fix", None, False, "Fix crash", None),
+        )
+
+    def test_not_conventional(self):
+        self.assertEqual(
+            parse_title("Merge branch 'a' into 'b'"),
+            CommitTitle("", None, False, "Merge branch 'a' into 'b'", None),
+        )
+
+    def test_long_title_without_colon(self):
+        title = "feat(" + "a" * 50000
+
+        self.assertEqual(parse_title(title).type, "")
+
+    def test_is_bump(self):
+        self.assertTrue(is_bump("bump: version 1.0.0 → 1.1.0"))
+        self.assertFalse(is_bump("bump:"))
+        self.assertFalse(is_bump("feat: bump: dependency"))
+
+
+class TestClassify(unittest.TestCase):
+    type_map = {"feat": "Added", "fix": "Fixed", "": "Others"}
+
+    commits = [
+        Commit(str(number), str(number), title, title, "2018-06-10T14:01:44Z", None)
+        for number, title in enumerate(
+            ["feat(api): a", "fix(web): b", "docs: c", "chore(api): d"]
+        )
+    ]
+
+    def titles(self, buckets):
+        return {type: [c.title for c in commits] for type, commits in buckets.items()}
+
+    def test_without_scopes(self):
+        self.assertEqual(
+            self.titles(classify(self.commits, self.type_map)),
+            {
+                "feat": ["feat(api): a"],
+                "fix": ["fix(web): b"],
+                "": ["docs: c", "chore(api): d"],
+            },
+        )
+
+    def test_allowed_scopes(self):
+        self.assertEqual(
+            self.titles(classify(self.commits, self.type_map, ["api"])),
+            {"feat": ["feat(api): a"], "fix": [], "": ["docs: c", "chore(api): d"]},
+        )
+
+    def test_require_scope(self):
+        self.assertEqual(
+            self.titles(
+                classify(self.commits, self.type_map, ["api"], require_scope=True)
+            ),
+            {"feat": ["feat(api): a"], "fix": [], "": ["chore(api): d"]},
+        )
+
+    def test_partition_matches_classify(self):
+        commits = self.commits + [
+            Commit("4", "4", "fix(zpm): e", "fix(zpm): e", "2018-06-10T14:01:44Z", None)
+        ]
+
+        partitions = partition(
+            commits, self.type_map, ["api", "web"], ["zpm"], require_scope=True
+        )
+
+        for scope in ("api", "web"):
+            self.assertEqual(
+                partitions[scope],
+                classify(commits, self.type_map, ["zpm", scope], require_scope=True),
+            )
@@ -8,14 +8,13 @@ class TestGenerator(unittest.TestCase):
     def test_process_arguments(self):
         sys.argv = [
             "script",
+            "--system",
+            "zpw",
             "--ip",
             "localhost",
-            "--group",
-            "test-group",
             "--project",
             "test-project",
-            "--branches",
-            "release",
+            "--branch",
             "master",
             "--version",
             "1.2.3",
@@ -23,16 +22,32 @@ class TestGenerator(unittest.TestCase):
             "test-token",
         ]
         expected_result = {
+            "system": "zpw",
             "ip_address": "localhost",
             "api_version": "4",
-            "project_group": "test-group",
             "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
+            "sub_project": None,
+            "subproject_filter": "scope",
+            "subproject_path": None,
+            "branch": "master",
+            "base_branch": None,
             "version": "1.2.3",
-            "changelog": "N",
+            "branch_diff": "date",
+            "bump_search": "walk",
+            "include_issues": False,
+            "source": "auto",
+            "repo_path": None,
             "token": "test-token",
             "ssl": True,
+            "pool_size": 10,
+            "concurrency": 1,
+            "max_retries": 5,
+            "cache_dir": None,
+            "cache_size": None,
+            "log_level": "info",
+            "log_format": "text",
+            "profile": None,
+            "profile_file": None,
         }
 
         result = process_arguments()
@@ -41,14 +56,13 @@ class TestGenerator(unittest.TestCase):
     def test_ssl_false(self):
         sys.argv = [
             "script",
+            "--system",
+            "zpw",
             "--ip",
             "localhost",
-            "--group",
-            "test-group",
             "--project",
             "test-project",
-            "--branches",
-            "release",
+            "--branch",
             "master",
             "--version",
             "1.2.3",
@@ -59,17 +73,73 @@ class TestGenerator(unittest.TestCase):
         ]
 
         expected_result = {
+            "system": "zpw",
             "ip_address": "localhost",
             "api_version": "4",
-            "project_group": "test-group",
             "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
+            "sub_project": None,
+            "subproject_filter": "scope",
+            "subproject_path": None,
+            "branch": "master",
+            "base_branch": None,
             "version": "1.2.3",
-            "changelog": "N",
+            "branch_diff": "date",
+            "bump_search": "walk",
+            "include_issues": False,
+            "source": "auto",
+            "repo_path": None,
             "token": "test-token",
             "ssl": False,
+            "pool_size": 10,
+            "concurrency": 1,
+            "max_retries": 5,
+            "cache_dir": None,
+            "cache_size": None,
+            "log_level": "info",
+            "log_format": "text",
+            "profile": None,
+            "profile_file": None,
         }
 
         result = process_arguments()
         self.assertEqual(result, expected_result)
+
+    def test_pool_size(self):
+        sys.argv = [
+            "script",
+            "--system",
+            "zpw",
+            "--ip",
+            "localhost",
+            "--project",
+            "test-project",
+            "--branch",
+            "master",
+            "--pool-size",
+            "4",
+        ]
+
+        result = process_arguments()
+        self.assertEqual(result["pool_size"], 4)
+
+    def test_zpm_requires_base_branch(self):
+        sys.argv = [
+            "script",
+            "--system",
+            "zpm",
+            "--ip",
+            "localhost",
+            "--project",
+            "test-project",
+            "--branch",
+            "master",
+            "--subproject",
+            "api",
+        ]
+
+        with self.assertRaises(SystemExit):
+            process_arguments()
+
+        sys.argv += ["--base-branch", "release"]
+        result = process_arguments()
+        self.assertEqual(result["base_branch"], "release")
@@ -1,188 +1,131 @@
+import asyncio
 import datetime
 import mock
+import os
+import tempfile
 import unittest
 
-from changelog_generator.generator import (
-    generate_changelog,
-    get_closed_issues_since_last_tag,
-)
-
-
-class TestGenerator(unittest.TestCase):
-    @mock.patch(
-        "changelog_generator.generator.get_closed_issues_since_last_tag"
-    )
-    @mock.patch("os.path.isfile")
-    @mock.patch("changelog_generator.generator.get_commits_since_date")
-    @mock.patch("changelog_generator.generator.get_last_commit_date")
-    def test_generate_changelog_existing(
-        self,
-        mock_get_commit_date,
-        mock_get_commits,
-        mock_is_file,
-        mock_closed_issues,
-    ):
-        mock_is_file.return_value = True
-        mock_get_commit_date.return_value = "2018-06-10T14:01:45.000000+00:00"
-        mock_get_commits.return_value = [
-            {
-                "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
-                "committed_date": "2018-06-10T14:01:44.000+00:00",
-                "message": "Test commit message",
-            }
-        ]
-        mock_closed_issues.return_value = [
-            {
-                "title": "A Closed Issue",
-                "closed_at": "2018-06-10T14:01:44.000+00:00",
-            }
-        ]
+from changelog_generator.exceptions import ChangelogGeneratorError
+from changelog_generator.models import Commit, Issue, parse_commits
+from changelog_generator.profiling import disable_profiling, enable_profiling
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+from changelog_generator.zpm_generator import ZPMGenerator
+from changelog_generator.zpw_generator import ZPWGenerator
 
-        cli_args = {
-            "ip_address": "localhost",
-            "api_version": "4",
-            "project_group": "test-group",
-            "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
-            "version": "1",
-            "changelog": "N",
-        }
-
-        with mock.patch("builtins.open", mock.mock_open()) as mock_file:
-            result = generate_changelog(cli_args)
-            mock_file.assert_called_once_with(mock.ANY, "w")
-            mock_file_write_calls = [
-                mock.call(
-                    f"## v1 ({datetime.datetime.now().strftime('%Y-%m-%d')})\n"
-                ),
-                mock.call("* 2018-06-10 - Test commit message \n"),
-                mock.call("\n### Closed Issues\n"),
-                mock.call("* A Closed Issue"),
-            ]
-            mock_file().write.assert_has_calls(mock_file_write_calls)
-            self.assertEqual(
-                result, "CHANGELOG_generated.md written successfully"
-            )
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class GeneratorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
 
-    @mock.patch(
-        "changelog_generator.generator.get_closed_issues_since_last_tag"
-    )
-    @mock.patch("changelog_generator.generator.datetime")
-    @mock.patch("os.path.isfile")
-    @mock.patch("changelog_generator.generator.get_commits_since_date")
-    @mock.patch("changelog_generator.generator.get_last_commit_date")
+    def read(self, path):
+        with open(path) as changelog:
+            return changelog.read()
+
+
+class TestZPMGenerator(GeneratorTestCase):
+    cli_args = {
+        "ip_address": "localhost",
+        "api_version": "4",
+        "project": "test-project",
+        "sub_project": "api",
+        "branch_one": "release",
+        "branch_two": "master",
+        "version": "1",
+        "ssl": True,
+    }
+
+    commits = parse_commits([
+        {
+            "id": "a1",
+            "short_id": "a1",
+            "title": "feat(api): Add endpoint",
+            "committed_date": "2018-06-10T14:01:44.000+00:00",
+            "message": "feat(api): Add endpoint\n\nWith a body",
+        },
+        {
+            "id": "b2",
+            "short_id": "b2",
+            "title": "fix(zpm): Fix crash",
+            "committed_date": "2018-06-09T14:01:44.000+00:00",
+            "message": "fix(zpm): Fix crash",
+        },
+        {
+            "id": "c3",
+            "short_id": "c3",
+            "title": "feat(web): Unrelated",
+            "committed_date": "2018-06-08T14:01:44.000+00:00",
+            "message": "feat(web): Unrelated",
+        },
+    ])
+
+    @mock.patch("changelog_generator.zpm_generator.datetime")
+    @mock.patch("changelog_generator.zpm_generator.get_commits_since_date")
+    @mock.patch("changelog_generator.zpm_generator.get_last_commit_date")
     def test_generate_changelog_update(
-        self,
-        mock_get_commit_date,
-        mock_get_commits,
-        mock_is_file,
-        mock_datetime,
-        mock_closed_issues,
+        self, mock_get_commit_date, mock_get_commits, mock_datetime
     ):
         mock_datetime.datetime.now.return_value = datetime.date(2018, 6, 18)
-        mock_is_file.return_value = True
         mock_get_commit_date.return_value = "2018-06-10T14:01:45.000000+00:00"
-        mock_get_commits.return_value = [
-            {
-                "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
-                "committed_date": "2018-06-10T14:01:44.000+00:00",
-                "message": "Test commit message",
-            }
-        ]
-        mock_closed_issues.return_value = [
-            {
-                "title": "A Closed Issue",
-                "closed_at": "2018-06-10T14:01:44.000+00:00",
-            }
-        ]
+        mock_get_commits.return_value = self.commits
+        os.mkdir("api")
+        with open("api/CHANGELOG.md", "w") as changelog:
+            changelog.write("Existing data")
 
-        cli_args = {
-            "ip_address": "localhost",
-            "api_version": "4",
-            "project_group": "test-group",
-            "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
-            "version": "1",
-            "changelog": "Y",
-        }
-
-        with mock.patch(
-            "builtins.open", mock.mock_open(read_data="Existing data")
-        ) as mock_file:
-            result = generate_changelog(cli_args)
-            mock_file.assert_called_with(mock.ANY, "w")
-            mock_file().write.assert_has_calls(
-                [
-                    mock.call("## v1 (2018-06-18)\n"),
-                    mock.call("* 2018-06-10 - Test commit message \n"),
-                    mock.call("\n### Closed Issues\n"),
-                    mock.call("* A Closed Issue"),
-                    mock.call("\n"),
-                    mock.call("Existing data"),
-                ]
-            )
-            self.assertEqual(result, "CHANGELOG.md updated successfully")
-
-    @mock.patch(
-        "changelog_generator.generator.get_closed_issues_since_last_tag"
-    )
-    @mock.patch("os.path.isfile")
-    @mock.patch("changelog_generator.generator.get_commits_since_date")
-    @mock.patch("changelog_generator.generator.get_last_commit_date")
-    def test_generate_changelog_new(
-        self,
-        mock_get_commit_date,
-        mock_get_commits,
-        mock_is_file,
-        mock_closed_issues,
-    ):
-        mock_is_file.return_value = False
+        result = ZPMGenerator().generate_changelog(self.cli_args)
+
+        self.assertEqual(result, "api/CHANGELOG.md updated successfully")
+        self.assertEqual(
+            self.read("api/CHANGELOG.md"),
+            "## v1 (2018-06-18)\n"
+            "\n### Added \n"
+            "\n  * 2018-06-10 - feat(api): Add endpoint \n"
+            "    With a body\n"
+            "\n### Fixed \n"
+            "\n  * 2018-06-09 - fix(zpm): Fix crash \n"
+            "\n"
+            "\n"
+            "Existing data",
+        )
+
+    @mock.patch("changelog_generator.zpm_generator.get_commits_since_date")
+    @mock.patch("changelog_generator.zpm_generator.get_last_commit_date")
+    def test_generate_changelog_new(self, mock_get_commit_date, mock_get_commits):
         mock_get_commit_date.return_value = "2018-06-10T14:01:45.000000+00:00"
-        mock_get_commits.return_value = [
-            {
-                "parent_ids": ["06f7e730ff5edcc5a955d939c1e39ac363ad3e41"],
-                "committed_date": "2018-06-10T14:01:44.000+00:00",
-                "message": "Test commit message",
-            }
-        ]
-        mock_closed_issues.return_value = [
-            {
-                "title": "A Closed Issue",
-                "closed_at": "2018-06-10T14:01:44.000+00:00",
-            }
-        ]
+        mock_get_commits.return_value = self.commits[:1]
+        os.mkdir("api")
 
-        cli_args = {
-            "ip_address": "localhost",
-            "api_version": "4",
-            "project_group": "test-group",
-            "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
-            "version": "1",
-            "changelog": "N",
-        }
-
-        with mock.patch("builtins.open", mock.mock_open()) as mock_file:
-            result = generate_changelog(cli_args)
-            mock_file.assert_called_once_with(mock.ANY, "w")
-            mock_file_write_calls = [
-                mock.call(
-                    f"## v1 ({datetime.datetime.now().strftime('%Y-%m-%d')})\n"
-                ),
-                mock.call("* 2018-06-10 - Test commit message \n"),
-                mock.call("\n### Closed Issues\n"),
-                mock.call("* A Closed Issue"),
-            ]
-            mock_file().write.assert_has_calls(mock_file_write_calls)
-            self.assertEqual(
-                result, "New CHANGELOG.md file written successfully"
-            )
+        result = ZPMGenerator().generate_changelog(self.cli_args)
 
-    @mock.patch("changelog_generator.generator.get_closed_issues_for_project")
-    @mock.patch("changelog_generator.generator.get_last_tagged_release_date")
+        self.assertEqual(result, "api/CHANGELOG.md updated successfully")
+        self.assertIn("feat(api): Add endpoint", self.read("api/CHANGELOG.md"))
+
+    @mock.patch("changelog_generator.zpm_generator.get_last_commit_date")
+    @mock.patch("changelog_generator.zpm_generator.get_commits_between_branches")
+    def test_generate_changelog_compare(self, mock_get_commits, mock_get_commit_date):
+        mock_get_commits.return_value = self.commits[:1]
+        os.mkdir("api")
+
+        result = ZPMGenerator().generate_changelog(
+            {**self.cli_args, "branch_diff": "compare"}
+        )
+
+        self.assertEqual(result, "api/CHANGELOG.md updated successfully")
+        self.assertIn("feat(api): Add endpoint", self.read("api/CHANGELOG.md"))
+        mock_get_commit_date.assert_not_called()
+
+    @mock.patch("changelog_generator.zpm_generator.get_closed_issues_for_project")
+    @mock.patch("changelog_generator.zpm_generator.get_last_tagged_release_date")
     def test_get_closed_issues_since_last_tag(
         self, mock_release_date, mock_closed_project_issues
     ):
@@ -195,29 +138,18 @@ class TestGenerator(unittest.TestCase):
             }
         ]
 
-        cli_args = {
-            "ip_address": "localhost",
-            "api_version": "4",
-            "project_group": "test-group",
-            "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
-            "version": "1",
-            "changelog": "N",
-        }
-
         self.assertEqual(
-            get_closed_issues_since_last_tag(cli_args),
+            ZPMGenerator().get_closed_issues_since_last_tag(self.cli_args),
             [
-                {
-                    "closed_at": "2050-06-10T14:01:44.000+00:00",
-                    "title": "A Closed Issue",
-                }
+                Issue(
+                    "A Closed Issue",
+                    datetime.datetime(2050, 6, 10, 14, 1, 44, tzinfo=datetime.timezone.utc),
+                )
             ],
         )
 
-    @mock.patch("changelog_generator.generator.get_closed_issues_for_project")
-    @mock.patch("changelog_generator.generator.get_last_tagged_release_date")
+    @mock.patch("changelog_generator.zpm_generator.get_closed_issues_for_project")
+    @mock.patch("changelog_generator.zpm_generator.get_last_tagged_release_date")
     def test_get_closed_issues_since_last_tag_no_issues(
         self, mock_release_date, mock_closed_project_issues
     ):
@@ -230,15 +162,238 @@ class TestGenerator(unittest.TestCase):
             }
         ]
 
-        cli_args = {
-            "ip_address": "localhost",
-            "api_version": "4",
-            "project_group": "test-group",
-            "project": "test-project",
-            "branch_one": "release",
-            "branch_two": "master",
-            "version": "1",
-            "changelog": "N",
-        }
-
-        self.assertEqual(get_closed_issues_since_last_tag(cli_args), [])
+        self.assertEqual(
+            ZPMGenerator().get_closed_issues_since_last_tag(self.cli_args), []
+        )
+
+
+class TestZPWGenerator(GeneratorTestCase):
+    cli_args = {
+        "ip_address": "localhost",
+        "api_version": "4",
+        "project": "test-project",
+        "sub_project": None,
+        "branch": "master",
+        "version": None,
+        "ssl": True,
+    }
+
+    @mock.patch("changelog_generator.zpw_generator.datetime")
+    @mock.patch("changelog_generator.zpw_generator.get_commits_until_latest_bump")
+    def test_generate_changelog_bumps_version(self, mock_get_commits, mock_datetime):
+        mock_datetime.datetime.now.return_value = datetime.date(2019, 10, 1)
+        mock_get_commits.return_value = [
+            Commit.from_json(
+                {
+                    "id": "abcd1234ef",
+                    "short_id": "abcd1234",
+                    "title": "fix: Fix crash",
+                    "committed_date": "2019-09-30T14:01:44.000+00:00",
+                    "message": "fix: Fix crash",
+                }
+            )
+        ]
+        with open("CHANGELOG.md", "w") as changelog:
+            changelog.write("# CHANGELOG\n\n## v1.2.3 - 2019/09/01\n")
+
+        result = ZPWGenerator().generate_changelog(self.cli_args)
+
+        self.assertEqual(result, "CHANGELOG.md updated successfully")
+        self.assertEqual(
+            self.read("CHANGELOG.md"),
+            "# CHANGELOG\n\n"
+            "## v1.2.4 - 2019/10/01\n"
+            "\n### Fixed \n"
+            "  * 2019-09-30 - fix: Fix crash (abcd1234)\n"
+            "\n"
+            "## v1.2.3 - 2019/09/01\n",
+        )
+
+    @mock.patch("changelog_generator.zpw_generator.get_commits_until_latest_bump")
+    def test_generate_changelog_no_changes(self, mock_get_commits):
+        mock_get_commits.return_value = []
+
+        self.assertIsNone(ZPWGenerator().generate_changelog(self.cli_args))
+        self.assertFalse(os.path.exists("CHANGELOG.md"))
+
+    @unittest.skipUnless(httpx, "requires the async extra")
+    def test_generate_changelog_async(self):
+        with StubGitLab(make_commits(250, bump_every=130)) as stub:
+            cli_args = {**self.cli_args, "ip_address": stub.url}
+
+            result = asyncio.run(ZPWGenerator().generate_changelog_async(cli_args))
+
+            self.assertEqual(stub.requests, 2)
+        self.assertEqual(result, "CHANGELOG.md updated successfully")
+        self.assertEqual(self.read("CHANGELOG.md").count("synthetic change"), 120)
+
+    @unittest.skipUnless(httpx, "requires the async extra")
+    def test_generate_changelog_async_sync_only_options(self):
+        cli_args = {**self.cli_args, "bump_search": "tags", "cache_dir": "cache"}
+
+        with self.assertRaisesRegex(
+            ChangelogGeneratorError, "do not support bump_search, cache_dir"
+        ):
+            asyncio.run(ZPWGenerator().generate_changelog_async(cli_args))
+
+
+class TestZPMSubprojectFilter(GeneratorTestCase):
+    def run_filter(self, subproject_filter):
+        commits = make_commits(1000, scopes=("api",) + ("web",) * 19)
+        os.makedirs("api", exist_ok=True)
+        if os.path.exists("api/CHANGELOG.md"):
+            os.remove("api/CHANGELOG.md")
+        with StubGitLab(commits, branches={"release": 999}) as stub:
+            cli_args = {
+                "ip_address": stub.url,
+                "api_version": "4",
+                "project": "monorepo",
+                "sub_project": "api",
+                "subproject_filter": subproject_filter,
+                "branch_one": "release",
+                "branch_two": "master",
+                "version": "1",
+                "ssl": True,
+            }
+            ZPMGenerator().generate_changelog(cli_args)
+            return stub.requests, self.read("api/CHANGELOG.md")
+
+    def test_path_filter_fetches_only_subproject(self):
+        scope_requests, scope_changelog = self.run_filter("scope")
+        path_requests, path_changelog = self.run_filter("path")
+
+        # One branch lookup plus ten pages of commits against a single page
+        self.assertEqual(scope_requests, 11)
+        self.assertEqual(path_requests, 2)
+        self.assertIn("feat(api): synthetic change 1000", path_changelog)
+        self.assertNotIn("feat(web)", path_changelog)
+
+    def test_both_filters(self):
+        _, changelog = self.run_filter("both")
+
+        self.assertEqual(changelog.count("feat(api)"), 50)
+
+
+class TestZPMSubprojects(GeneratorTestCase):
+    def run_subprojects(self, sub_project):
+        commits = make_commits(1000, scopes=("api", "web", "zpm", "docs"))
+        with StubGitLab(commits, branches={"release": 999}) as stub:
+            ZPMGenerator().generate_changelog(
+                {
+                    "ip_address": stub.url,
+                    "api_version": "4",
+                    "project": "monorepo",
+                    "sub_project": sub_project,
+                    "branch_one": "release",
+                    "branch_two": "master",
+                    "version": "1",
+                    "ssl": True,
+                }
+            )
+            return stub.requests
+
+    def test_single_fetch(self):
+        for name in ("api", "web"):
+            os.mkdir(name)
+
+        requests = self.run_subprojects("api,web")
+        changelogs = {name: self.read(f"{name}/CHANGELOG.md") for name in ("api", "web")}
+        for name in ("api", "web"):
+            os.remove(f"{name}/CHANGELOG.md")
+            self.run_subprojects(name)
+
+            self.assertEqual(self.read(f"{name}/CHANGELOG.md"), changelogs[name])
+        # One branch lookup plus ten pages of commits, as for a single sub-project
+        self.assertEqual(requests, 11)
+        self.assertEqual(changelogs["api"].count("feat(api)"), 250)
+        self.assertEqual(changelogs["api"].count("feat(zpm)"), 250)
+        self.assertNotIn("feat(web)", changelogs["api"])
+
+    @unittest.skipUnless(httpx, "requires the async extra")
+    def test_async_single_fetch(self):
+        for name in ("api", "web"):
+            os.mkdir(name)
+        commits = make_commits(1000, scopes=("api", "web", "zpm", "docs"))
+        with StubGitLab(commits, branches={"release": 999}) as stub:
+            cli_args = {
+                "ip_address": stub.url,
+                "api_version": "4",
+                "project": "monorepo",
+                "sub_project": "api,web",
+                "branch_one": "release",
+                "branch_two": "master",
+                "version": "1",
+                "ssl": True,
+            }
+
+            result = asyncio.run(ZPMGenerator().generate_changelog_async(cli_args))
+
+            self.assertEqual(stub.requests, 11)
+        self.assertEqual(
+            result,
+            f"{os.path.join('api', 'CHANGELOG.md')} updated successfully\n"
+            f"{os.path.join('web', 'CHANGELOG.md')} updated successfully",
+        )
+        self.assertEqual(self.read("web/CHANGELOG.md").count("feat(web)"), 249)
+        self.assertFalse(os.path.exists("api,web"))
+
+
+class TestReleaseNotes(GeneratorTestCase):
+    def test_issues_and_merge_requests(self):
+        commits = make_commits(150, bump_every=100)
+        commits[0] = {**commits[0], "title": "fix: Fix crash (!7)"}
+        commits[0]["message"] = commits[0]["title"]
+        issues = [
+            # Closed after the release tagged at 01:40
+            {"iid": 1, "closed_at": "2020-01-01T02:00:00.000+00:00"},
+            # Updated since, but closed before it
+            {"iid": 2, "closed_at": "2020-01-01T01:00:00.000+00:00"},
+        ]
+        issues = [
+            {
+                **issue,
+                "title": f"Issue {issue['iid']}",
+                "state": "closed",
+                "updated_at": "2020-01-01T02:00:00.000+00:00",
+                "web_url": f"http://stub/issues/{issue['iid']}",
+            }
+            for issue in issues
+        ]
+        merge_requests = [
+            {
+                "iid": 7,
+                "title": "Fix crash",
+                "state": "merged",
+                "updated_at": "2020-01-01T02:30:00.000+00:00",
+                "web_url": "http://stub/merge_requests/7",
+            }
+        ]
+        recorder = enable_profiling()
+        self.addCleanup(disable_profiling)
+
+        with StubGitLab(
+            commits, latency=0.01, issues=issues, merge_requests=merge_requests
+        ) as stub:
+            ZPWGenerator().generate_changelog(
+                {
+                    "ip_address": stub.url,
+                    "project": "test-project",
+                    "sub_project": None,
+                    "branch": "master",
+                    "version": None,
+                    "include_issues": True,
+                }
+            )
+
+        changelog = self.read("CHANGELOG.md")
+        self.assertIn(
+            " - fix: Fix crash ([!7](http://stub/merge_requests/7))\n", changelog
+        )
+        self.assertIn(
+            "\n### Closed issues \n"
+            "  * 2020-01-01 - Issue 1 ([#1](http://stub/issues/1))\n\n",
+            changelog,
+        )
+        self.assertNotIn("Issue 2", changelog)
+        spans = {recorded.name: recorded for recorded in recorder.spans}
+        self.assertLess(spans["release_notes"].start_ns, spans["fetch"].end_ns)
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+import unittest
+
+import requests
+
+from changelog_generator.calls import (
+    get_closed_issues_for_project,
+    get_last_commit_date,
+    get_last_tagged_release_date,
+)
+from changelog_generator.client import GitLabClient
+from changelog_generator.http_cache import MemoryResponseCache, ResponseCache
+from changelog_generator.tests.stub_gitlab import StubGitLab
+
+
+def json_response(url, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers["ETag"] = '"1"'
+    response._content = body.encode()
+    return response
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        cache = ResponseCache(self.directory.name)
+        cache.put("key", json_response("http://localhost/a", '{"a": 1}'))
+
+        entry = cache.get("key")
+
+        self.assertEqual(entry["body"], '{"a": 1}')
+        self.assertEqual(entry["headers"]["ETag"], '"1"')
+        self.assertIsNone(cache.get("other"))
+
+    def test_least_recently_used_evicted(self):
+        cache = ResponseCache(self.directory.name, max_bytes=400)
+        body = "x" * 100
+        cache.put("a", json_response("http://localhost/a", body))
+        cache.put("b", json_response("http://localhost/b", body))
+        past = time.time() - 60
+        for name in os.listdir(self.directory.name):
+            os.utime(os.path.join(self.directory.name, name), (past, past))
+        cache.get("a")
+
+        cache.put("c", json_response("http://localhost/c", body))
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+    def test_least_recently_used_evicted(self):
+        cache = MemoryResponseCache(max_bytes=250)
+        body = "x" * 100
+        cache.put("a", json_response("http://localhost/a", body))
+        cache.put("b", json_response("http://localhost/b", body))
+        cache.get("a")
+
+        cache.put("c", json_response("http://localhost/c", body))
+
+        self.assertEqual(cache.get("a")["body"], body)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_not_modified_served_from_cache(self):
+        with StubGitLab() as stub:
+            cli_args = {
+                "ip_address": stub.url,
+                "api_version": "4",
+                "project": "test-project",
+                "branch_one": "release",
+                "ssl": True,
+                "client": GitLabClient(
+                    stub.url, response_cache=ResponseCache(self.directory.name)
+                ),
+            }
+
+            first = get_last_tagged_release_date(cli_args), get_last_commit_date(cli_args)
+            second = get_last_tagged_release_date(cli_args), get_last_commit_date(cli_args)
+
+            self.assertEqual(stub.not_modified, 2)
+        self.assertEqual(first, second)
+
+    def test_closed_issues_first_page_revalidated(self):
+        issues = [
+            {
+                "iid": number,
+                "title": f"Issue {number}",
+                "state": "closed",
+                "closed_at": "2018-06-10T14:01:44.000+00:00",
+                "updated_at": "2018-06-10T14:01:44.000+00:00",
+            }
+            for number in range(1, 251)
+        ]
+        with StubGitLab(issues=issues) as stub:
+            cli_args = {
+                "ip_address": stub.url,
+                "project": "test-project",
+                "client": GitLabClient(
+                    stub.url, response_cache=ResponseCache(self.directory.name)
+                ),
+            }
+
+            first = get_closed_issues_for_project(cli_args)
+            second = get_closed_issues_for_project(cli_args)
+
+            self.assertEqual(stub.requests, 6)
+            self.assertEqual(stub.not_modified, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(len(first), 250)
@@ -0,0 +1,91 @@
+import io
+import json
+import logging
+import mock
+import sys
+import unittest
+
+from changelog_generator import log_handlers
+from changelog_generator.log_handlers import (
+    PAYLOAD_SAMPLE_EVERY,
+    JsonFormatter,
+    Payload,
+    configure_logging,
+    log_payload,
+)
+
+
+class TestPayload(unittest.TestCase):
+    def test_truncates_long_payloads(self):
+        text = str(Payload({"message": "x" * 50}, max_chars=20))
+
+        self.assertTrue(text.startswith('{"message": "xxxxxxx'))
+        self.assertTrue(text.endswith("... (45 more characters)"))
+
+    def test_keeps_first_items_of_lists(self):
+        text = str(Payload(list(range(10))))
+
+        self.assertEqual(text, "[0, 1, 2] and 7 more items")
+
+
+class TestLogPayload(unittest.TestCase):
+    def setUp(self):
+        log_handlers._payloads_seen.clear()
+        self.logger = logging.getLogger("test_log_payload")
+        self.logger.setLevel(logging.DEBUG)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+
+    def test_samples_payloads(self):
+        with self.assertLogs(self.logger, logging.DEBUG) as logs:
+            for number in range(PAYLOAD_SAMPLE_EVERY * 2):
+                log_payload(self.logger, "Page %d", [number], number)
+
+        self.assertEqual(
+            logs.output,
+            [
+                "DEBUG:test_log_payload:Page 0: [0]",
+                f"DEBUG:test_log_payload:Page {PAYLOAD_SAMPLE_EVERY}: "
+                f"[{PAYLOAD_SAMPLE_EVERY}]",
+            ],
+        )
+
+    @mock.patch("changelog_generator.log_handlers.Payload")
+    def test_nothing_is_built_above_debug(self, mock_payload):
+        self.logger.setLevel(logging.INFO)
+
+        log_payload(self.logger, "Page", [1])
+
+        mock_payload.assert_not_called()
+        self.assertFalse(log_handlers._payloads_seen)
+
+
+class TestConfigureLogging(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        self.addCleanup(setattr, root, "handlers", handlers)
+        self.addCleanup(root.setLevel, level)
+
+    def test_json_lines(self):
+        stream = io.StringIO()
+        with mock.patch("sys.stdout", stream):
+            configure_logging("warning", "json")
+            logging.getLogger("test_json").info("Hidden")
+            logging.getLogger("test_json").warning("Shown %s", "here")
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry["level"], "WARNING")
+        self.assertEqual(entry["logger"], "test_json")
+        self.assertEqual(entry["message"], "Shown here")
+
+    def test_json_formatter_exceptions(self):
+        try:
+            raise ValueError("broken")
+        except ValueError:
+            record = logging.LogRecord(
+                "test", logging.ERROR, __file__, 1, "Failed", None, sys.exc_info()
+            )
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertIn("ValueError: broken", entry["exception"])
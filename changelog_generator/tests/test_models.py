@@ -0,0 +1,79 @@
+import datetime
+import unittest
+
+from changelog_generator.calls import sort_commits
+from changelog_generator.models import Commit, Issue, parse_commits, parse_timestamp
+
+UTC = datetime.timezone.utc
+
+
+def commit_json(id, committed_date):
+    return {
+        "id": id,
+        "short_id": id,
+        "title": f"feat: {id}",
+        "message": f"feat: {id}",
+        "committed_date": committed_date,
+    }
+
+
+class TestParseTimestamp(unittest.TestCase):
+    def test_offsets(self):
+        self.assertEqual(
+            parse_timestamp("2018-06-10T16:01:44.000+02:00"),
+            datetime.datetime(2018, 6, 10, 14, 1, 44, tzinfo=UTC),
+        )
+
+    def test_zulu(self):
+        self.assertEqual(
+            parse_timestamp("2018-06-10T14:01:44Z"),
+            datetime.datetime(2018, 6, 10, 14, 1, 44, tzinfo=UTC),
+        )
+
+    def test_naive_is_utc(self):
+        self.assertEqual(
+            parse_timestamp("2018-06-10T14:01:44.123"),
+            datetime.datetime(2018, 6, 10, 14, 1, 44, 123000, tzinfo=UTC),
+        )
+
+    def test_issue(self):
+        self.assertEqual(
+            Issue.from_json(
+                {"title": "Broken", "closed_at": "2018-06-10T14:01:44Z", "state": "closed"}
+            ),
+            Issue("Broken", datetime.datetime(2018, 6, 10, 14, 1, 44, tzinfo=UTC)),
+        )
+
+
+class TestCommit(unittest.TestCase):
+    def test_projection(self):
+        commit = Commit.from_json(
+            {
+                **commit_json("a", "2018-06-10T14:30:00.000+02:00"),
+                "author_name": "someone",
+                "web_url": "http://localhost/commit/a",
+            }
+        )
+
+        self.assertEqual(commit.title, "feat: a")
+        self.assertEqual(
+            commit.committed_at, datetime.datetime(2018, 6, 10, 12, 30, tzinfo=UTC)
+        )
+        self.assertFalse(hasattr(commit, "__dict__"))
+
+
+class TestSortCommits(unittest.TestCase):
+    def test_orders_by_instant(self):
+        commits = parse_commits(
+            [
+                commit_json("a", "2018-06-10T14:30:00.000+02:00"),
+                commit_json("b", "2018-06-10T13:00:00.000+00:00"),
+                commit_json("c", "2018-06-10T08:45:00.000-05:00"),
+            ]
+        )
+
+        self.assertEqual([commit.id for commit in sort_commits(commits)], ["a", "b", "c"])
+        self.assertEqual(
+            [commit.id for commit in sort_commits(commits, reverse=True)],
+            ["c", "b", "a"],
+        )
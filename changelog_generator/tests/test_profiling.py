@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import unittest
+
+from changelog_generator.calls import url_template
+from changelog_generator.client import GitLabClient
+from changelog_generator.profiling import (
+    annotate,
+    disable_profiling,
+    enable_profiling,
+    format_json,
+    format_table,
+    span,
+)
+from changelog_generator.scheduler import RequestScheduler
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+from changelog_generator.zpw_generator import ZPWGenerator
+
+
+class TestSpans(unittest.TestCase):
+    def setUp(self):
+        self.recorder = enable_profiling()
+        self.addCleanup(disable_profiling)
+
+    def test_nested_spans(self):
+        with span("outer", project="p"):
+            with span("inner") as attributes:
+                annotate(retries=2)
+                attributes["status"] = 200
+
+        inner, outer = self.recorder.spans
+        self.assertEqual(inner.name, "inner")
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertIsNone(outer.parent_id)
+        self.assertEqual(inner.attributes, {"retries": 2, "status": 200})
+        self.assertLessEqual(outer.start_ns, inner.start_ns)
+        self.assertGreaterEqual(outer.end_ns, inner.end_ns)
+
+    def test_failed_span(self):
+        with self.assertRaises(ValueError):
+            with span("failing"):
+                raise ValueError()
+
+        self.assertEqual(self.recorder.spans[0].attributes, {"error": "ValueError"})
+
+    def test_disabled(self):
+        disable_profiling()
+        with span("ignored"):
+            annotate(retries=1)
+
+        self.assertEqual(self.recorder.spans, [])
+
+    def test_reports(self):
+        with span("run"):
+            with span("request", bytes=10, retries=1):
+                pass
+            with span("request", bytes=5):
+                pass
+
+        table = format_table(self.recorder.spans).splitlines()
+        request = next(line for line in table if line.startswith("request"))
+        self.assertEqual(request.split()[1], "2")
+        self.assertEqual(request.split()[-2:], ["15", "1"])
+
+        otlp = json.loads(format_json(self.recorder))
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        run = next(otlp_span for otlp_span in spans if otlp_span["name"] == "run")
+        self.assertEqual(
+            [otlp_span.get("parentSpanId") for otlp_span in spans],
+            [run["spanId"], run["spanId"], None],
+        )
+        self.assertIn(
+            {"key": "bytes", "value": {"intValue": "10"}}, spans[0]["attributes"]
+        )
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_url_template(self):
+        self.assertEqual(
+            url_template("/projects/group%2Fproject/repository/branches/feature%2Fx"),
+            "/projects/:id/repository/branches/:branch",
+        )
+        self.assertEqual(
+            url_template("http://gitlab/api/v4/projects/1/repository/commits?page=2"),
+            "/projects/:id/repository/commits",
+        )
+
+    def test_generator_phases_and_requests(self):
+        recorder = enable_profiling()
+        self.addCleanup(disable_profiling)
+        commits = make_commits(150, bump_every=100)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        with StubGitLab(commits, errors=[502]) as stub:
+            client = GitLabClient(stub.url, scheduler=RequestScheduler(backoff=0.01))
+            ZPWGenerator().generate_changelog(
+                {
+                    "ip_address": stub.url,
+                    "project": "group/project",
+                    "branch": "master",
+                    "sub_project": None,
+                    "version": None,
+                    "source": "gitlab",
+                    "per_page": 20,
+                    "output_dir": directory.name,
+                    "client": client,
+                }
+            )
+
+        names = [recorded.name for recorded in recorder.spans]
+        for phase in ("fetch", "classify", "version", "render", "write"):
+            self.assertEqual(names.count(phase), 1, phase)
+        requests = [recorded for recorded in recorder.spans if recorded.name == "request"]
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[0].attributes["retries"], 1)
+        self.assertEqual(
+            requests[0].attributes["url"], "/projects/:id/repository/commits"
+        )
+        self.assertEqual(requests[0].attributes["status"], 200)
+        self.assertGreater(requests[0].attributes["bytes"], 0)
+        self.assertTrue(os.path.isfile(os.path.join(directory.name, "CHANGELOG.md")))
@@ -0,0 +1,140 @@
+import asyncio
+import time
+import unittest
+
+from unittest import mock
+
+from changelog_generator.calls import get_commits_until_latest_bump
+from changelog_generator.client import GitLabClient
+from changelog_generator.exceptions import GitLabAPIError, GitLabConnectionError
+from changelog_generator.scheduler import RequestScheduler
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+else:
+    from changelog_generator import async_calls
+    from changelog_generator.async_client import AsyncGitLabClient
+
+
+def limit_headers(remaining, reset_in):
+    return {
+        "RateLimit-Remaining": str(remaining),
+        "RateLimit-Reset": str(time.time() + reset_in),
+    }
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_unthrottled_without_limits(self):
+        scheduler = RequestScheduler()
+        scheduler.observe({})
+
+        self.assertEqual([scheduler.reserve() for _ in range(50)], [0.0] * 50)
+
+    def test_waits_for_reset_when_exhausted(self):
+        scheduler = RequestScheduler()
+        scheduler.observe(limit_headers(0, 2))
+
+        self.assertAlmostEqual(scheduler.reserve(), 2, delta=0.1)
+        self.assertAlmostEqual(scheduler.counters["throttle_seconds"], 2, delta=0.1)
+
+    def test_spreads_remaining_requests(self):
+        scheduler = RequestScheduler(burst=10)
+        scheduler.observe(limit_headers(110, 10))
+
+        waits = [scheduler.reserve() for _ in range(12)]
+
+        self.assertEqual(waits[:10], [0.0] * 10)
+        self.assertAlmostEqual(waits[10], 0.1, delta=0.02)
+        self.assertAlmostEqual(waits[11], 0.2, delta=0.02)
+
+    def test_never_exceeds_remaining(self):
+        scheduler = RequestScheduler(burst=10)
+        scheduler.observe(limit_headers(3, 10))
+
+        waits = [scheduler.reserve() for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0.0] * 3)
+        self.assertAlmostEqual(waits[3], 10, delta=0.1)
+
+    @mock.patch("changelog_generator.scheduler.random.uniform", lambda low, high: high)
+    def test_retry_delay(self):
+        scheduler = RequestScheduler(max_retries=3, backoff=0.5)
+
+        self.assertEqual(scheduler.retry_delay(1, 503, {}), 0.5)
+        self.assertEqual(scheduler.retry_delay(3), 2.0)
+        self.assertEqual(scheduler.retry_delay(2, 429, {"Retry-After": "7"}), 7.0)
+        self.assertIsNone(scheduler.retry_delay(4, 503, {}))
+        self.assertIsNone(scheduler.retry_delay(1, 404, {}))
+        self.assertEqual(scheduler.counters["retries"], 3)
+        self.assertEqual(scheduler.counters["rate_limited"], 1)
+
+
+class TestRetries(unittest.TestCase):
+    def cli_args(self, stub, scheduler):
+        return {
+            "ip_address": stub.url,
+            "api_version": "4",
+            "project": "test-project",
+            "branch": "master",
+            "ssl": True,
+            "client": GitLabClient(stub.url, scheduler=scheduler),
+        }
+
+    def test_retries_rate_limits_errors_and_resets(self):
+        scheduler = RequestScheduler(backoff=0.01)
+        with StubGitLab(make_commits(25, bump_every=10), errors=[429, 503, "reset"]) as stub:
+            commits = get_commits_until_latest_bump(self.cli_args(stub, scheduler))
+
+            self.assertEqual(stub.requests, 4)
+        self.assertEqual(len(commits), 5)
+        self.assertEqual(scheduler.counters["retries"], 3)
+        self.assertEqual(scheduler.counters["rate_limited"], 1)
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = RequestScheduler(max_retries=2, backoff=0.01)
+        with StubGitLab(make_commits(25), errors=[500] * 3) as stub:
+            with self.assertRaises(GitLabAPIError) as raised:
+                get_commits_until_latest_bump(self.cli_args(stub, scheduler))
+
+            self.assertEqual(stub.requests, 3)
+        self.assertEqual(raised.exception.status_code, 500)
+
+    def test_retries_timeouts(self):
+        scheduler = RequestScheduler(max_retries=1, backoff=0.01)
+        with StubGitLab(make_commits(25), latency=0.5) as stub:
+            cli_args = self.cli_args(stub, scheduler)
+            cli_args["client"].timeout = 0.05
+
+            with self.assertRaises(GitLabConnectionError):
+                get_commits_until_latest_bump(cli_args)
+
+            self.assertEqual(stub.requests, 2)
+
+    def test_throttles_before_the_limit(self):
+        scheduler = RequestScheduler(backoff=0.01)
+        with StubGitLab(make_commits(80), rate_limit=(5, 1)) as stub:
+            cli_args = {**self.cli_args(stub, scheduler), "per_page": 10}
+
+            commits = get_commits_until_latest_bump(cli_args)
+
+            self.assertEqual(stub.rate_limited, 0)
+        self.assertEqual(len(commits), 80)
+        self.assertGreater(scheduler.counters["throttle_seconds"], 0)
+
+    @unittest.skipUnless(httpx, "requires the async extra")
+    def test_async_retries(self):
+        async def run(stub):
+            scheduler = RequestScheduler(backoff=0.01)
+            async with AsyncGitLabClient(stub.url, scheduler=scheduler) as client:
+                cli_args = {**self.cli_args(stub, None), "async_client": client}
+                commits = await async_calls.get_commits_until_latest_bump(cli_args)
+            return commits, scheduler
+
+        with StubGitLab(make_commits(25, bump_every=10), errors=[429, 502]) as stub:
+            commits, scheduler = asyncio.run(run(stub))
+
+        self.assertEqual(len(commits), 5)
+        self.assertEqual(scheduler.counters["retries"], 2)
@@ -0,0 +1,159 @@
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from changelog_generator.service import make_server, service_defaults
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+
+class UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.stub = StubGitLab(make_commits(150, bump_every=100)).start()
+        self.addCleanup(self.stub.stop)
+        self.defaults = service_defaults(
+            {
+                "ip_address": self.stub.url,
+                "api_version": "4",
+                "ssl": True,
+                "output_root": self.directory.name,
+            }
+        )
+        self.addCleanup(self.defaults["client"].close)
+
+    def serve(self, **kwargs):
+        server = make_server(self.defaults, **kwargs)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_render_only_with_warm_cache(self):
+        host, port = self.serve(port=0).server_address
+        entry = {
+            "project": "group/project",
+            "branch": "master",
+            "system": "zpw",
+            "output_dir": "service-a",
+            "render_only": True,
+        }
+
+        first = requests.post(f"http://{host}:{port}/changelog", json=entry)
+        before = self.stub.requests
+        second = requests.post(f"http://{host}:{port}/changelog", json=entry)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.json()["message"].startswith("## v0.1.0 - "))
+        self.assertEqual(first.json()["message"].count("synthetic change"), 50)
+        self.assertEqual(second.json()["message"], first.json()["message"])
+        # Only the branch head is revalidated
+        self.assertEqual(self.stub.requests - before, 1)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_invalid_requests(self):
+        host, port = self.serve(port=0).server_address
+        url = f"http://{host}:{port}"
+
+        missing = requests.post(f"{url}/changelog", json={"project": "p", "system": "zpw"})
+        fixed = requests.post(
+            f"{url}/changelog",
+            json={"project": "p", "branch": "master", "system": "zpw", "token": "x"},
+        )
+        not_json = requests.post(f"{url}/changelog", data="{")
+
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(missing.json()["message"], "Request is missing branch")
+        self.assertEqual(fixed.status_code, 400)
+        self.assertEqual(not_json.status_code, 400)
+        self.assertEqual(requests.get(f"{url}/changelog").status_code, 404)
+
+    def test_concurrent_writes_to_one_changelog(self):
+        self.stub.branches = {"release": 100}
+        self.stub.latency = 0.02
+        os.mkdir(os.path.join(self.directory.name, "core"))
+        host, port = self.serve(port=0).server_address
+        entry = {
+            "project": "group/project",
+            "branch": "master",
+            "base_branch": "release",
+            "system": "zpm",
+            "sub_project": "core",
+        }
+        responses = {}
+
+        def post(version):
+            responses[version] = requests.post(
+                f"http://{host}:{port}/changelog", json={**entry, "version": version}
+            )
+
+        threads = [threading.Thread(target=post, args=(v,)) for v in ("1", "2")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.status_code for r in responses.values()], [200, 200])
+        with open(os.path.join(self.directory.name, "core", "CHANGELOG.md")) as changelog:
+            content = changelog.read()
+        self.assertIn("## v1 (", content)
+        self.assertIn("## v2 (", content)
+
+    def test_writes_confined_to_output_root(self):
+        host, port = self.serve(port=0).server_address
+        url = f"http://{host}:{port}/changelog"
+        entry = {"project": "p", "branch": "master", "system": "zpw"}
+        zpm_entry = {**entry, "system": "zpm", "base_branch": "release"}
+
+        outside = [
+            {**entry, "output_dir": "../elsewhere"},
+            {**entry, "output_dir": "/tmp"},
+            {**zpm_entry, "sub_project": "../../x"},
+            {**zpm_entry, "sub_project": "api,../x"},
+            {**entry, "repo_path": "/"},
+            {**entry, "source": "git"},
+        ]
+
+        for request in outside:
+            response = requests.post(url, json=request)
+            self.assertEqual(response.status_code, 400, request)
+
+    def test_webhook_secret(self):
+        self.defaults["webhook_secret"] = "secret"
+        host, port = self.serve(port=0).server_address
+        url = f"http://{host}:{port}/webhook"
+        payload = {"object_kind": "tag_push", "ref": "refs/tags/v1"}
+
+        rejected = requests.post(url, json=payload, headers={"X-Gitlab-Token": "x"})
+        accepted = requests.post(url, json=payload, headers={"X-Gitlab-Token": "secret"})
+
+        self.assertEqual(rejected.status_code, 401)
+        self.assertEqual(accepted.json(), {"status": "ignored"})
+
+    def test_unix_socket(self):
+        path = os.path.join(self.directory.name, "changegen.sock")
+        self.serve(socket_path=path)
+
+        connection = UnixConnection(path)
+        connection.request("GET", "/health")
+        response = connection.getresponse()
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(response.read())["status"], "ok")
+        connection.close()
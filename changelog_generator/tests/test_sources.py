@@ -0,0 +1,178 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from unittest import mock
+
+from changelog_generator.calls import (
+    get_commits_between_branches,
+    get_commits_since_date,
+    get_commits_until_latest_bump,
+    get_last_commit_date,
+)
+from changelog_generator.client import GitLabClient
+from changelog_generator.exceptions import IncompleteHistoryError
+from changelog_generator.sources import CommitSource, GitSource, get_commit_source
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+
+COMMITS = [
+    ("feat: one", "core", "2020-01-01T10:00:00+00:00"),
+    ("bump: version 0.0.0 → 0.1.0", "core", "2020-01-02T10:00:00+00:00"),
+    ("fix(api): two\n\nWith a body", "api", "2020-01-03T10:00:00+02:00"),
+    ("feat(web): three", "web", "2020-01-04T10:00:00-05:00"),
+]
+
+
+def git(path, *args, date=None):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "Test",
+        "GIT_AUTHOR_EMAIL": "test@example.com",
+        "GIT_COMMITTER_NAME": "Test",
+        "GIT_COMMITTER_EMAIL": "test@example.com",
+    }
+    if date:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = date
+    return subprocess.run(
+        ["git", "-C", path, *args],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.strip()
+
+
+class GitSourceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.repo = os.path.join(self.directory.name, "repo")
+        os.mkdir(self.repo)
+        git(self.repo, "init", "-q", "-b", "master")
+        for number, (message, directory, date) in enumerate(COMMITS):
+            os.makedirs(os.path.join(self.repo, directory), exist_ok=True)
+            with open(os.path.join(self.repo, directory, "file"), "a") as changed:
+                changed.write(f"{number}\n")
+            git(self.repo, "add", "-A")
+            git(self.repo, "commit", "-q", "-m", message, date=date)
+
+    def cli_args(self, **extra):
+        return {
+            "project": "group/project",
+            "branch": "master",
+            "branch_one": "master",
+            "branch_two": "master",
+            "repo_path": self.repo,
+            **extra,
+        }
+
+
+class TestGitSource(GitSourceTestCase):
+    def test_commits_until_latest_bump(self):
+        commits = get_commits_until_latest_bump(self.cli_args())
+
+        self.assertEqual(
+            [commit.title for commit in commits], ["fix(api): two", "feat(web): three"]
+        )
+        self.assertEqual(commits[0].message, "fix(api): two\n\nWith a body\n")
+        self.assertEqual(commits[0].short_id, commits[0].id[:8])
+        self.assertEqual(commits[0].committed_date, "2020-01-03T10:00:00+02:00")
+
+    def test_commits_since_date_with_path(self):
+        cli_args = self.cli_args(commit_path="api")
+
+        commits = get_commits_since_date("2020-01-02T00:00:00+00:00", cli_args)
+
+        self.assertEqual([commit.title for commit in commits], ["fix(api): two"])
+
+    def test_last_commit_date(self):
+        self.assertEqual(
+            get_last_commit_date(self.cli_args()), "2020-01-04T10:00:01-05:00"
+        )
+
+    def test_commits_between_branches(self):
+        git(self.repo, "checkout", "-q", "-b", "feature", "HEAD~2")
+        with open(os.path.join(self.repo, "core", "file"), "a") as changed:
+            changed.write("back-dated\n")
+        git(self.repo, "commit", "-q", "-am", "fix: back-dated", date="2019-12-31T10:00:00+00:00")
+        cli_args = self.cli_args(branch_one="master", branch_two="feature")
+
+        commits = get_commits_between_branches(cli_args)
+
+        # A date window from the head of master would miss this commit
+        self.assertEqual([commit.title for commit in commits], ["fix: back-dated"])
+
+    def test_remote_tracking_branch(self):
+        clone = os.path.join(self.directory.name, "clone")
+        git(self.directory.name, "clone", "-q", self.repo, clone)
+        git(clone, "checkout", "-q", "--detach")
+        git(clone, "branch", "-q", "-D", "master")
+
+        commits = GitSource(clone).commits_until_latest_bump("master")
+
+        self.assertEqual(len(commits), 2)
+
+
+class TestShallowClone(GitSourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clone = os.path.join(self.directory.name, "shallow")
+        git(self.directory.name, "clone", "-q", "--depth", "2", f"file://{self.repo}", self.clone)
+
+    def test_incomplete_history(self):
+        source = GitSource(self.clone)
+
+        with self.assertRaises(IncompleteHistoryError):
+            source.commits_until_latest_bump("master")
+        with self.assertRaises(IncompleteHistoryError):
+            source.commits_since_date("2020-01-01T00:00:00+00:00", "master")
+        self.assertEqual(
+            len(source.commits_since_date("2020-01-04T00:00:00+00:00", "master")), 1
+        )
+
+    def test_falls_back_to_gitlab(self):
+        with StubGitLab(make_commits(25, bump_every=10)) as stub:
+            cli_args = self.cli_args(
+                repo_path=self.clone,
+                ip_address=stub.url,
+                api_version="4",
+                ssl=True,
+                client=GitLabClient(stub.url),
+            )
+
+            commits = get_commits_until_latest_bump(cli_args)
+
+            self.assertEqual(len(commits), 5)
+            self.assertEqual(stub.requests, 1)
+
+    def test_git_source_does_not_fall_back(self):
+        with self.assertRaises(IncompleteHistoryError):
+            get_commits_until_latest_bump(self.cli_args(repo_path=self.clone, source="git"))
+
+
+class TestCommitSource(unittest.TestCase):
+    def test_incomplete_source_cannot_be_created(self):
+        class HeadOnly(CommitSource):
+            def head_commit(self, ref):
+                return None
+
+        with self.assertRaises(TypeError):
+            HeadOnly()
+
+
+class TestGetCommitSource(unittest.TestCase):
+    def test_gitlab_without_clone(self):
+        with mock.patch.dict(os.environ, {"CI_PROJECT_DIR": ""}):
+            self.assertIsNone(get_commit_source({"project": "group/project"}))
+
+    def test_gitlab_ci_checkout(self):
+        environ = {"CI_PROJECT_DIR": "/builds/group/project", "CI_PROJECT_PATH": "group/project"}
+        with mock.patch.dict(os.environ, environ):
+            source = get_commit_source({"project": "group/project"})
+            other = get_commit_source({"project": "group/other"})
+            forced = get_commit_source({"project": "group/project", "source": "gitlab"})
+
+        self.assertEqual(source.path, "/builds/group/project")
+        self.assertIsNone(other)
+        self.assertIsNone(forced)
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import changelog_generator
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(changelog_generator.__file__))
+
+# Import time budgets in microseconds, several times what the imports take
+# on a developer machine; loading requests alone exceeds them
+HELP_BUDGET = 100_000
+NO_OP_BUDGET = 150_000
+
+API_MODULES = {"requests", "changelog_generator.client", "changelog_generator.http_cache"}
+
+
+# Runs changegen, then lists the modules it loaded, even after --help exits
+RUN_CHANGEGEN = """
+import runpy, sys
+try:
+    runpy.run_module("changelog_generator.entry_point", run_name="__main__")
+finally:
+    print("modules:", *sys.modules, file=sys.stderr)
+"""
+
+
+def run_changegen(*argv) -> tuple:
+    """
+    Runs changegen with `-X importtime`. Returns the names of the modules
+    it loaded, and the cumulative import time in microseconds of every
+    top-level import made after interpreter startup.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN_CHANGEGEN, *argv],
+        cwd=PACKAGE_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    modules = set()
+    total = 0
+    started = False
+    for line in result.stderr.splitlines():
+        if line.startswith("modules:"):
+            modules.update(line.split()[1:])
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not started:
+            # Everything up to site is interpreter startup
+            started = name.strip() == "site"
+        elif name.startswith(" ") and not name.startswith("  "):
+            total += int(cumulative)
+    return modules, total
+
+
+class TestStartup(unittest.TestCase):
+    def test_help(self):
+        modules, import_time = run_changegen("--help")
+
+        self.assertFalse(modules & API_MODULES)
+        self.assertNotIn("changelog_generator.zpm_generator", modules)
+        self.assertNotIn("changelog_generator.zpw_generator", modules)
+        self.assertNotIn("semver", modules)
+        self.assertLess(import_time, HELP_BUDGET)
+
+    def test_no_op_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            subprocess.run(["git", "-C", directory, "init", "-q"], check=True)
+            subprocess.run(
+                [
+                    "git", "-C", directory,
+                    "-c", "user.name=Test", "-c", "user.email=test@example.com",
+                    "commit", "-q", "--allow-empty", "-m", "bump: version 1.0.0",
+                ],
+                check=True,
+            )
+            # The clone has nothing since its last bump, so zpw reads it
+            # and writes nothing without contacting GitLab
+            modules, import_time = run_changegen(
+                "-sy", "zpw",
+                "-p", "group/project",
+                "-b", "HEAD",
+                "-i", "http://localhost:1",
+                "--source", "git",
+                "--repo-path", directory,
+            )
+
+        self.assertIn("changelog_generator.zpw_generator", modules)
+        self.assertFalse(modules & API_MODULES)
+        self.assertNotIn("changelog_generator.zpm_generator", modules)
+        self.assertNotIn("dateutil", modules)
+        self.assertLess(import_time, NO_OP_BUDGET)
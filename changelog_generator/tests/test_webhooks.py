@@ -0,0 +1,105 @@
+import json
+import os
+import unittest
+
+from changelog_generator.calls import get_commits_until_latest_bump
+from changelog_generator.client import GitLabClient
+from changelog_generator.commit_cache import MemoryCommitCache, cache_key
+from changelog_generator.tests.stub_gitlab import StubGitLab, make_commits
+from changelog_generator.webhooks import receive
+
+PAYLOADS = os.path.join(os.path.dirname(__file__), "payloads")
+
+
+def load_payload(name: str) -> dict:
+    with open(os.path.join(PAYLOADS, f"{name}.json")) as payload_file:
+        return json.load(payload_file)
+
+
+class TestWebhookIndex(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubGitLab(make_commits(150, bump_every=100)).start()
+        self.addCleanup(self.stub.stop)
+        self.client = GitLabClient(self.stub.url)
+        self.addCleanup(self.client.close)
+        self.cli_args = {
+            "ip_address": self.stub.url,
+            "project": "group/project",
+            "branch": "master",
+            "client": self.client,
+            "commit_cache": MemoryCommitCache(),
+        }
+        # The first run fills the index
+        get_commits_until_latest_bump(self.cli_args)
+
+    def requests_for_run(self):
+        before = self.stub.requests
+        commits = get_commits_until_latest_bump(self.cli_args)
+        return commits, self.stub.requests - before
+
+    def fetched(self):
+        return get_commits_until_latest_bump({**self.cli_args, "commit_cache": None})
+
+    def test_push_served_without_requests(self):
+        self.stub.commits = make_commits(153, bump_every=100)
+
+        self.assertEqual(receive(self.cli_args, load_payload("push")), "indexed")
+        commits, requests = self.requests_for_run()
+
+        self.assertEqual(requests, 0)
+        self.assertEqual(len(commits), 53)
+        self.assertEqual(commits, self.fetched())
+
+    def test_duplicate_delivery(self):
+        self.stub.commits = make_commits(153, bump_every=100)
+        receive(self.cli_args, load_payload("push"))
+
+        self.assertEqual(receive(self.cli_args, load_payload("push")), "unchanged")
+
+    def test_missed_push_falls_back(self):
+        self.stub.commits = make_commits(153, bump_every=100)
+        payload = load_payload("push")
+        # The delivery for the first of the three commits was missed
+        payload["before"] = payload["commits"][0]["id"]
+        payload["commits"] = payload["commits"][1:]
+
+        self.assertEqual(receive(self.cli_args, payload), "gap")
+        commits, requests = self.requests_for_run()
+
+        self.assertGreater(requests, 0)
+        self.assertEqual(commits, self.fetched())
+
+    def test_truncated_push_falls_back(self):
+        self.stub.commits = make_commits(153, bump_every=100)
+        payload = load_payload("push")
+        payload["total_commits_count"] = 25
+
+        self.assertEqual(receive(self.cli_args, payload), "gap")
+        self.assertFalse(
+            self.cli_args["commit_cache"].is_tracked(cache_key(self.cli_args), "master")
+        )
+
+    def test_force_push_falls_back(self):
+        self.stub.commits = make_commits(153, bump_every=100, seed="rewritten")
+        payload = load_payload("push")
+        payload["after"] = self.stub.commits[0]["id"]
+
+        self.assertEqual(receive(self.cli_args, payload), "gap")
+        commits, _ = self.requests_for_run()
+
+        self.assertEqual(
+            [commit.id for commit in commits],
+            [commit["id"] for commit in reversed(self.stub.commits[:53])],
+        )
+
+    def test_deleted_branch(self):
+        payload = load_payload("push")
+        payload["after"] = "0" * 40
+
+        self.assertEqual(receive(self.cli_args, payload), "deleted")
+        self.assertIsNone(
+            self.cli_args["commit_cache"].head(cache_key(self.cli_args), "master")
+        )
+
+    def test_tag_push_ignored(self):
+        self.assertEqual(receive(self.cli_args, load_payload("tag_push")), "ignored")
@@ -0,0 +1,72 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from changelog_generator.writer import prepend
+
+
+class TestPrepend(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.file_path = os.path.join(self.directory.name, "CHANGELOG.md")
+
+    def write(self, content):
+        with open(self.file_path, "w") as changelog:
+            changelog.write(content)
+
+    def read(self):
+        with open(self.file_path) as changelog:
+            return changelog.read()
+
+    def test_prepends_to_existing_file(self):
+        self.write("## v1.0.0\n")
+
+        with prepend(self.file_path) as changelog:
+            changelog.write("## v1.1.0\n\n")
+
+        self.assertEqual(self.read(), "## v1.1.0\n\n## v1.0.0\n")
+        self.assertEqual(os.listdir(self.directory.name), ["CHANGELOG.md"])
+
+    def test_creates_missing_file(self):
+        with prepend(self.file_path) as changelog:
+            changelog.write("## v1.0.0\n")
+
+        self.assertEqual(self.read(), "## v1.0.0\n")
+
+    def test_skips_header_lines(self):
+        self.write("# CHANGELOG\n\n## v1.0.0\n")
+
+        with prepend(self.file_path, skip_lines=2) as changelog:
+            changelog.write("# CHANGELOG\n\n## v1.1.0\n\n")
+
+        self.assertEqual(self.read(), "# CHANGELOG\n\n## v1.1.0\n\n## v1.0.0\n")
+
+    def test_keeps_short_file_whole(self):
+        self.write("# CHANGELOG\n\n")
+
+        with prepend(self.file_path, skip_lines=2) as changelog:
+            changelog.write("## v1.0.0\n")
+
+        self.assertEqual(self.read(), "## v1.0.0\n# CHANGELOG\n\n")
+
+    def test_failure_leaves_original(self):
+        self.write("## v1.0.0\n")
+
+        with self.assertRaises(RuntimeError):
+            with prepend(self.file_path) as changelog:
+                changelog.write("## v1.1.0\n")
+                raise RuntimeError("render failed")
+
+        self.assertEqual(self.read(), "## v1.0.0\n")
+        self.assertEqual(os.listdir(self.directory.name), ["CHANGELOG.md"])
+
+    def test_keeps_file_mode(self):
+        self.write("## v1.0.0\n")
+        os.chmod(self.file_path, 0o640)
+
+        with prepend(self.file_path) as changelog:
+            changelog.write("## v1.1.0\n")
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.file_path).st_mode), 0o640)
@@ -0,0 +1,82 @@
+"""
+Keeping the commit cache current from GitLab push webhooks, so that a
+generator run in the receiving process can read the commits since the
+last bump without any request.
+
+A push extends the cached history of a branch when it continues from
+the cached head. The ref is then marked as tracked, and
+refresh_cached_commits trusts it as it is. Any push that cannot be applied
+untracks the ref, and the next run revalidates it as usual. Such pushes
+are a missed webhook, a truncated commit list or a force push. The next
+run fetches only the missing commits, or starts over with
+get_commits_until_latest_bump when the history was rewritten.
+"""
+import logging
+import threading
+
+from changelog_generator.calls import is_ancestor
+from changelog_generator.commit_cache import cache_key, get_commit_cache
+from changelog_generator.models import Commit
+
+logger = logging.getLogger(__name__)
+
+BRANCH_PREFIX = "refs/heads/"
+# The `before` of a new branch and the `after` of a deleted one
+BLANK_SHA = "0" * 40
+
+_lock = threading.Lock()
+
+
+def receive(cli_args: dict, payload: dict) -> str:
+    """
+    Applies a webhook payload to the commit cache of `cli_args` and
+    returns what was done with it. Only push events change the cache.
+    Tag pushes carry no commits, and the bump is found among the cached
+    commits, so they are acknowledged and ignored.
+    """
+    cache = get_commit_cache(cli_args)
+    if cache is None or payload.get("object_kind") != "push":
+        return "ignored"
+    # Deliveries are applied one at a time, in the order they arrive
+    with _lock:
+        return apply_push(cache, cli_args, payload)
+
+
+def apply_push(cache, cli_args: dict, payload: dict) -> str:
+    ref = payload["ref"]
+    if not ref.startswith(BRANCH_PREFIX):
+        return "ignored"
+    branch = ref[len(BRANCH_PREFIX):]
+    # Runs name the project by its path
+    cli_args = {**cli_args, "project": payload["project"]["path_with_namespace"]}
+    key = cache_key(cli_args)
+    before, after = payload["before"], payload["after"]
+
+    if after == BLANK_SHA:
+        cache.invalidate(key, branch)
+        return "deleted"
+    head_id = cache.head(key, branch)
+    if head_id is None:
+        # Nothing to extend yet; the next run fills the cache
+        return "ignored"
+    if head_id == after:
+        return "unchanged"
+
+    commits = payload.get("commits") or []
+    # GitLab lists at most 20 commits in a push payload
+    truncated = payload.get("total_commits_count", len(commits)) > len(commits)
+    if head_id != before or truncated or not commits:
+        logger.info("Push to '%s' of %s leaves a gap, untracking it", branch, key)
+        cache.set_tracked(key, branch, False)
+        return "gap"
+    # GitLab does not flag force pushes, so check the push fast-forwards
+    if not is_ancestor(cli_args, before, after, receive.__name__):
+        logger.info("Branch '%s' of %s was rewritten, untracking it", branch, key)
+        cache.set_tracked(key, branch, False)
+        return "gap"
+
+    # Payload commits are listed oldest first
+    cache.prepend(key, branch, [Commit.from_push(commit) for commit in reversed(commits)])
+    cache.set_tracked(key, branch, True)
+    logger.info("Indexed %d commits pushed to '%s' of %s", len(commits), branch, key)
+    return "indexed"
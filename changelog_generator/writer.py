@@ -0,0 +1,74 @@
+"""
+Prepending a new release section to an existing changelog without
+loading the old content into memory.
+"""
+import io
+import os
+import shutil
+import uuid
+
+from contextlib import contextmanager, nullcontext
+
+from changelog_generator.profiling import span
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+@contextmanager
+def prepend(file_path: str, skip_lines: int = 0):
+    """
+    Yields a text handle for the new section of `file_path`. On exit the
+    existing content is streamed after it in fixed-size chunks and the
+    result is atomically renamed over the original, so a failure at any
+    point leaves the old changelog untouched.
+
+    The first `skip_lines` lines of the existing content are dropped,
+    but only when the file has more lines than that, which lets callers
+    replace a header they write again themselves.
+    """
+    directory, name = os.path.split(file_path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    # Created like a plain open() would, so the umask decides a new file's mode
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with open(fd, "w") as new_changelog:
+            yield new_changelog
+
+            with span("write", path=file_path):
+                new_changelog.flush()
+                if os.path.isfile(file_path):
+                    with open(file_path, "rb") as original_changelog:
+                        _skip_header(original_changelog, new_changelog.buffer, skip_lines)
+                        shutil.copyfileobj(
+                            original_changelog, new_changelog.buffer, COPY_BUFFER_SIZE
+                        )
+                    shutil.copymode(file_path, temp_path)
+                new_changelog.flush()
+                os.fsync(new_changelog.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _skip_header(source, destination, skip_lines: int):
+    header = []
+    for _ in range(skip_lines + 1):
+        line = source.readline()
+        if not line:
+            break
+        header.append(line)
+    if len(header) > skip_lines:
+        header = header[skip_lines:]
+    destination.write(b"".join(header))
+
+
+def open_section(file_path: str, skip_lines: int = 0, render_only: bool = False):
+    """
+    Returns the context to write a new release section in: prepend() to
+    `file_path`, or with `render_only` an in-memory buffer that is left
+    open on exit, so the caller can return its value instead.
+    """
+    if render_only:
+        return nullcontext(io.StringIO())
+    return prepend(file_path, skip_lines)
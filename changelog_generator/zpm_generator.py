@@ -1,15 +1,32 @@
+import asyncio
+import contextvars
 import datetime
-import dateutil.parser
 import os.path
-import re
+
+from concurrent.futures import ThreadPoolExecutor
 
 from changelog_generator.calls import (
     get_closed_issues_for_project,
+    get_commits_between_branches,
     get_commits_since_date,
     get_last_commit_date,
     get_last_tagged_release_date,
 )
+from changelog_generator.conventional import classify, partition
 from changelog_generator.log_handlers import logger
+from changelog_generator.profiling import span
+from changelog_generator.release_notes import (
+    closed_issues_since,
+    format_issue,
+    link_merge_request,
+    release_notes,
+    start_release_notes,
+)
+from changelog_generator.writer import open_section
+
+
+# How many sub-project changelogs are written at the same time
+MAX_WRITERS = 8
 
 
 class ZPMGenerator:
@@ -25,84 +42,225 @@ class ZPMGenerator:
 
     type_order = ["feat", "chg", "fix", "chore", "test", "", ]
 
+    subproject_filters = ["scope", "path", "both"]
+
     def generate_changelog(self, cli_args: dict) -> str:
+        cli_args = self.with_branches(cli_args)
+        sub_projects = self.sub_projects(cli_args)
+        if len(sub_projects) > 1:
+            return "\n".join(
+                str(result) for result in self.generate_changelogs(cli_args).values()
+            )
+        cli_args = self.with_commit_path({**cli_args, "sub_project": sub_projects[0]})
+        cli_args = start_release_notes(cli_args)
+
+        with span("fetch"):
+            new_commits = self.fetch_commits(cli_args)
+
+        return self.write_changelog(new_commits, cli_args)
+
+    def generate_changelogs(self, cli_args: dict) -> dict:
+        """
+        Generates the changelogs of several sub-projects from a single
+        fetch of the commits, partitioned by scope in one pass, and writes
+        them concurrently. Returns the result for each sub-project. With
+        the `path` or `both` filter each sub-project is still fetched on
+        its own, as GitLab filters commits by one path per request.
+        """
+        cli_args = self.with_branches(cli_args)
+        sub_projects = self.sub_projects(cli_args)
+        # Issues are project-wide, so they are fetched once for all
+        cli_args = start_release_notes(cli_args)
+        if cli_args.get("subproject_filter") in ("path", "both"):
+            return self.for_each(
+                sub_projects,
+                lambda sub_project: self.generate_changelog(
+                    {**cli_args, "sub_project": sub_project}
+                ),
+            )
+
+        with span("fetch"):
+            new_commits = self.fetch_commits(cli_args)
+        return self.write_changelogs(new_commits, sub_projects, cli_args)
+
+    def write_changelogs(
+        self, new_commits: list, sub_projects: list, cli_args: dict
+    ) -> dict:
+        """
+        Partitions the commits by scope in one pass and writes the
+        changelog of every sub-project concurrently.
+        """
+        with span("classify", commits=len(new_commits)):
+            partitions = partition(
+                new_commits,
+                self.type_map,
+                sub_projects,
+                self.include_projs,
+                require_scope=True,
+            )
+        return self.for_each(
+            sub_projects,
+            lambda sub_project: self.render_changelog(
+                partitions[sub_project], {**cli_args, "sub_project": sub_project}
+            ),
+        )
+
+    def for_each(self, sub_projects: list, generate) -> dict:
+        workers = min(len(sub_projects), MAX_WRITERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each task gets its own copy of the context for its spans
+            futures = [
+                executor.submit(contextvars.copy_context().run, generate, sub_project)
+                for sub_project in sub_projects
+            ]
+            return {
+                sub_project: future.result()
+                for sub_project, future in zip(sub_projects, futures)
+            }
+
+    def fetch_commits(self, cli_args: dict) -> list:
+        if cli_args.get("branch_diff") == "compare":
+            return get_commits_between_branches(cli_args)
+
         # Get the date of the last commit
         last_commit = get_last_commit_date(cli_args)
 
         # Get any commits since that date
-        new_commits = get_commits_since_date(last_commit, cli_args)
+        return get_commits_since_date(last_commit, cli_args)
+
+    def sub_projects(self, cli_args: dict) -> list:
+        """
+        Returns the sub-projects to generate changelogs for, given as a
+        list or as comma-separated names.
+        """
+        sub_project = cli_args["sub_project"]
+        if isinstance(sub_project, (list, tuple)):
+            return list(sub_project)
+        return [name.strip() for name in sub_project.split(",") if name.strip()]
+
+    async def generate_changelog_async(self, cli_args: dict) -> str:
+        from changelog_generator import async_calls
+        from changelog_generator.async_client import async_client_args
+
+        async_calls.check_options(cli_args)
+        cli_args = self.with_branches(cli_args)
+        sub_projects = self.sub_projects(cli_args)
+        by_path = cli_args.get("subproject_filter") in ("path", "both")
+        if len(sub_projects) > 1 and by_path:
+            # GitLab filters commits by one path per request
+            results = await asyncio.gather(
+                *(
+                    self.generate_changelog_async({**cli_args, "sub_project": sub_project})
+                    for sub_project in sub_projects
+                )
+            )
+            return "\n".join(str(result) for result in results)
+        if len(sub_projects) == 1:
+            cli_args = {**cli_args, "sub_project": sub_projects[0]}
+
+        cli_args = self.with_commit_path(cli_args)
+        async with async_client_args(cli_args) as cli_args:
+            with span("fetch"):
+                last_commit = await async_calls.get_last_commit_date(cli_args)
+                new_commits = await async_calls.get_commits_since_date(last_commit, cli_args)
+
+        if len(sub_projects) > 1:
+            results = self.write_changelogs(new_commits, sub_projects, cli_args)
+            return "\n".join(str(result) for result in results.values())
+        return self.write_changelog(new_commits, cli_args)
+
+    def with_branches(self, cli_args: dict) -> dict:
+        """
+        Names the branches the calls compare: `branch_two` is the changelog's
+        `branch` and `branch_one` the `base_branch` it is compared with.
+        """
+        return {
+            "branch_one": cli_args.get("base_branch"),
+            "branch_two": cli_args.get("branch"),
+            **cli_args,
+        }
+
+    def with_commit_path(self, cli_args: dict) -> dict:
+        """
+        Pushes sub-project filtering down to GitLab's commit `path` filter
+        when the `subproject_filter` is `path` or `both`. The sub-project
+        directory defaults to the sub-project name.
+        """
+        if cli_args.get("subproject_filter") not in ("path", "both"):
+            return cli_args
+        return {
+            **cli_args,
+            "commit_path": cli_args.get("subproject_path") or cli_args["sub_project"],
+        }
+
+    def write_changelog(self, new_commits: list, cli_args: dict) -> str:
+        allowed_projs = self.include_projs + [cli_args["sub_project"]]
+        logger.debug("Allowed projects: %s", allowed_projs)
 
+        # With the `path` filter GitLab has already selected the commits
+        filter_scope = cli_args.get("subproject_filter") != "path"
+        with span("classify", commits=len(new_commits)):
+            commits_type_dict = classify(
+                new_commits,
+                self.type_map,
+                allowed_projs if filter_scope else None,
+                require_scope=True,
+            )
+        return self.render_changelog(commits_type_dict, cli_args)
+
+    def render_changelog(self, commits_type_dict: dict, cli_args: dict) -> str:
         # Get the current date so that we can add it to the CHANGELOG.md document
         date = datetime.datetime.now()
         current_date = date.strftime("%Y-%m-%d")
 
-        allowed_projs = include_projs
-        allowed_projs.append(cli_args["sub_project"])
-        logger.debug("allow_projs")
-        logger.debug(allowed_projs)
-
-        commits_type_dict = {
-            type: [] for type in type_map
-        }
-        commits_type_dict[""] = []
-        for commit in new_commits:
-            title = commit["title"]
-            match_obj = re.match(r'^(.+)\((.+)\):', title)
-            change_type = match_obj.group(1)
-            proj = match_obj.group(2)
-            if proj not in allowed_projs:
-                logger.info(title)
-                continue
-            logger.info(title)
-            if change_type in type_map:
-                commits_type_dict[change_type].append(commit)
-            else:
-                commits_type_dict[""].append(commit)
-
-        # Determine whether a CHANGELOG.md file already exists
-        file_path = f"{cli_args['sub_project']}/CHANGELOG.md"
-        if not os.path.isfile(file_path):
-            open(file_path, 'a').close()
-        with open(file_path, "r") as original_changelog:
-            original_changelog_data = original_changelog.read()
-            with open(file_path, "w") as modified_changelog:
-                modified_changelog.write(f"## v{cli_args['version']} ({current_date})\n")
-                for type in type_order:
-                    commits = commits_type_dict[type]
-                    if not commits:
-                        continue
+        # The previous releases are kept below the new one
+        file_path = self.changelog_path(cli_args)
+        notes = release_notes(cli_args)
+        render_only = cli_args.get("render_only")
+        section = open_section(file_path, render_only=render_only)
+        with section as modified_changelog, span("render"):
+            modified_changelog.write(f"## v{cli_args['version']} ({current_date})\n")
+            for type in self.type_order:
+                commits = commits_type_dict[type]
+                if not commits:
+                    continue
+                modified_changelog.write(
+                    f"\n### {self.type_map[type]} \n"
+                )
+                for commit in commits:
+                    modified_changelog.write("\n")
+                    lines = commit.message.split("\n")
                     modified_changelog.write(
-                        f"\n### {type_map[type]} \n"
+                        f"  * {commit.committed_date[:10]} - "
+                        f"{link_merge_request(lines[0], notes)} \n"
                     )
-                    for commit in commits:
-                        modified_changelog.write("\n")
-                        logger.debug("commit ")
-                        logger.debug(commit)
-                        lines = commit["message"].split("\n")
-                        modified_changelog.write(
-                            f"  * {commit['committed_date'][:10]} - {lines[0]} \n"
-                        )
-                        modified_changelog.write("\n".join("    " + line for line in lines[1:] if line))
-                        modified_changelog.write("\n")
-
-                modified_changelog.write(f"\n")
-                modified_changelog.write(original_changelog_data)
-                return f"{file_path} updated successfully"
+                    modified_changelog.write("\n".join("    " + line for line in lines[1:] if line))
+                    modified_changelog.write("\n")
+            if notes and notes.issues:
+                modified_changelog.write("\n### Closed issues \n")
+                for issue in notes.issues:
+                    modified_changelog.write(f"\n  * {format_issue(issue)} \n")
 
+            modified_changelog.write(f"\n")
+        if render_only:
+            return modified_changelog.getvalue()
+        return f"{file_path} updated successfully"
+
+    def changelog_path(self, cli_args: dict) -> str:
+        return os.path.join(
+            cli_args.get("output_dir") or "", cli_args["sub_project"], "CHANGELOG.md"
+        )
+
+    def changelog_paths(self, cli_args: dict) -> list:
+        return [
+            self.changelog_path({**cli_args, "sub_project": sub_project})
+            for sub_project in self.sub_projects(cli_args)
+        ]
 
     def get_closed_issues_since_last_tag(self, cli_args: dict) -> list:
         last_tagged_release_date = get_last_tagged_release_date(cli_args)
 
-        closed_issues = get_closed_issues_for_project(cli_args)
-
-        closed_issues_since_tag = []
-        for issue in closed_issues:
-            logger.info(issue)
-            if dateutil.parser.parse(issue["closed_at"]) > dateutil.parser.parse(
-                    last_tagged_release_date
-            ):
-                closed_issues_since_tag.append(
-                    {"closed_at": issue["closed_at"], "title": issue["title"]}
-                )
+        # Issues last updated before the release cannot have closed since
+        closed_issues = get_closed_issues_for_project(cli_args, last_tagged_release_date)
 
-        return closed_issues_since_tag
+        return closed_issues_since(closed_issues, last_tagged_release_date)
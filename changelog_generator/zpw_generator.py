@@ -1,5 +1,4 @@
 import datetime
-import dateutil.parser
 import semver
 import os.path
 import re
@@ -7,7 +6,16 @@ import re
 from changelog_generator.calls import (
     get_commits_until_latest_bump,
 )
+from changelog_generator.conventional import classify, parse_title
 from changelog_generator.log_handlers import logger
+from changelog_generator.profiling import span
+from changelog_generator.release_notes import (
+    format_issue,
+    link_merge_request,
+    release_notes,
+    start_release_notes,
+)
+from changelog_generator.writer import open_section
 
 
 class ZPWGenerator:
@@ -38,89 +46,102 @@ class ZPWGenerator:
     type_order = ['feat', 'chg', 'fix', 'chore', 'test', '', ]
 
     def generate_changelog(self, cli_args: dict) -> str:
+        cli_args = start_release_notes(cli_args)
+
         # Get any commits since that date
-        new_commits = get_commits_until_latest_bump(cli_args)
+        with span('fetch'):
+            new_commits = get_commits_until_latest_bump(cli_args)
+
+        return self.write_changelog(new_commits, cli_args)
+
+    async def generate_changelog_async(self, cli_args: dict) -> str:
+        from changelog_generator import async_calls
+        from changelog_generator.async_client import async_client_args
+
+        async_calls.check_options(cli_args)
+        async with async_client_args(cli_args) as cli_args:
+            with span('fetch'):
+                new_commits = await async_calls.get_commits_until_latest_bump(cli_args)
 
+        return self.write_changelog(new_commits, cli_args)
+
+    def write_changelog(self, new_commits: list, cli_args: dict) -> str:
         # Get the current date so that we can add it to the CHANGELOG.md document
         date = datetime.datetime.now()
         current_date = date.strftime('%Y/%m/%d')
 
         allowed_projs = self.include_projs
-        allowed_projs.append(cli_args['sub_project'])
-        logger.debug('allow_projs')
-        logger.debug(allowed_projs)
-
-        commits_type_dict = {
-            type: [] for type in self.type_map
-        }
-        commits_type_dict[''] = []
-        for commit in new_commits:
-            title = commit['title']
-            match_obj = re.match(r'^(.+)(\((.+)\))?:', title)
-            change_type = ''
-            if match_obj:
-                change_type = match_obj.group(1)
-                proj = match_obj.group(2)
-                if proj and proj not in allowed_projs:
-                    logger.info(title)
-                    continue
-            logger.info(title)
-            if change_type in self.type_map:
-                commits_type_dict[change_type].append(commit)
-            else:
-                commits_type_dict[''].append(commit)
-
-        version = self.get_version(cli_args)
-        new_version = self.get_next_version(version, commits_type_dict, cli_args)
+        if cli_args['sub_project']:
+            allowed_projs = allowed_projs + [cli_args['sub_project']]
+        logger.debug('Allowed projects: %s', allowed_projs)
+
+        # Scoped commits are only filtered once there is something to allow
+        with span('classify', commits=len(new_commits)):
+            commits_type_dict = classify(
+                new_commits, self.type_map, allowed_projs or None
+            )
+
+        with span('version'):
+            version = self.get_version(cli_args)
+            new_version = self.get_next_version(version, commits_type_dict, cli_args)
         if version == new_version:
             logger.info('No changes')
             return
 
-        # Determine whether a CHANGELOG.md file already exists
-        if not os.path.isfile(self.file_path):
-            open(self.file_path, 'w').close()
-        with open(self.file_path, 'r') as original_changelog:
-            original_changelog_data = original_changelog.readlines()
-            if len(original_changelog_data) > 2:
-                original_changelog_data = original_changelog_data[2:]
-            with open(self.file_path, 'w') as modified_changelog:
+        file_path = self.changelog_path(cli_args)
+        notes = release_notes(cli_args)
+        # The old "# CHANGELOG" header is replaced by the one written here
+        render_only = cli_args.get('render_only')
+        with open_section(file_path, 2, render_only) as modified_changelog, span('render'):
+            if not render_only:
                 modified_changelog.write('# CHANGELOG\n\n')
-                modified_changelog.write(f'## v{new_version} - {current_date}\n')
-                for type in self.type_order:
-                    commits = commits_type_dict[type]
-                    if not commits:
-                        continue
+            modified_changelog.write(f'## v{new_version} - {current_date}\n')
+            for type in self.type_order:
+                commits = commits_type_dict[type]
+                if not commits:
+                    continue
+                modified_changelog.write(
+                    f'\n### {self.type_map[type]} \n'
+                )
+                for commit in commits:
+                    lines = commit.message.strip().split('\n')
                     modified_changelog.write(
-                        f'\n### {self.type_map[type]} \n'
+                        f"  * {commit.committed_date[:10]} - "
+                        f"{link_merge_request(lines[0], notes)}"
                     )
-                    for commit in commits:
-                        logger.debug('commit ')
-                        logger.debug(commit)
-                        lines = commit['message'].strip().split('\n')
-                        modified_changelog.write(
-                            f"  * {commit['committed_date'][:10]} - {lines[0]}"
-                        )
 
-                        if not re.match(r'^.+\(\![0-9]+\)$', lines[0]):
-                            modified_changelog.write(f" ({commit['short_id']})")
+                    if parse_title(lines[0]).mr is None:
+                        modified_changelog.write(f" ({commit.short_id})")
 
+                    modified_changelog.write('\n')
+                    if len(lines) > 1:
+                        modified_changelog.write('\n'.join('    ' + line for line in lines[1:] if line))
                         modified_changelog.write('\n')
-                        if len(lines) > 1:
-                            modified_changelog.write('\n'.join('    ' + line for line in lines[1:] if line))
-                            modified_changelog.write('\n')
+            if notes and notes.issues:
+                modified_changelog.write('\n### Closed issues \n')
+                for issue in notes.issues:
+                    modified_changelog.write(f'  * {format_issue(issue)}\n')
+
+            modified_changelog.write(f'\n')
+        if render_only:
+            return modified_changelog.getvalue()
+        return f'{file_path} updated successfully'
+
+    def changelog_path(self, cli_args: dict) -> str:
+        return os.path.join(cli_args.get('output_dir') or '', self.file_path)
 
-                modified_changelog.write(f'\n')
-                modified_changelog.write(''.join(original_changelog_data))
-        return f'{self.file_path} updated successfully'
+    def changelog_paths(self, cli_args: dict) -> list:
+        return [self.changelog_path(cli_args)]
 
     def get_version(self, cli_args: dict) -> str:
         if 'version' in cli_args and cli_args['version']:
             return cli_args['version']
         default_version = '0.0.0'
-        if not os.path.isfile(self.file_path):
+        file_path = self.changelog_path(cli_args)
+        if not os.path.isfile(file_path):
             return default_version
         version_regex = r'^## v([0-9\.]+) - [0-9\/]+$'
-        with open(self.file_path, 'r') as original_changelog:
+        with open(file_path, 'r') as original_changelog:
             line = original_changelog.readline()
             while line:
                 match_obj = re.match(version_regex, line)
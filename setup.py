@@ -15,11 +15,16 @@ setuptools.setup(
     keywords="gitlab changelog python",
     url="https://github.com/stuartmccoll/gitlab-changelog-generator",
     entry_points={
-        "console_scripts": ["changegen=changelog_generator.entry_point:main"]
+        "console_scripts": [
+            "changegen=changelog_generator.entry_point:main",
+            "changegen-batch=changelog_generator.batch:main",
+            "changegen-serve=changelog_generator.service:main",
+        ]
     },
     packages=setuptools.find_packages(),
     install_requires=["requests", "python-dateutil", "iso8601", "rfc3339", "semver"],
-    tests_require=["unittest", "mock"],
+    extras_require={"async": ["httpx"], "stream": ["ijson"]},
+    tests_require=["unittest", "mock", "httpx"],
     classifiers=(
         "Environment :: Console",
         "Programming Language :: Python",